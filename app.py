@@ -4,12 +4,47 @@ Uses pretrained CRNN model from arshjot/Handwritten-Text-Recognition
 Completely offline application with colorful interactive UI
 """
 
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, g, Response, send_from_directory, abort
 import os
+import json
 import hashlib
+import hmac
 import time
+import uuid
+import signal
+import atexit
+import functools
+import threading
+from collections import OrderedDict
+from model.utils.runtime_config import load_runtime_config, set_thread_env, apply_runtime_config
+
+# Thread pool sizes must be exported before torch/OpenCV are imported
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'model/configs/config.json')
+RUNTIME_CONFIG = load_runtime_config(CONFIG_PATH)
+set_thread_env(RUNTIME_CONFIG)
+
+import cv2
+import numpy as np
 from werkzeug.utils import secure_filename
 from model.mains.easyocr_predictor import create_predictor
+from model.utils.form_template import TemplateRegistry
+from model.utils.metrics import METRICS
+from model.utils.profiling import RequestProfiler
+from model.utils.qos import QoSController, load_qos_config, TIERS
+from model.utils.task_queue import create_task_queue
+from model.utils.shm_transport import InferenceProcess
+from model.utils.prediction_errors import is_prediction_error
+from model.utils.batch_codec import decode_batch, encode_results, BatchFormatError, RESULTS_CONTENT_TYPE
+from model.utils.memory_watchdog import (MemoryWatchdog, BoundedCache, load_memory_config, supervised,
+                                         rss_bytes)
+
+# flask-sock is optional; without it streaming is available over HTTP only
+try:
+    from flask_sock import Sock
+    SOCK_AVAILABLE = True
+except ImportError:
+    Sock = None
+    SOCK_AVAILABLE = False
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -17,6 +52,32 @@ app.config['SECRET_KEY'] = 'handwriting-recognition-secret-key'
 app.config['UPLOAD_FOLDER'] = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static/uploads')
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 app.config['ALLOWED_EXTENSIONS'] = {'png', 'jpg', 'jpeg', 'bmp'}
+# Registered form templates are runtime data; point this at a writable data directory in deployments
+app.config['FORM_TEMPLATE_FOLDER'] = os.environ.get(
+    'HTR_TEMPLATE_FOLDER', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'model/templates'))
+app.config['PROFILE_FOLDER'] = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'profiles')
+app.config['PROFILE_SAMPLE_RATE'] = int(os.environ.get('HTR_PROFILE_SAMPLE_RATE', '0'))  # 1 in N, 0 = off
+app.config['PROFILE_TOP_K'] = int(os.environ.get('HTR_PROFILE_TOP_K', '20'))
+app.config['ADMIN_TOKEN'] = os.environ.get('HTR_ADMIN_TOKEN')  # required for on-demand profiles and /admin
+# Browser-side downscaling before upload (advertised by /upload_limits).
+# EasyOCR's detector resizes to a 2560px canvas anyway, so larger images only cost bandwidth.
+app.config['CLIENT_MAX_DIMENSION'] = int(os.environ.get('HTR_CLIENT_MAX_DIMENSION', '2560'))
+app.config['CLIENT_GRAYSCALE'] = os.environ.get('HTR_CLIENT_GRAYSCALE', '1') != '0'
+app.config['CLIENT_IMAGE_QUALITY'] = float(os.environ.get('HTR_CLIENT_IMAGE_QUALITY', '0.9'))
+# Queue mode: /predict hands images to worker nodes (scripts/run_worker.py) instead of
+# running the model in this process. Requests wait up to QUEUE_WAIT_SECONDS for the
+# result and otherwise get 202 with a /result/<task_id> URL to poll.
+app.config['QUEUE_URL'] = os.environ.get('HTR_QUEUE_URL')  # e.g. sqlite:///tmp/htr-queue.db
+app.config['QUEUE_BACKEND'] = os.environ.get('HTR_QUEUE_BACKEND', 'easyocr')
+app.config['QUEUE_WAIT_SECONDS'] = float(os.environ.get('HTR_QUEUE_WAIT_SECONDS', '30'))
+# Images accepted per /predict_batch request (the body is also bound by MAX_CONTENT_LENGTH)
+app.config['BATCH_MAX_ITEMS'] = int(os.environ.get('HTR_BATCH_MAX_ITEMS', '512'))
+# Capacity tests: HTR_BACKEND=synthetic replays the latency profile in HTR_SYNTHETIC_PROFILE
+# (scripts/load_test.py record) instead of loading EasyOCR
+app.config['BACKEND'] = os.environ.get('HTR_BACKEND', 'easyocr')
+# Out-of-process inference (runtime.inference_process): seconds a request waits for a
+# shared-memory slot and for its result before failing
+app.config['INFERENCE_TIMEOUT'] = float(os.environ.get('HTR_INFERENCE_TIMEOUT', '120'))
 
 # Ensure upload directory exists
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
@@ -24,8 +85,146 @@ os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 # Global predictor instance (loaded once at startup)
 predictor = None
 
-# Cache for predictions (optional: cache results for same images)
-prediction_cache = {}
+# Memory watchdog: periodic malloc_trim, memory telemetry, and recycling of workers that
+# pass HTR_MAX_REQUESTS requests or HTR_RSS_CEILING_MB of resident memory
+memory_settings = load_memory_config(CONFIG_PATH)
+if os.environ.get('HTR_MAX_REQUESTS'):
+    memory_settings['max_requests'] = int(os.environ['HTR_MAX_REQUESTS'])
+if os.environ.get('HTR_RSS_CEILING_MB'):
+    memory_settings['rss_ceiling_mb'] = float(os.environ['HTR_RSS_CEILING_MB'])
+
+
+def recycle_worker(reason):
+    """Ask the process manager for a fresh worker (gunicorn finishes in-flight requests on SIGTERM)."""
+    os.kill(os.getpid(), signal.SIGTERM)
+
+
+# Without a process manager nothing would replace the worker, so only report that it is due
+watchdog = MemoryWatchdog(memory_settings, on_recycle=recycle_worker if supervised() else None)
+watchdog.install_stage_probe(METRICS)
+
+# Cache for predictions (optional: cache results for same images), bounded to keep memory flat
+prediction_cache = BoundedCache(memory_settings['prediction_cache_entries'])
+
+# Registered form layouts for template-driven field extraction
+template_registry = TemplateRegistry(app.config['FORM_TEMPLATE_FOLDER'])
+
+# Profiler for on-demand (X-Profile header / ?profile=1) and sampled requests
+request_profiler = RequestProfiler(app.config['PROFILE_FOLDER'],
+                                   sample_rate=app.config['PROFILE_SAMPLE_RATE'],
+                                   top_k=app.config['PROFILE_TOP_K'])
+
+# Streaming recognition sessions for the HTTP fallback (/stream/frame), least recently used first
+app.config['STREAM_MAX_SESSIONS'] = int(os.environ.get('HTR_STREAM_MAX_SESSIONS', '16'))
+app.config['STREAM_IDLE_SECONDS'] = float(os.environ.get('HTR_STREAM_IDLE_SECONDS', '300'))
+stream_sessions = OrderedDict()
+stream_sessions_lock = threading.Lock()
+
+# Load-aware service tiers for /predict
+qos_settings = load_qos_config(CONFIG_PATH)
+if os.environ.get('HTR_QOS') == '0':
+    qos_settings['enabled'] = False
+qos = QoSController(qos_settings)
+qos_requests = METRICS.counter('htr_qos_requests_total', 'Predictions admitted per QoS tier and reason')
+qos_in_flight = METRICS.gauge('htr_qos_in_flight', 'Predictions currently in flight')
+
+# Task queue shared with worker nodes (None: predict in this process)
+task_queue = create_task_queue(app.config['QUEUE_URL']) if app.config['QUEUE_URL'] else None
+
+# Cache size gauges, refreshed when /metrics is scraped
+prediction_cache_size = METRICS.gauge('htr_prediction_cache_entries', 'Entries in the prediction cache')
+region_cache_size = METRICS.gauge('htr_region_cache_entries', 'Entries in the region cache')
+process_rss = METRICS.gauge('htr_process_rss_bytes', 'Resident memory of this worker')
+malloc_bytes = METRICS.gauge('htr_malloc_bytes', 'glibc allocator memory by kind')
+worker_draining = METRICS.gauge('htr_worker_draining', '1 while this worker drains before recycling')
+worker_recycle_due = METRICS.gauge('htr_worker_recycle_due',
+                                   '1 once this worker passed its request budget or memory ceiling')
+
+
+def is_admin_request():
+    """
+    Check the X-Admin-Token header against the configured admin token.
+    
+    Returns:
+        True if an admin token is configured and matches
+    """
+    token = app.config.get('ADMIN_TOKEN')
+    return bool(token) and hmac.compare_digest(request.headers.get('X-Admin-Token', ''), token)
+
+
+def live_region_cache():
+    """The predictor's region cache, or None (also when its inference process has died)."""
+    if not getattr(predictor, 'healthy', True):
+        return None
+    return getattr(predictor, 'region_cache', None)
+
+
+@app.before_request
+def start_request_timing():
+    """Start collecting per-stage timings and, if selected, profiling for this request."""
+    g.request_start = time.perf_counter()
+    METRICS.start_request()
+    # Every endpoint counts, so recycling never cuts off queue waits or WebSocket sessions
+    watchdog.request_started()
+    g.watchdog_counted = True
+    
+    g.profile_session = None
+    if request.endpoint == 'predict':
+        requested = (request.headers.get('X-Profile') == '1' or request.args.get('profile') == '1') \
+            and is_admin_request()
+        g.profile_session = request_profiler.start(f"{request.method} {request.path}", requested=requested)
+
+
+@app.after_request
+def finish_request_timing(response):
+    """
+    Record request metrics and, if requested with ?timings=1, attach the
+    per-stage timing breakdown to JSON responses.
+    """
+    timings = METRICS.end_request()
+    extra = {}
+    
+    session = g.get('profile_session')
+    if session is not None:
+        g.profile_session = None
+        request_profiler.finish(session, status=response.status_code)
+        if session.reason == 'on_demand':
+            extra['profile_id'] = session.profile_id
+    
+    if METRICS.enabled and request.endpoint not in (None, 'static', 'metrics'):
+        elapsed = time.perf_counter() - g.get('request_start', time.perf_counter())
+        METRICS.stage_seconds.observe(elapsed, stage='request', endpoint=request.endpoint)
+        METRICS.requests_total.inc(endpoint=request.endpoint, status=str(response.status_code))
+        
+        wants_timings = (request.args.get('timings') or request.form.get('timings')) in ('1', 'true')
+        if wants_timings:
+            extra['timings'] = timings + [{'stage': 'request', 'ms': round(elapsed * 1000.0, 3)}]
+    
+    if request.endpoint in ('predict', 'predict_batch', 'stream_frame'):
+        watchdog.record_request(g.get('batch_items', 1))
+    
+    if extra and response.is_json:
+        payload = response.get_json()
+        if isinstance(payload, dict):
+            payload.update(extra)
+            response.set_data(json.dumps(payload))
+    return response
+
+
+@app.teardown_request
+def stop_request_profiling(exc):
+    """
+    Make sure an unhandled exception never leaves the profiler running, and
+    recycle a draining worker once its last request has finished.
+    """
+    session = g.get('profile_session')
+    if session is not None:
+        g.profile_session = None
+        request_profiler.finish(session, status=500)
+    
+    if g.pop('watchdog_counted', False):
+        watchdog.request_finished()
+        watchdog.maybe_recycle()
 
 
 def allowed_file(filename):
@@ -59,6 +258,106 @@ def get_file_hash(filepath):
     return hash_md5.hexdigest()
 
 
+def remove_upload(filepath):
+    """
+    Delete an uploaded file, logging instead of failing.
+    
+    Args:
+        filepath: Path to the uploaded file
+    """
+    try:
+        os.remove(filepath)
+    except Exception as e:
+        print(f"Warning: Could not delete file {filepath}: {e}")
+
+
+def overloaded_response():
+    """
+    Response for requests rejected by the cache_only QoS tier.
+    
+    Returns:
+        JSON 503 response with a Retry-After header
+    """
+    response = jsonify({
+        'success': False,
+        'error': 'Server overloaded: only cached results are being served, please retry',
+        'qos_tier': 'cache_only'
+    })
+    response.status_code = 503
+    response.headers['Retry-After'] = '5'
+    return response
+
+
+def wait_for_result(task_id, timeout):
+    """
+    Poll the task queue for a task's result.
+    
+    Args:
+        task_id: Task id returned by the queue
+        timeout: Seconds to wait (0 checks once)
+        
+    Returns:
+        Stored result dictionary, or None if still pending
+    """
+    deadline = time.monotonic() + timeout
+    delay = 0.05
+    while True:
+        stored = task_queue.get_result(task_id)
+        if stored is not None or time.monotonic() >= deadline:
+            return stored
+        time.sleep(min(delay, max(0.0, deadline - time.monotonic())))
+        delay = min(delay * 2, 1.0)
+
+
+def queued_response(task_id, stored, file_hash=None):
+    """
+    Response for a queued prediction.
+    
+    Args:
+        task_id: Task id
+        stored: Result from the queue, or None if still pending
+        file_hash: Upload hash; finished results are cached under it
+        
+    Returns:
+        JSON response: 200 with the text, 202 while pending, 500 if the task failed
+    """
+    if stored is None:
+        response = jsonify({
+            'success': True,
+            'pending': True,
+            'task_id': task_id,
+            'result_url': f'/result/{task_id}'
+        })
+        response.status_code = 202
+        response.headers['Retry-After'] = '1'
+        return response
+    if stored['error'] is not None:
+        return jsonify({
+            'success': False,
+            'task_id': task_id,
+            'error': f"Error processing image: {stored['error']}"
+        }), 500
+    
+    recognized_text = stored['result']['recognized_text']
+    if is_prediction_error(recognized_text):
+        # Results stored before workers failed such tasks
+        return jsonify({
+            'success': False,
+            'task_id': task_id,
+            'error': recognized_text
+        }), 500
+    if file_hash is not None:
+        prediction_cache[file_hash] = recognized_text
+    return jsonify({
+        'success': True,
+        'recognized_text': recognized_text,
+        'cache_hit': False,
+        'qos_tier': 'full',
+        'task_id': task_id,
+        'worker': stored['worker']
+    })
+
+
 @app.route('/')
 def index():
     """
@@ -75,6 +374,18 @@ def predict():
     """
     Handle image upload and perform handwriting recognition.
     
+    If a 'template' form field names a registered form template, only the
+    template's fields are recognized and returned as key/value pairs.
+    
+    Optional 'tier' (full, reduced, minimal, cache_only) and 'deadline_ms'
+    form fields ask for a cheaper service tier; the tier actually served is
+    returned as 'qos_tier'. Under overload, requests that miss the cache are
+    rejected with 503.
+    
+    In queue mode (HTR_QUEUE_URL) the image is handed to a worker node; if
+    the result is not ready within QUEUE_WAIT_SECONDS (or 'async' is 1) the
+    response is 202 with a task id to poll at /result/<task_id>.
+    
     Returns:
         JSON response with recognized text or error message
     """
@@ -101,6 +412,42 @@ def predict():
             'error': f'Invalid file type. Allowed types: {", ".join(app.config["ALLOWED_EXTENSIONS"])}'
         }), 400
     
+    # Resolve the form template, if one was requested
+    template = None
+    template_name = request.form.get('template')
+    if template_name:
+        try:
+            template = template_registry.get(template_name)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        if template is None:
+            return jsonify({
+                'success': False,
+                'error': f'Unknown template: {template_name}'
+            }), 404
+    
+    # Client-requested service tier / latency budget
+    requested_tier = request.form.get('tier') or None
+    if requested_tier is not None and requested_tier not in TIERS:
+        return jsonify({
+            'success': False,
+            'error': f'Invalid tier. Allowed tiers: {", ".join(TIERS)}'
+        }), 400
+    deadline_ms = request.form.get('deadline_ms') or None
+    if deadline_ms is not None:
+        try:
+            deadline_ms = float(deadline_ms)
+            if deadline_ms <= 0:
+                raise ValueError
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'error': 'deadline_ms must be a positive number'
+            }), 400
+    
     try:
         # Create upload folder if it doesn't exist
         os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
@@ -114,15 +461,16 @@ def predict():
             
         # Save the uploaded file
         filename = secure_filename(file.filename)
-        timestamp = str(int(time.time() * 1000))
-        filename = f"{timestamp}_{filename}"
+        # Unique per request: concurrent uploads of the same name must not share a file
+        filename = f"{uuid.uuid4().hex}_{filename}"
         filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
         
         # Ensure the directory exists
         os.makedirs(os.path.dirname(filepath), exist_ok=True)
         
         try:
-            file.save(filepath)
+            with METRICS.stage('upload_receive'):
+                file.save(filepath)
         except Exception as e:
             return jsonify({
                 'success': False,
@@ -136,12 +484,77 @@ def predict():
             }), 500
         
         # Calculate file hash for caching
-        file_hash = get_file_hash(filepath)
+        with METRICS.stage('hash'):
+            file_hash = get_file_hash(filepath)
+        
+        # Template mode: recognize only the declared fields
+        if template is not None:
+            cache_key = f"{template.name}:{file_hash}"
+            with METRICS.stage('cache_lookup', cache='prediction'):
+                cache_hit = cache_key in prediction_cache
+            METRICS.count_cache_lookup('prediction', cache_hit)
+            try:
+                qos_tier = 'full'
+                if cache_hit:
+                    fields = prediction_cache[cache_key]
+                elif predictor is None:
+                    return jsonify({
+                        'success': False,
+                        'error': 'OCR model not initialized'
+                    }), 500
+                elif not hasattr(predictor, 'predict_fields'):
+                    return jsonify({
+                        'success': False,
+                        'error': 'Form templates are not available with this backend'
+                    }), 501
+                else:
+                    with qos.admit(requested_tier, deadline_ms) as ticket:
+                        qos_requests.inc(tier=ticket.tier, reason=ticket.reason)
+                        if ticket.rejected:
+                            return overloaded_response()
+                        fields = predictor.predict_fields(filepath, template)
+                    # Field recognition has no cheaper variant, so the result is cached at any tier
+                    prediction_cache[cache_key] = fields
+                    qos_tier = ticket.tier
+            except ValueError as e:
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 422
+            finally:
+                try:
+                    os.remove(filepath)
+                except Exception as e:
+                    print(f"Warning: Could not delete file {filepath}: {e}")
+            
+            return jsonify({
+                'success': True,
+                'template': template.name,
+                'fields': {name: value['text'] for name, value in fields.items()},
+                'confidence': {name: value['confidence'] for name, value in fields.items()},
+                'cache_hit': cache_hit,
+                'qos_tier': qos_tier
+            })
         
         # Check cache
-        if file_hash in prediction_cache:
-            recognized_text = prediction_cache[file_hash]
+        with METRICS.stage('cache_lookup', cache='prediction'):
+            cached_text = prediction_cache.get(file_hash)
+        METRICS.count_cache_lookup('prediction', cached_text is not None)
+        if cached_text is not None:
+            recognized_text = cached_text
             cache_hit = True
+            qos_tier = 'full'
+        elif task_queue is not None:
+            # Queue mode: a worker node runs the prediction; the image travels in the task
+            with open(filepath, 'rb') as f:
+                payload = f.read()
+            remove_upload(filepath)
+            with METRICS.stage('queue_enqueue'):
+                task_id = task_queue.enqueue(file_hash, app.config['QUEUE_BACKEND'], payload=payload)
+            wait = 0.0 if request.form.get('async') == '1' else app.config['QUEUE_WAIT_SECONDS']
+            with METRICS.stage('queue_wait'):
+                stored = wait_for_result(task_id, wait)
+            return queued_response(task_id, stored, file_hash)
         else:
             # Check if predictor is initialized
             if predictor is None:
@@ -150,24 +563,29 @@ def predict():
                     'error': 'OCR model not initialized'
                 }), 500
                 
-            # Perform prediction
-            recognized_text = predictor.predict(filepath)
+            # Perform prediction at the tier the current load allows
+            with qos.admit(requested_tier, deadline_ms) as ticket:
+                qos_requests.inc(tier=ticket.tier, reason=ticket.reason)
+                if ticket.rejected:
+                    remove_upload(filepath)
+                    return overloaded_response()
+                recognized_text = predictor.predict(filepath, **qos.options_for(ticket.tier, predictor))
+            qos_tier = ticket.tier
             
-            # Store in cache
-            prediction_cache[file_hash] = recognized_text
+            # Only full-quality results are cached, so degraded answers are not reused
+            if qos_tier == 'full' and not is_prediction_error(recognized_text):
+                prediction_cache[file_hash] = recognized_text
             cache_hit = False
         
         # Clean up: delete the uploaded file after processing
-        try:
-            os.remove(filepath)
-        except Exception as e:
-            print(f"Warning: Could not delete file {filepath}: {e}")
+        remove_upload(filepath)
         
         # Return success response
         return jsonify({
             'success': True,
             'recognized_text': recognized_text,
-            'cache_hit': cache_hit
+            'cache_hit': cache_hit,
+            'qos_tier': qos_tier
         })
         
     except Exception as e:
@@ -179,6 +597,420 @@ def predict():
         }), 500
 
 
+def batch_item_error(message):
+    """Per-item result for an image of a batch that could not be recognized."""
+    return {'success': False, 'error': message}
+
+
+def predict_many(images, options):
+    """
+    Recognize decoded images, through the predictor's batch path if it has
+    batched inference (BATCHED_INFERENCE) and one by one otherwise.
+    
+    Args:
+        images: Mapping of key to decoded image
+        options: Predictor keyword arguments for the admitted QoS tier
+        
+    Returns:
+        Mapping of key to recognized text, or to the exception for images that failed
+    """
+    keys = list(images)
+    if not options and getattr(predictor, 'BATCHED_INFERENCE', False):
+        try:
+            with METRICS.stage('batch_predict'):
+                return dict(zip(keys, predictor.predict_batch([images[key] for key in keys])))
+        except Exception as e:
+            # One bad image fails the whole batch call; retry one by one to isolate it
+            print(f"Batch prediction failed, retrying images individually: {e}")
+    
+    texts = {}
+    for key in keys:
+        try:
+            with METRICS.stage('batch_item_predict'):
+                texts[key] = predictor.predict(images[key], **options)
+        except Exception as e:
+            texts[key] = e
+    return texts
+
+
+@app.route('/predict_batch', methods=['POST'])
+def predict_batch():
+    """
+    Recognize many images sent in one framed binary request.
+    
+    The body is a batch frame (model/utils/batch_codec.py). All images are
+    hashed and looked up in the prediction cache at once; the misses are
+    decoded and recognized together through the predictor's batch path,
+    under a single QoS admission ('tier' and 'deadline_ms' query arguments
+    work as for /predict). Results come back in request order, with an
+    error per image that could not be decoded or recognized. Requests
+    sending Accept: application/x-htr-batch-results get a binary frame
+    instead of JSON.
+    
+    Returns:
+        JSON (or binary) response with one result per image
+    """
+    try:
+        with METRICS.stage('upload_receive'):
+            images = decode_batch(request.get_data(cache=False), app.config['BATCH_MAX_ITEMS'])
+    except BatchFormatError as e:
+        return jsonify({
+            'success': False,
+            'error': f'Invalid batch: {e}'
+        }), 400
+    g.batch_items = len(images)
+    
+    requested_tier = request.args.get('tier') or None
+    if requested_tier is not None and requested_tier not in TIERS:
+        return jsonify({
+            'success': False,
+            'error': f'Invalid tier. Allowed tiers: {", ".join(TIERS)}'
+        }), 400
+    deadline_ms = request.args.get('deadline_ms') or None
+    if deadline_ms is not None:
+        try:
+            deadline_ms = float(deadline_ms)
+            if deadline_ms <= 0:
+                raise ValueError
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'error': 'deadline_ms must be a positive number'
+            }), 400
+    
+    if predictor is None and task_queue is None:
+        return jsonify({
+            'success': False,
+            'error': 'OCR model not initialized'
+        }), 500
+    
+    # Bulk cache lookup; duplicates within the batch are recognized once
+    with METRICS.stage('hash'):
+        hashes = [hashlib.md5(data).hexdigest() for data in images]
+    results = [None] * len(images)
+    misses = OrderedDict()
+    with METRICS.stage('cache_lookup', cache='prediction'):
+        for index, file_hash in enumerate(hashes):
+            cached_text = prediction_cache.get(file_hash)
+            METRICS.count_cache_lookup('prediction', cached_text is not None)
+            if cached_text is not None:
+                results[index] = {'success': True, 'recognized_text': cached_text, 'cache_hit': True}
+            else:
+                misses.setdefault(file_hash, []).append(index)
+    
+    qos_tier = 'full'
+    if misses and task_queue is not None:
+        # Queue mode: one task per distinct image, all sharing the wait budget
+        with METRICS.stage('queue_enqueue'):
+            tasks = {file_hash: task_queue.enqueue(file_hash, app.config['QUEUE_BACKEND'],
+                                                   payload=bytes(images[indices[0]]))
+                     for file_hash, indices in misses.items()}
+        deadline = time.monotonic() + app.config['QUEUE_WAIT_SECONDS']
+        with METRICS.stage('queue_wait'):
+            for file_hash, task_id in tasks.items():
+                stored = wait_for_result(task_id, max(0.0, deadline - time.monotonic()))
+                if stored is None:
+                    result = {'success': False, 'pending': True, 'task_id': task_id,
+                              'error': f'pending: poll /result/{task_id}'}
+                elif stored['error'] is not None:
+                    result = batch_item_error(f"Error processing image: {stored['error']}")
+                elif is_prediction_error(stored['result']['recognized_text']):
+                    result = batch_item_error(stored['result']['recognized_text'])
+                else:
+                    text = stored['result']['recognized_text']
+                    prediction_cache[file_hash] = text
+                    result = {'success': True, 'recognized_text': text, 'cache_hit': False}
+                for index in misses[file_hash]:
+                    results[index] = dict(result)
+    elif misses:
+        with METRICS.stage('image_decode'):
+            decoded = OrderedDict()
+            for file_hash, indices in misses.items():
+                image = cv2.imdecode(np.frombuffer(images[indices[0]], dtype=np.uint8), cv2.IMREAD_COLOR)
+                if image is None:
+                    for index in indices:
+                        results[index] = batch_item_error('Could not decode image')
+                else:
+                    decoded[file_hash] = image
+        
+        texts = {}
+        if decoded:
+            with qos.admit(requested_tier, deadline_ms) as ticket:
+                qos_requests.inc(tier=ticket.tier, reason=ticket.reason)
+                if ticket.rejected:
+                    if all(result is None or not result['success'] for result in results):
+                        return overloaded_response()
+                    for file_hash in decoded:
+                        texts[file_hash] = None
+                else:
+                    texts = predict_many(decoded, qos.options_for(ticket.tier, predictor))
+            qos_tier = ticket.tier
+        
+        for file_hash, text in texts.items():
+            if isinstance(text, str) and not is_prediction_error(text) and qos_tier == 'full':
+                prediction_cache[file_hash] = text
+            for index in misses[file_hash]:
+                if text is None:
+                    results[index] = batch_item_error('Server overloaded: only cached results are being served')
+                elif isinstance(text, Exception):
+                    results[index] = batch_item_error(f'Error processing image: {text}')
+                elif is_prediction_error(text):
+                    results[index] = batch_item_error(text)
+                else:
+                    results[index] = {'success': True, 'recognized_text': text, 'cache_hit': False}
+    
+    if RESULTS_CONTENT_TYPE in request.headers.get('Accept', ''):
+        response = Response(encode_results(results), mimetype=RESULTS_CONTENT_TYPE)
+        response.headers['X-QoS-Tier'] = qos_tier
+        return response
+    return jsonify({
+        'success': True,
+        'count': len(results),
+        'failed': sum(1 for result in results if not result['success']),
+        'results': results,
+        'qos_tier': qos_tier
+    })
+
+
+def decode_frame(data):
+    """
+    Decode an encoded image (JPEG/PNG bytes) into a grayscale frame.
+    
+    Args:
+        data: Encoded image bytes
+        
+    Returns:
+        Grayscale NumPy array, or None if the bytes are not an image
+    """
+    if not data:
+        return None
+    return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+
+
+def get_stream_session(session_id=None):
+    """
+    Look up (or create) an HTTP streaming session, expiring idle ones.
+    
+    Args:
+        session_id: Existing session id, or None to start a new session
+        
+    Returns:
+        (session_id, StreamRecognizer), or (session_id, None) for an unknown id
+    """
+    now = time.time()
+    with stream_sessions_lock:
+        for sid in [sid for sid, (_, used) in stream_sessions.items()
+                    if now - used > app.config['STREAM_IDLE_SECONDS']]:
+            del stream_sessions[sid]
+        
+        if session_id is None:
+            session_id = uuid.uuid4().hex
+            stream_sessions[session_id] = (predictor.open_stream(), now)
+            while len(stream_sessions) > app.config['STREAM_MAX_SESSIONS']:
+                stream_sessions.popitem(last=False)
+        elif session_id not in stream_sessions:
+            return session_id, None
+        
+        recognizer, _ = stream_sessions[session_id]
+        stream_sessions[session_id] = (recognizer, now)
+        stream_sessions.move_to_end(session_id)
+        return session_id, recognizer
+
+
+@app.route('/stream/frame', methods=['POST'])
+def stream_frame():
+    """
+    Recognize one frame of a camera / video stream over plain HTTP.
+    
+    Only regions that changed since the session's previous frame are
+    re-recognized. Send the returned 'session' with every following frame;
+    'reset=1' forgets the previous frame and tracked text.
+    
+    Returns:
+        JSON response with the frame's text and tracked regions
+    """
+    if predictor is None:
+        return jsonify({
+            'success': False,
+            'error': 'OCR model not initialized'
+        }), 500
+    if not hasattr(predictor, 'open_stream'):
+        return jsonify({
+            'success': False,
+            'error': 'Streaming is not supported by the loaded model'
+        }), 501
+    
+    if 'file' not in request.files:
+        return jsonify({
+            'success': False,
+            'error': 'No file part in the request'
+        }), 400
+    
+    frame = decode_frame(request.files['file'].read())
+    if frame is None:
+        return jsonify({
+            'success': False,
+            'error': 'Could not decode frame'
+        }), 400
+    
+    session_id, recognizer = get_stream_session(request.form.get('session') or None)
+    if recognizer is None:
+        return jsonify({
+            'success': False,
+            'error': f'Unknown or expired stream session: {session_id}'
+        }), 404
+    
+    if request.form.get('reset') in ('1', 'true'):
+        recognizer.reset()
+    result = recognizer.process(frame)
+    return jsonify(dict(success=True, session=session_id, **result))
+
+
+if SOCK_AVAILABLE:
+    sock = Sock(app)
+    
+    @sock.route('/stream')
+    def stream_socket(ws):
+        """
+        WebSocket streaming recognition.
+        
+        Each binary message is one encoded frame (JPEG/PNG) and is answered
+        with a JSON result; the text message 'reset' starts over.
+        """
+        if predictor is None or not hasattr(predictor, 'open_stream'):
+            ws.send(json.dumps({'success': False, 'error': 'Streaming is not available'}))
+            return
+        
+        recognizer = predictor.open_stream()
+        while True:
+            message = ws.receive()
+            if message is None:
+                break
+            if isinstance(message, str):
+                if message.strip() == 'reset':
+                    recognizer.reset()
+                    ws.send(json.dumps({'success': True, 'reset': True}))
+                continue
+            
+            frame = decode_frame(message)
+            if frame is None:
+                ws.send(json.dumps({'success': False, 'error': 'Could not decode frame'}))
+                continue
+            ws.send(json.dumps(dict(success=True, **recognizer.process(frame))))
+
+
+@app.route('/templates', methods=['GET'])
+def list_templates():
+    """
+    List registered form templates.
+    
+    Returns:
+        JSON response mapping template names to their field names
+    """
+    return jsonify({
+        'success': True,
+        'templates': template_registry.list()
+    })
+
+
+@app.route('/templates', methods=['POST'])
+def register_template():
+    """
+    Register a form template.
+    
+    Expects multipart form data with 'name', a reference image in 'file'
+    and 'fields' as JSON: {"field_name": [x, y, width, height], ...}.
+    Requires X-Admin-Token.
+    
+    Returns:
+        JSON response confirming registration
+    """
+    if not is_admin_request():
+        abort(403)
+    name = request.form.get('name', '')
+    file = request.files.get('file')
+    if file is None or file.filename == '':
+        return jsonify({
+            'success': False,
+            'error': 'No reference image provided'
+        }), 400
+    
+    try:
+        fields = json.loads(request.form.get('fields', ''))
+        if not isinstance(fields, dict) or not fields:
+            raise ValueError('fields must be a non-empty object')
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': f'Invalid fields: {str(e)}'
+        }), 400
+    
+    reference = cv2.imdecode(np.frombuffer(file.read(), dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+    if reference is None:
+        return jsonify({
+            'success': False,
+            'error': 'Could not decode reference image'
+        }), 400
+    
+    try:
+        template = template_registry.register(name, reference, fields)
+    except (ValueError, TypeError) as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    
+    return jsonify({
+        'success': True,
+        'template': template.name,
+        'fields': list(template.fields.keys())
+    })
+
+
+@app.route('/result/<path:task_id>', methods=['GET'])
+def get_result(task_id):
+    """
+    Result of a queued prediction.
+    
+    Args:
+        task_id: Task id returned by /predict
+        
+    Returns:
+        JSON response: 200 when done, 202 while pending, 404 for unknown tasks
+    """
+    if task_queue is None:
+        return jsonify({
+            'success': False,
+            'error': 'Task queue not enabled'
+        }), 404
+    stored = task_queue.get_result(task_id)
+    if stored is None and task_queue.status(task_id) == 'unknown':
+        return jsonify({
+            'success': False,
+            'error': f'Unknown task: {task_id}'
+        }), 404
+    return queued_response(task_id, stored)
+
+
+@app.route('/upload_limits', methods=['GET'])
+def upload_limits():
+    """
+    Limits the web UI applies before uploading (resize, grayscale, re-encode).
+    
+    Returns:
+        JSON response with the maximum upload size and client-side image settings
+    """
+    return jsonify({
+        'success': True,
+        'max_file_bytes': app.config['MAX_CONTENT_LENGTH'],
+        'allowed_extensions': sorted(app.config['ALLOWED_EXTENSIONS']),
+        'max_dimension': app.config['CLIENT_MAX_DIMENSION'],
+        'grayscale': app.config['CLIENT_GRAYSCALE'],
+        'format': 'image/jpeg',
+        'quality': app.config['CLIENT_IMAGE_QUALITY']
+    })
+
+
 @app.route('/health', methods=['GET'])
 def health():
     """
@@ -187,13 +1019,87 @@ def health():
     Returns:
         JSON response with application status
     """
+    region_cache = live_region_cache()
+    # A draining worker fails its health check so the load balancer moves traffic away;
+    # without a process manager a due recycle is only reported in /metrics.
+    # A dead inference process always fails it: nothing in this worker can predict
+    if not getattr(predictor, 'healthy', True):
+        status = 'unhealthy'
+    elif watchdog.draining:
+        status = 'draining'
+    else:
+        status = 'healthy'
+    status_code = 200 if status == 'healthy' else 503
     return jsonify({
-        'status': 'healthy',
+        'status': status,
         'model_loaded': predictor is not None,
-        'cache_size': len(prediction_cache)
+        'cache_size': len(prediction_cache),
+        'region_cache': region_cache.stats() if region_cache is not None else None,
+        'qos': qos.stats(),
+        'queue': task_queue.stats() if task_queue is not None else None,
+        'memory': watchdog.stats()
+    }), status_code
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """
+    Metrics endpoint in Prometheus text exposition format.
+    
+    Returns:
+        Plain-text metrics response
+    """
+    if not METRICS.enabled:
+        return Response("# metrics disabled (HTR_METRICS=0)\n", mimetype='text/plain')
+    
+    region_cache = live_region_cache()
+    prediction_cache_size.set(len(prediction_cache))
+    qos_in_flight.set(qos.stats()['in_flight'])
+    if region_cache is not None:
+        region_cache_size.set(len(region_cache))
+    memory = watchdog.stats()
+    process_rss.set(rss_bytes())
+    for kind, value in (memory['malloc'] or {}).items():
+        malloc_bytes.set(value, kind=kind[:-len('_bytes')])
+    worker_draining.set(1 if memory['draining'] else 0)
+    worker_recycle_due.set(1 if memory['recycle_due'] else 0)
+    
+    return Response(METRICS.render(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/admin/profiles', methods=['GET'])
+def list_profiles():
+    """
+    List stored request profiles, slowest first. Requires X-Admin-Token.
+    
+    Returns:
+        JSON response with profile metadata
+    """
+    if not is_admin_request():
+        abort(403)
+    return jsonify({
+        'success': True,
+        'sample_rate': request_profiler.sample_rate,
+        'profiles': request_profiler.list()
     })
 
 
+@app.route('/admin/profiles/<profile_id>/<kind>', methods=['GET'])
+def download_profile(profile_id, kind):
+    """
+    Download a stored profile artifact (prof, txt, html or trace). Requires X-Admin-Token.
+    
+    Returns:
+        The artifact file
+    """
+    if not is_admin_request():
+        abort(403)
+    name = request_profiler.artifact_name(profile_id, kind)
+    if name is None:
+        abort(404)
+    return send_from_directory(app.config['PROFILE_FOLDER'], name, as_attachment=True)
+
+
 @app.route('/clear_cache', methods=['POST'])
 def clear_cache():
     """
@@ -206,6 +1112,11 @@ def clear_cache():
     cache_size = len(prediction_cache)
     prediction_cache.clear()
     
+    # Also drop cached text regions
+    region_cache = live_region_cache()
+    if region_cache is not None:
+        cache_size += region_cache.clear()
+    
     return jsonify({
         'success': True,
         'message': f'Cache cleared. Removed {cache_size} entries.'
@@ -219,17 +1130,60 @@ def initialize_model():
     """
     global predictor
     
+    if task_queue is not None:
+        print(f"Queue mode: predictions run on workers consuming {app.config['QUEUE_URL']}")
+        return
+    
     try:
-        print("Loading handwriting recognition model...")
-        predictor = create_predictor()  # EasyOCR doesn't need config path
-        print("Model loaded successfully!")
+        # Pin thread pools (and optionally CPUs) for this worker. CPU blocks are picked by
+        # worker index, so without one (gunicorn.conf.py sets it) every worker would
+        # pin to the same CPUs
+        runtime_settings = RUNTIME_CONFIG
+        worker_index = os.environ.get('HTR_WORKER_INDEX')
+        if worker_index is None and runtime_settings.get('pin_cpus'):
+            print("Warning: pin_cpus needs HTR_WORKER_INDEX (set by gunicorn.conf.py); not pinning CPUs")
+            runtime_settings = dict(runtime_settings, pin_cpus=False)
+        applied = apply_runtime_config(runtime_settings, worker_index=int(worker_index or 0))
+        if applied:
+            print(f"Runtime configuration: {applied}")
+        
+        if app.config['BACKEND'] == 'synthetic':
+            from model.mains.synthetic_predictor import create_predictor as create_synthetic_predictor
+            factory = create_synthetic_predictor
+            print("Synthetic latency-profile backend (capacity testing only)")
+        else:
+            print("Loading handwriting recognition model...")
+            # Memory-mapped local weights (scripts/model_store.py) share pages across workers
+            model_store = os.environ.get('HTR_MODEL_STORE') or RUNTIME_CONFIG.get('model_store')
+            # Quantization copies the weights into each worker, so it is off by default with a store
+            quantize = RUNTIME_CONFIG.get('quantize')
+            if quantize is None:
+                quantize = not model_store
+            elif quantize and model_store:
+                print("Note: quantize is on, so model store weights are not shared between workers")
+            factory = functools.partial(create_predictor, model_store=model_store, quantize=bool(quantize))
+        
+        # Out-of-process inference: requests decode their image once into shared memory
+        # and the model process reads it without a copy
+        if os.environ.get('HTR_INFERENCE_PROCESS', '1' if RUNTIME_CONFIG.get('inference_process') else '0') == '1':
+            # If the model process dies, the worker fails /health and is replaced when supervised
+            predictor = InferenceProcess(factory, num_slots=int(RUNTIME_CONFIG['inference_slots']),
+                                         slot_bytes=int(RUNTIME_CONFIG['inference_slot_mb'] * 1024 * 1024),
+                                         timeout=app.config['INFERENCE_TIMEOUT'],
+                                         on_exit=watchdog.request_recycle)
+            atexit.register(predictor.close)
+            print(f"Model loaded in inference process {predictor.pid}")
+        else:
+            predictor = factory()
+            print("Model loaded successfully!")
     except Exception as e:
         print(f"Error loading model: {e}")
         print("Application will continue with limited functionality.")
 
 
 if __name__ == '__main__':
-    # Initialize model before starting the server
+    # Initialize model before starting the server (the only worker, so slot 0)
+    os.environ.setdefault('HTR_WORKER_INDEX', '0')
     initialize_model()
     
     # Run Flask development server
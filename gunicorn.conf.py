@@ -0,0 +1,40 @@
+"""
+Gunicorn settings, picked up automatically by `gunicorn app:app` run from
+the project root.
+
+- workers: the "runtime" section's workers (written by scripts/autotune_threads.py);
+  WEB_CONCURRENCY or -w on the command line still override it
+- every worker gets a slot 0..workers-1 in HTR_WORKER_INDEX, reused when a
+  worker is replaced, so pin_cpus gives each worker its own CPUs
+- the model is loaded in each worker once it has started
+"""
+
+import os
+import sys
+import itertools
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from model.utils.runtime_config import load_runtime_config
+
+RUNTIME_CONFIG = load_runtime_config(os.path.join(ROOT, 'model', 'configs', 'config.json'))
+
+bind = os.environ.get('HTR_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_CONCURRENCY') or RUNTIME_CONFIG.get('workers') or 1)
+
+
+def pre_fork(server, worker):
+    # Runs in the master before the new worker is added to server.WORKERS
+    used = {getattr(w, 'htr_slot', None) for w in server.WORKERS.values()}
+    worker.htr_slot = next(slot for slot in itertools.count() if slot not in used)
+
+
+def post_fork(server, worker):
+    os.environ['HTR_WORKER_INDEX'] = str(worker.htr_slot)
+
+
+def post_worker_init(worker):
+    import app
+    app.initialize_model()
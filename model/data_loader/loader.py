@@ -0,0 +1,160 @@
+"""
+Shard Loader
+Streams shuffled, batched samples from a packed dataset
+(model/data_loader/shards.py). Images are decoded by a thread pool (OpenCV
+releases the GIL while decoding) and a background thread keeps a few
+batches ready, so the predictor rarely waits for input.
+"""
+
+import queue
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Optional, Union
+
+import numpy as np
+
+from model.data_loader.shards import ShardReader
+from model.utils.benchmark import character_error_rate, summarize
+
+
+Batch = namedtuple('Batch', ['images', 'labels', 'indices'])
+
+_END = object()
+
+
+class ShardLoader:
+    """Iterable over batches of (decoded image, label) from a packed dataset."""
+
+    def __init__(self, dataset: Union[str, ShardReader], batch_size: int = 64, shuffle: bool = True,
+                 seed: Optional[int] = None, workers: int = 4, prefetch: int = 2, grayscale: bool = True,
+                 drop_last: bool = False, group_by_width: bool = False, group_window: int = 50,
+                 limit: Optional[int] = None):
+        """
+        Initialize the loader.
+
+        Args:
+            dataset: Packed dataset directory or an open ShardReader
+            batch_size: Samples per batch
+            shuffle: Visit samples in a new random order every epoch
+            seed: Random seed for the shuffle
+            workers: Decoding threads
+            prefetch: Batches decoded ahead of the consumer
+            grayscale: Decode to one channel (BGR otherwise)
+            drop_last: Skip a final batch smaller than batch_size
+            group_by_width: Sort samples of similar width into the same batch
+                (within windows of group_window batches), so width-bucketed models pad less
+            group_window: Batches per sorting window when group_by_width is set
+            limit: Use only the first limit samples of the order
+        """
+        self.reader = dataset if isinstance(dataset, ShardReader) else ShardReader(dataset)
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.workers = max(1, workers)
+        self.prefetch = max(1, prefetch)
+        self.grayscale = grayscale
+        self.drop_last = drop_last
+        self.group_by_width = group_by_width
+        self.group_window = group_window
+        self.limit = limit
+        self._rng = np.random.default_rng(seed)
+
+    def __len__(self) -> int:
+        samples = len(self.reader) if self.limit is None else min(self.limit, len(self.reader))
+        if self.drop_last:
+            return samples // self.batch_size
+        return -(-samples // self.batch_size)
+
+    def batch_indices(self) -> List[np.ndarray]:
+        """Sample numbers of each batch for one epoch."""
+        order = self._rng.permutation(len(self.reader)) if self.shuffle else np.arange(len(self.reader))
+        if self.limit is not None:
+            order = order[:self.limit]
+
+        if self.group_by_width:
+            widths = self.reader.sizes()[:, 1]
+            window = self.batch_size * self.group_window
+            order = np.concatenate([chunk[np.argsort(widths[chunk], kind='stable')]
+                                    for chunk in np.array_split(order, max(1, -(-len(order) // window)))]) \
+                if len(order) else order
+
+        batches = [order[i:i + self.batch_size] for i in range(0, len(order), self.batch_size)]
+        if self.drop_last and batches and len(batches[-1]) < self.batch_size:
+            batches.pop()
+        if self.group_by_width and self.shuffle:
+            # Sorting made neighbouring batches similar; shuffle the batch order again
+            batches = [batches[i] for i in self._rng.permutation(len(batches))]
+        return batches
+
+    def __iter__(self) -> Iterator[Batch]:
+        batches = self.batch_indices()
+        ready = queue.Queue(maxsize=self.prefetch)
+        stop = threading.Event()
+
+        def produce():
+            try:
+                with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                    for indices in batches:
+                        if stop.is_set():
+                            return
+                        images = list(pool.map(lambda i: self.reader.decode(int(i), self.grayscale), indices))
+                        ready.put(Batch(images, [self.reader.labels[i] for i in indices], indices))
+                ready.put(_END)
+            except Exception as e:
+                ready.put(e)
+
+        producer = threading.Thread(target=produce, name='shard-loader', daemon=True)
+        producer.start()
+        try:
+            while True:
+                item = ready.get()
+                if item is _END:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # Consumer stopped early: let the producer finish its current batch and exit
+            stop.set()
+            while producer.is_alive():
+                try:
+                    ready.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+
+
+def evaluate_predictor(predictor, loader: ShardLoader, max_batches: Optional[int] = None) -> dict:
+    """
+    Measure accuracy and throughput of a predictor over a packed dataset.
+
+    Args:
+        predictor: Predictor with predict_batch() (or predict()) accepting decoded images
+        loader: ShardLoader over the evaluation split
+        max_batches: Stop after this many batches
+
+    Returns:
+        benchmark.summarize() dictionary plus 'wait_seconds', the time spent waiting for input
+    """
+    latencies, cers = [], []
+    wait = 0.0
+    start = time.perf_counter()
+    fetch_start = start
+    for number, batch in enumerate(loader):
+        wait += time.perf_counter() - fetch_start
+        batch_start = time.perf_counter()
+        if hasattr(predictor, 'predict_batch'):
+            texts = predictor.predict_batch(batch.images)
+        else:
+            texts = [predictor.predict(image) for image in batch.images]
+        per_image = (time.perf_counter() - batch_start) / len(batch.images)
+        latencies.extend([per_image] * len(batch.images))
+        cers.extend(character_error_rate(label, text) for label, text in zip(batch.labels, texts))
+        fetch_start = time.perf_counter()
+        if max_batches is not None and number + 1 >= max_batches:
+            break
+    elapsed = time.perf_counter() - start
+
+    report = summarize(latencies, elapsed, len(latencies), cers)
+    report['wait_seconds'] = round(wait, 4)
+    return report
@@ -0,0 +1,207 @@
+"""
+Packed Shard Format
+Datasets of many small line/word images are packed once into a few large
+files so evaluation reads contiguous, memory-mappable data instead of
+opening thousands of PNGs.
+
+A dataset directory holds:
+- manifest.json:          shard names, sample count and source
+- <shard>.bin:            encoded images (PNG/JPEG bytes) back to back
+- <shard>.index.npy:      int64 rows of (offset, length, height, width)
+- <shard>.labels.json:    ground-truth text per sample, in index order
+
+Images keep their original encoding, so packing is lossless and the
+shards are about the size of the source files; decoding happens in the
+loader, in parallel (see model/data_loader/loader.py).
+"""
+
+import os
+import json
+import struct
+from typing import Iterable, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+MANIFEST = 'manifest.json'
+
+
+def read_label_file(label_path: str, image_root: Optional[str] = None) -> List[Tuple[str, str]]:
+    """
+    Read a label list with one "<image path> <text>" entry per line.
+
+    Blank lines and lines starting with '#' are skipped. The text is
+    everything after the first whitespace.
+
+    Args:
+        label_path: Path to the label file (e.g. data/train.txt)
+        image_root: Directory image paths are relative to (the label file's directory if None)
+
+    Returns:
+        List of (image path, text)
+    """
+    image_root = image_root if image_root is not None else os.path.dirname(os.path.abspath(label_path))
+    samples = []
+    with open(label_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.rstrip('\n')
+            if not line.strip() or line.startswith('#'):
+                continue
+            parts = line.split(None, 1)
+            path = parts[0] if os.path.isabs(parts[0]) else os.path.join(image_root, parts[0])
+            samples.append((path, parts[1].strip() if len(parts) > 1 else ''))
+    return samples
+
+
+def image_size(data: bytes) -> Tuple[int, int]:
+    """
+    Height and width of an encoded image, read from the PNG header when possible.
+
+    Args:
+        data: Encoded image bytes
+
+    Returns:
+        (height, width)
+    """
+    if data[:8] == b'\x89PNG\r\n\x1a\n' and len(data) >= 24:
+        width, height = struct.unpack('>II', data[16:24])
+        return height, width
+    img = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_UNCHANGED)
+    if img is None:
+        raise ValueError("Could not decode image")
+    return img.shape[0], img.shape[1]
+
+
+def write_shards(samples: Iterable[Tuple[str, str]], out_dir: str, shard_size: int = 4096,
+                 source: str = '') -> dict:
+    """
+    Pack images and labels into shards (the one-time conversion).
+
+    Args:
+        samples: (image path, text) pairs, e.g. from read_label_file
+        out_dir: Dataset directory to write
+        shard_size: Samples per shard
+        source: Description of the source recorded in the manifest
+
+    Returns:
+        Manifest dictionary
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    shards, skipped = [], []
+    total = 0
+
+    def flush(name, index, labels):
+        np.save(os.path.join(out_dir, f'{name}.index.npy'), np.array(index, dtype=np.int64).reshape(-1, 4))
+        with open(os.path.join(out_dir, f'{name}.labels.json'), 'w', encoding='utf-8') as f:
+            json.dump(labels, f, ensure_ascii=False)
+        shards.append({'name': name, 'samples': len(labels)})
+
+    data_file, index, labels, name = None, [], [], None
+    for path, text in samples:
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            height, width = image_size(data)
+        except (OSError, ValueError) as e:
+            print(f"Skipping {path}: {e}")
+            skipped.append(path)
+            continue
+
+        if data_file is None:
+            name = f'{len(shards):05d}'
+            data_file = open(os.path.join(out_dir, f'{name}.bin'), 'wb')
+        index.append((data_file.tell(), len(data), height, width))
+        data_file.write(data)
+        labels.append(text)
+        total += 1
+
+        if len(labels) >= shard_size:
+            data_file.close()
+            flush(name, index, labels)
+            data_file, index, labels = None, [], []
+
+    if data_file is not None:
+        data_file.close()
+        flush(name, index, labels)
+
+    manifest = {'samples': total, 'shards': shards, 'skipped': len(skipped), 'source': source}
+    with open(os.path.join(out_dir, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+class ShardReader:
+    """Random access to the samples of a packed dataset through memory maps."""
+
+    def __init__(self, dataset_dir: str):
+        """
+        Open a packed dataset.
+
+        Args:
+            dataset_dir: Directory written by write_shards
+        """
+        manifest_path = os.path.join(dataset_dir, MANIFEST)
+        if not os.path.exists(manifest_path):
+            raise FileNotFoundError(f"Not a packed dataset (no {MANIFEST}): {dataset_dir}")
+        with open(manifest_path, 'r') as f:
+            self.manifest = json.load(f)
+
+        self.data, self.index, self.labels = [], [], []
+        shard_ids = []
+        for shard_id, shard in enumerate(self.manifest['shards']):
+            base = os.path.join(dataset_dir, shard['name'])
+            index = np.load(base + '.index.npy')
+            with open(base + '.labels.json', 'r', encoding='utf-8') as f:
+                self.labels.extend(json.load(f))
+            # Empty files cannot be memory-mapped
+            self.data.append(np.memmap(base + '.bin', dtype=np.uint8, mode='r') if len(index) else None)
+            self.index.append(index)
+            shard_ids.append(np.full(len(index), shard_id, dtype=np.int32))
+
+        # Global sample number -> (shard, row)
+        self.shard_of = np.concatenate(shard_ids) if shard_ids else np.zeros(0, dtype=np.int32)
+        self.row_of = np.concatenate([np.arange(len(i)) for i in self.index]) if self.index \
+            else np.zeros(0, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.shard_of)
+
+    def sizes(self) -> np.ndarray:
+        """(height, width) of every sample, without decoding anything."""
+        if not self.index:
+            return np.zeros((0, 2), dtype=np.int64)
+        return np.concatenate(self.index)[:, 2:4]
+
+    def encoded(self, i: int) -> np.ndarray:
+        """
+        Encoded bytes of a sample (a view into the memory map).
+
+        Args:
+            i: Sample number
+
+        Returns:
+            uint8 array
+        """
+        shard, row = self.shard_of[i], self.row_of[i]
+        offset, length = self.index[shard][row, :2]
+        return self.data[shard][offset:offset + length]
+
+    def decode(self, i: int, grayscale: bool = True) -> np.ndarray:
+        """
+        Decode one sample's image.
+
+        Args:
+            i: Sample number
+            grayscale: Decode to one channel (BGR otherwise)
+
+        Returns:
+            Image array
+        """
+        img = cv2.imdecode(self.encoded(i), cv2.IMREAD_GRAYSCALE if grayscale else cv2.IMREAD_COLOR)
+        if img is None:
+            raise ValueError(f"Could not decode sample {i}")
+        return img
+
+    def __getitem__(self, i: int) -> Tuple[np.ndarray, str]:
+        return self.decode(i), self.labels[i]
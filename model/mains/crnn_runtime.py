@@ -0,0 +1,151 @@
+"""
+Lightweight CRNN Runtimes
+Run the converted CRNN graph (scripts/convert_crnn.py) without TensorFlow:
+- tflite: TensorFlow Lite interpreter (tflite-runtime or ai-edge-litert),
+  which applies the XNNPACK delegate to float models by default
+- onnx:   ONNX Runtime on the CPU execution provider
+
+Both take the same inputs as the Session graph (image batch and per-sample
+seq_len) and return the same output, so HandwritingPredictor decodes them
+identically. Runtime libraries are imported only when a runtime is created.
+"""
+
+import threading
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+RUNTIME_NAMES = ('tflite', 'onnx')
+
+
+def _split_inputs(names) -> Tuple[int, int]:
+    """Positions of the image and seq_len inputs among the model's input names."""
+    names = list(names)
+    seq_len = [i for i, name in enumerate(names) if 'seq_len' in name]
+    if len(names) != 2 or len(seq_len) != 1:
+        raise ValueError(f"Expected an image and a seq_len input, got {names}")
+    return 1 - seq_len[0], seq_len[0]
+
+
+class TFLiteRuntime:
+    """CRNN on the TensorFlow Lite interpreter."""
+
+    name = 'tflite'
+
+    def __init__(self, model_path: str, num_threads: Optional[int] = None):
+        """
+        Load a .tflite model.
+
+        Args:
+            model_path: Path to the converted model
+            num_threads: Interpreter (and XNNPACK) threads; None lets the runtime decide
+        """
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            from ai_edge_litert.interpreter import Interpreter
+
+        self.interpreter = Interpreter(model_path=model_path, num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        inputs = self.interpreter.get_input_details()
+        image_pos, seq_pos = _split_inputs(d['name'] for d in inputs)
+        self.image_input, self.seq_len_input = inputs[image_pos], inputs[seq_pos]
+        self.output = self.interpreter.get_output_details()[0]
+
+        signature = self.image_input.get('shape_signature', self.image_input['shape'])
+        self.static_width = int(signature[2]) if signature[2] > 0 else None
+        self._shape = tuple(self.image_input['shape'])
+        # The interpreter keeps its tensors between calls, so calls must not overlap
+        self._lock = threading.Lock()
+
+    def run(self, images: np.ndarray, seq_len: np.ndarray) -> np.ndarray:
+        """
+        Run one batch.
+
+        Args:
+            images: Float32 batch (batch, height, width[, channels])
+            seq_len: Valid time steps per sample
+
+        Returns:
+            Model output for the batch
+        """
+        with self._lock:
+            if images.shape != self._shape:
+                self.interpreter.resize_tensor_input(self.image_input['index'], list(images.shape))
+                self.interpreter.resize_tensor_input(self.seq_len_input['index'], [len(seq_len)])
+                self.interpreter.allocate_tensors()
+                self._shape = images.shape
+            self.interpreter.set_tensor(self.image_input['index'], images.astype(self.image_input['dtype']))
+            self.interpreter.set_tensor(self.seq_len_input['index'], seq_len.astype(self.seq_len_input['dtype']))
+            self.interpreter.invoke()
+            return self.interpreter.get_tensor(self.output['index']).copy()
+
+
+class ONNXRuntime:
+    """CRNN on ONNX Runtime."""
+
+    name = 'onnx'
+
+    def __init__(self, model_path: str, num_threads: Optional[int] = None):
+        """
+        Load an .onnx model.
+
+        Args:
+            model_path: Path to the converted model
+            num_threads: Intra-op threads; None lets the runtime decide
+        """
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(model_path, options, providers=['CPUExecutionProvider'])
+
+        inputs = self.session.get_inputs()
+        image_pos, seq_pos = _split_inputs(i.name for i in inputs)
+        self.image_input, self.seq_len_input = inputs[image_pos], inputs[seq_pos]
+        self.seq_len_dtype = np.int64 if 'int64' in self.seq_len_input.type else np.int32
+        self.output_name = self.session.get_outputs()[0].name
+
+        width = self.image_input.shape[2]
+        self.static_width = width if isinstance(width, int) else None
+
+    def run(self, images: np.ndarray, seq_len: np.ndarray) -> np.ndarray:
+        """
+        Run one batch.
+
+        Args:
+            images: Float32 batch (batch, height, width[, channels])
+            seq_len: Valid time steps per sample
+
+        Returns:
+            Model output for the batch
+        """
+        return self.session.run([self.output_name], {
+            self.image_input.name: images.astype(np.float32),
+            self.seq_len_input.name: seq_len.astype(self.seq_len_dtype),
+        })[0]
+
+
+def create_runtime(name: str, model_path: str, num_threads: Optional[int] = None):
+    """
+    Load a converted CRNN model in a lightweight runtime.
+
+    Args:
+        name: 'tflite' or 'onnx'
+        model_path: Path to the converted model
+        num_threads: Inference threads
+
+    Returns:
+        Runtime with run(images, seq_len)
+
+    Raises:
+        ImportError: If the runtime library is not installed
+    """
+    if name == 'tflite':
+        return TFLiteRuntime(model_path, num_threads)
+    if name == 'onnx':
+        return ONNXRuntime(model_path, num_threads)
+    raise ValueError(f"Unknown CRNN runtime: {name}. Choose from {', '.join(RUNTIME_NAMES)}")
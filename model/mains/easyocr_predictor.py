@@ -5,8 +5,21 @@ Works with Python 3.13!
 """
 
 import os
+import threading
 import easyocr
 import numpy as np
+from collections import Counter
+from typing import Optional, Union
+from easyocr.utils import reformat_input
+
+from model.utils.region_cache import RegionCache
+from model.utils.metrics import METRICS
+from model.utils.model_store import load_easyocr_reader
+from model.utils.stream_recognizer import StreamRecognizer
+from model.utils.tiling import detect_tiled, reading_lines, image_pixels
+
+# Text regions recognized per batch in tiled mode
+RECOGNITION_BATCH = 64
 
 
 class EasyOCRPredictor:
@@ -15,9 +28,41 @@ class EasyOCRPredictor:
     Works offline after first model download (~500MB).
     """
     
-    def __init__(self):
-        """Initialize the EasyOCR predictor."""
+    # predict() keyword arguments per QoS tier (see model/utils/qos.py)
+    QOS_TIERS = {
+        'full': {},
+        'reduced': {'max_strategies': 2},
+        'minimal': {'max_strategies': 1, 'mag_ratio': 1.0},
+    }
+    
+    def __init__(self, region_cache_size: int = 10000, model_store: Optional[str] = None,
+                 quantize: bool = True, tile_threshold: Optional[int] = 16_000_000,
+                 tile_size: int = 1024, tile_overlap: int = 128, tile_workers: int = 1):
+        """
+        Initialize the EasyOCR predictor.
+        
+        Args:
+            region_cache_size: Maximum number of cached text regions (0 disables the cache)
+            model_store: Local model store (scripts/model_store.py prepare) to load
+                memory-mapped weights from instead of EasyOCR's download directory
+            quantize: Apply EasyOCR's dynamic int8 quantization
+            tile_threshold: Images with more pixels than this use predict_tiled()
+                (None disables automatic tiling)
+            tile_size: Tile edge length for tiled mode
+            tile_overlap: Pixels shared by neighbouring tiles
+            tile_workers: Tiles detected in parallel in tiled mode
+        """
         self.reader = None
+        self.tile_threshold = tile_threshold
+        self.tile_size = tile_size
+        self.tile_overlap = tile_overlap
+        self.tile_workers = tile_workers
+        self.model_store = model_store
+        self.quantize = quantize
+        # How often each strategy produced the chosen result (drives reduced QoS tiers)
+        self.strategy_wins = Counter()
+        self._wins_lock = threading.Lock()
+        self.region_cache = RegionCache(region_cache_size) if region_cache_size > 0 else None
         print("EasyOCR Predictor initialized")
     
     def setup(self):
@@ -34,7 +79,10 @@ class EasyOCRPredictor:
             # Initialize EasyOCR reader for English
             # gpu=False for CPU-only processing (works everywhere)
             # You can add more languages: ['en', 'ch_sim', 'fr', etc.]
-            self.reader = easyocr.Reader(['en'], gpu=False, verbose=False)
+            if self.model_store:
+                self.reader = load_easyocr_reader(self.model_store, quantize=self.quantize)
+            else:
+                self.reader = easyocr.Reader(['en'], gpu=False, verbose=False, quantize=self.quantize)
             
             print("SUCCESS: EasyOCR model loaded successfully!")
             print("The app now has REAL handwriting recognition!")
@@ -44,12 +92,17 @@ class EasyOCRPredictor:
             print("Falling back to mock mode")
             self.reader = None
     
-    def predict(self, image_path: str, return_debug: bool = False):
+    def predict(self, image_path: Union[str, np.ndarray], return_debug: bool = False,
+                max_strategies: Optional[int] = None, mag_ratio: Optional[float] = None):
         """
         Predict handwritten text from an image using EasyOCR.
         
         Args:
-            image_path: Path to the image file
+            image_path: Path to the image file, or a decoded image
+                (BGR or grayscale NumPy array, e.g. a shared-memory view)
+            return_debug: Also return per-strategy debug information
+            max_strategies: Run only this many of the historically best strategies
+            mag_ratio: Override the detection mag_ratio of every strategy
             
         Returns:
             Recognized text string
@@ -59,21 +112,33 @@ class EasyOCRPredictor:
             return "Mock prediction: EasyOCR not loaded"
 
         # Verify file exists and is readable
-        if not os.path.exists(image_path):
+        is_array = isinstance(image_path, np.ndarray)
+        if not is_array and not os.path.exists(image_path):
             raise FileNotFoundError(f"Image file not found: {image_path}")
 
         import cv2
 
+        # Very large scans would build a huge CRAFT input; process them in tiles
+        if self.tile_threshold is not None and image_pixels(image_path) > self.tile_threshold:
+            text = self.predict_tiled(image_path)
+            if return_debug:
+                return text, [{"strategy": "tiled", "text": text}]
+            return text
+
         # Bind reader to local variable to satisfy static checks
         reader = self.reader
         assert reader is not None
 
         # Helper: run reader with detail=1 to get confidences
-        def run_read(path, **kwargs):
+        def run_read(path, strategy, **kwargs):
             try:
-                return reader.readtext(path, detail=1, **kwargs)
+                if self.region_cache is not None:
+                    return self._read_cached(path, strategy=strategy, **kwargs)
+                with METRICS.stage('readtext', strategy=strategy):
+                    return reader.readtext(path, detail=1, **kwargs)
             except Exception as e:
-                print(f"EasyOCR readtext error for {path} with {kwargs}: {e}")
+                source = 'array' if isinstance(path, np.ndarray) else path
+                print(f"EasyOCR readtext error for {source} with {kwargs}: {e}")
                 return []
 
         # Helper: extract text and confidence from various item shapes
@@ -98,41 +163,72 @@ class EasyOCRPredictor:
             else:
                 return (None, 0.0)
 
-        # Strategy list: tuples of (description, path_to_check, kwargs)
-        strategies = []
+        # Strategy plan: (name, source image, mag_ratio)
+        plan = [
+            # Strategy A: original image, moderate mag_ratio
+            ("original_mag1.5", 'original', 1.5),
+            # Strategy B: original image, higher mag_ratio (good for small text)
+            ("original_mag2.0", 'original', 2.0),
+            # Strategies C/D: adaptive thresholding and try again
+            ("preprocessed_mag1.5", 'preprocessed', 1.5),
+            ("preprocessed_mag2.0", 'preprocessed', 2.0),
+        ]
+        if max_strategies is not None and max_strategies < len(plan):
+            # Reduced QoS tiers keep only the strategies that won most often
+            plan = self.ranked_strategies(plan)[:max(1, max_strategies)]
 
-        # Strategy A: original image, moderate mag_ratio
-        strategies.append(("original_mag1.5", image_path, {"paragraph": False, "mag_ratio": 1.5}))
-
-        # Strategy B: original image, higher mag_ratio (good for small text)
-        strategies.append(("original_mag2.0", image_path, {"paragraph": False, "mag_ratio": 2.0}))
-
-        # Preprocess: adaptive thresholding and try again
+        # Preprocess: adaptive thresholding (only when a planned strategy needs it)
+        preprocessed = None
         preprocessed_path = None
-        try:
-            img = cv2.imread(image_path, cv2.IMREAD_COLOR)
-            if img is not None:
-                gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-                # Denoise and equalize
-                blur = cv2.GaussianBlur(gray, (3, 3), 0)
-                eq = cv2.equalizeHist(blur)
-                binary = cv2.adaptiveThreshold(eq, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-                                               cv2.THRESH_BINARY, 15, 3)
-                preprocessed_path = image_path + '.proc.png'
-                cv2.imwrite(preprocessed_path, binary)
-                strategies.append(("preprocessed_mag1.5", preprocessed_path, {"paragraph": False, "mag_ratio": 1.5}))
-                strategies.append(("preprocessed_mag2.0", preprocessed_path, {"paragraph": False, "mag_ratio": 2.0}))
-        except Exception as e:
-            print(f"Preprocessing error: {e}")
-            preprocessed_path = None
+        if any(source == 'preprocessed' for _, source, _ in plan):
+            try:
+                if is_array:
+                    img = image_path
+                else:
+                    with METRICS.stage('image_decode'):
+                        img = cv2.imread(image_path, cv2.IMREAD_COLOR)
+                if img is not None:
+                    with METRICS.stage('preprocess'):
+                        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+                        # Denoise and equalize
+                        blur = cv2.GaussianBlur(gray, (3, 3), 0)
+                        eq = cv2.equalizeHist(blur)
+                        binary = cv2.adaptiveThreshold(eq, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                                                       cv2.THRESH_BINARY, 15, 3)
+                    # In-memory images are passed straight to EasyOCR; paths keep the temp file
+                    preprocessed = binary
+                    if not is_array:
+                        preprocessed_path = image_path + '.proc.png'
+                        cv2.imwrite(preprocessed_path, binary)
+                        preprocessed = preprocessed_path
+            except Exception as e:
+                print(f"Preprocessing error: {e}")
+                preprocessed = None
+                preprocessed_path = None
+
+        # Strategy list: tuples of (plan name, description, path_to_check, kwargs)
+        strategies = []
+        for name, source, mag in plan:
+            path = image_path if source == 'original' else preprocessed
+            if path is None:
+                continue
+            if mag_ratio is not None:
+                mag = mag_ratio
+            strategies.append((name, f"{source}_mag{mag}", path, {"paragraph": False, "mag_ratio": mag}))
+        if not strategies:
+            # Preprocessing failed and only preprocessed strategies were planned
+            mag = mag_ratio if mag_ratio is not None else 1.5
+            strategies.append(("original_mag1.5", f"original_mag{mag}", image_path,
+                               {"paragraph": False, "mag_ratio": mag}))
 
         # Try each strategy and pick the best by average confidence
         best_text = None
         best_conf = -1.0
+        best_name = None
         debug_info = []
 
-        for desc, path, kwargs in strategies:
-            results = run_read(path, **kwargs)
+        for name, desc, path, kwargs in strategies:
+            results = run_read(path, desc, **kwargs)
             # results: list of [bbox, text, confidence]
             texts = []
             confs = []
@@ -155,6 +251,11 @@ class EasyOCRPredictor:
             if joined and avg_conf > best_conf:
                 best_conf = avg_conf
                 best_text = joined
+                best_name = name
+
+        if best_name is not None:
+            with self._wins_lock:
+                self.strategy_wins[best_name] += 1
 
         # Clean up preprocessed file if created
         try:
@@ -175,12 +276,288 @@ class EasyOCRPredictor:
                 return "(No text detected in image)", debug_info
             return "(No text detected in image)"
     
+    def ranked_strategies(self, plan: list) -> list:
+        """
+        Order strategies by how often they produced the chosen result.
+        
+        Args:
+            plan: List of (name, source, mag_ratio) tuples
+            
+        Returns:
+            The plan sorted by wins, original order breaking ties
+        """
+        with self._wins_lock:
+            wins = dict(self.strategy_wins)
+        return sorted(plan, key=lambda step: -wins.get(step[0], 0))
+    
+    def _read_cached(self, path, paragraph: bool = False, mag_ratio: float = 1.0,
+                     strategy: str = 'default'):
+        """
+        Equivalent of reader.readtext(detail=1) that reuses cached regions.
+        
+        Text regions are detected as usual, but recognition only runs on
+        crops that are not already in the region cache.
+        
+        Args:
+            path: Path to the image file or decoded image array
+            paragraph: Passed through to EasyOCR recognition
+            mag_ratio: Detection magnification ratio
+            strategy: Strategy name used to label stage timings
+            
+        Returns:
+            List of [bbox, text, confidence] in readtext order
+        """
+        reader = self.reader
+        region_cache = self.region_cache
+        assert reader is not None and region_cache is not None
+        
+        with METRICS.stage('image_decode'):
+            img, img_cv_grey = reformat_input(path)
+        with METRICS.stage('detection', strategy=strategy):
+            horizontal_list, free_list = reader.detect(img, mag_ratio=mag_ratio, reformat=False)
+        horizontal_list, free_list = horizontal_list[0], free_list[0]
+        
+        max_y, max_x = img_cv_grey.shape
+        results = []
+        misses = []
+        with METRICS.stage('cache_lookup', cache='region'):
+            for box in horizontal_list:
+                # Clip the same way EasyOCR does before cropping
+                x_min, x_max = max(0, box[0]), min(box[1], max_x)
+                y_min, y_max = max(0, box[2]), min(box[3], max_y)
+                bbox = [[x_min, y_min], [x_max, y_min], [x_max, y_max], [x_min, y_max]]
+                key = region_cache.key_for(img_cv_grey[y_min:y_max, x_min:x_max])
+                cached = region_cache.get(key)
+                METRICS.count_cache_lookup('region', cached is not None)
+                if cached is not None:
+                    results.append([bbox, cached[0], cached[1]])
+                else:
+                    slot = [bbox, None, 0.0]
+                    results.append(slot)
+                    misses.append((box, key, slot))
+        
+        # Recognize all novel regions in a single pass
+        if misses:
+            with METRICS.stage('recognition', strategy=strategy):
+                recognized = reader.recognize(img_cv_grey, horizontal_list=[m[0] for m in misses],
+                                              free_list=[], detail=1, paragraph=False, reformat=False)
+            by_bbox = {}
+            for bbox, text, conf in recognized:
+                by_bbox.setdefault(tuple(tuple(int(v) for v in pt) for pt in bbox), []).append((text, conf))
+            for _, key, slot in misses:
+                found = by_bbox.get(tuple(tuple(int(v) for v in pt) for pt in slot[0]))
+                if found:
+                    slot[1], slot[2] = found.pop(0)
+                    region_cache.put(key, slot[1], slot[2])
+        
+        results = [item for item in results if item[1] is not None]
+        
+        # Rotated regions are rare on forms; recognize them without caching
+        if free_list:
+            with METRICS.stage('recognition', strategy=strategy):
+                results += reader.recognize(img_cv_grey, horizontal_list=[], free_list=free_list,
+                                            detail=1, paragraph=False, reformat=False)
+        
+        # readtext returns horizontal and free regions sorted together by top edge
+        results.sort(key=lambda item: item[0][0][1])
+        
+        if paragraph:
+            from easyocr.utils import get_paragraph
+            results = get_paragraph(results)
+        
+        return results
+    
+    def predict_fields(self, image_path: Union[str, np.ndarray], template) -> dict:
+        """
+        Extract the declared fields of a form template from an image.
+
+        The page is aligned to the template reference and only the field
+        regions are recognized, in a single batched recognition pass.
+
+        Args:
+            image_path: Path to the image file, or a decoded image
+            template: FormTemplate describing the form layout
+
+        Returns:
+            Dictionary mapping field name to {'text': str, 'confidence': float}
+        """
+        if self.reader is None:
+            return {name: {'text': "Mock prediction: EasyOCR not loaded", 'confidence': 0.0}
+                    for name in template.fields}
+
+        import cv2
+
+        if isinstance(image_path, np.ndarray):
+            page = cv2.cvtColor(image_path, cv2.COLOR_BGR2GRAY) if image_path.ndim == 3 else image_path
+        else:
+            if not os.path.exists(image_path):
+                raise FileNotFoundError(f"Image file not found: {image_path}")
+            with METRICS.stage('image_decode'):
+                page = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+        if page is None:
+            raise ValueError(f"Could not read image: {image_path}")
+        with METRICS.stage('alignment', template=template.name):
+            aligned = template.align(page)
+
+        field_boxes = template.field_boxes()
+        recognized = self.recognize_boxes(aligned, [box for _, box in field_boxes])
+        return {name: {'text': text, 'confidence': conf}
+                for (name, _), (text, conf) in zip(field_boxes, recognized)}
+
+    def detect_boxes(self, gray: np.ndarray, mag_ratio: float = 1.0) -> list:
+        """
+        Detect text boxes in a grayscale image.
+        
+        Args:
+            gray: Grayscale image
+            mag_ratio: Detection magnification ratio
+            
+        Returns:
+            List of [x_min, x_max, y_min, y_max] boxes (rotated boxes as their bounds)
+        """
+        if self.reader is None:
+            # Mock mode: treat the whole image as one region
+            return [[0, gray.shape[1], 0, gray.shape[0]]]
+        
+        import cv2
+        
+        with METRICS.stage('detection', strategy='boxes'):
+            horizontal_list, free_list = self.reader.detect(cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR),
+                                                            mag_ratio=mag_ratio, reformat=False)
+        boxes = [[int(v) for v in box] for box in horizontal_list[0]]
+        for points in free_list[0]:
+            xs = [p[0] for p in points]
+            ys = [p[1] for p in points]
+            boxes.append([int(min(xs)), int(max(xs)), int(min(ys)), int(max(ys))])
+        return boxes
+    
+    def recognize_boxes(self, gray: np.ndarray, boxes: list) -> list:
+        """
+        Recognize the text in given boxes with one batched pass,
+        reusing the region cache for boxes seen before.
+        
+        Args:
+            gray: Grayscale image
+            boxes: List of [x_min, x_max, y_min, y_max] boxes
+            
+        Returns:
+            List of (text, confidence) in the order of boxes
+        """
+        if self.reader is None:
+            return [("Mock prediction: EasyOCR not loaded", 0.0) for _ in boxes]
+        
+        results = [('', 0.0)] * len(boxes)
+        misses = []
+        with METRICS.stage('cache_lookup', cache='region'):
+            for i, box in enumerate(boxes):
+                x_min, x_max, y_min, y_max = box
+                key = None
+                if self.region_cache is not None:
+                    key = self.region_cache.key_for(gray[max(0, y_min):y_max, max(0, x_min):x_max])
+                    cached = self.region_cache.get(key)
+                    METRICS.count_cache_lookup('region', cached is not None)
+                    if cached is not None:
+                        results[i] = cached
+                        continue
+                misses.append((i, box, key))
+        
+        if misses:
+            with METRICS.stage('recognition', strategy='boxes'):
+                recognized = self.reader.recognize(gray, horizontal_list=[m[1] for m in misses],
+                                                   free_list=[], detail=1, paragraph=False, reformat=False)
+            by_bbox = {}
+            for bbox, text, conf in recognized:
+                by_bbox.setdefault((int(bbox[0][0]), int(bbox[2][0]), int(bbox[0][1]), int(bbox[2][1])),
+                                   []).append((text, conf))
+            max_y, max_x = gray.shape
+            for i, box, key in misses:
+                # Recognition reports boxes clipped to the image
+                clipped = (max(0, box[0]), min(box[1], max_x), max(0, box[2]), min(box[3], max_y))
+                found = by_bbox.get(clipped)
+                if found:
+                    text, conf = found.pop(0)
+                    results[i] = (str(text).strip(), float(conf))
+                    if self.region_cache is not None:
+                        self.region_cache.put(key, results[i][0], results[i][1])
+        
+        return results
+    
+    def predict_tiled(self, image_path: Union[str, np.ndarray], mag_ratio: float = 1.5,
+                      tile_size: Optional[int] = None, overlap: Optional[int] = None,
+                      workers: Optional[int] = None, return_regions: bool = False):
+        """
+        Recognize a very large image tile by tile with bounded memory.
+        
+        Detection runs on overlapping tiles (at most `workers` at a time),
+        boxes cut by tile seams are merged and de-duplicated, and the text
+        regions are recognized in batches and returned in reading order.
+        
+        Args:
+            image_path: Path to the image file or a decoded image
+            mag_ratio: Detection magnification ratio per tile
+            tile_size: Tile edge length (predictor default if None)
+            overlap: Pixels shared by neighbouring tiles (predictor default if None)
+            workers: Tiles detected in parallel (predictor default if None)
+            return_regions: Also return the list of {'box', 'text', 'confidence'}
+            
+        Returns:
+            Recognized text, one line per text line (and the regions if requested)
+        """
+        if self.reader is None:
+            text = "Mock prediction: EasyOCR not loaded"
+            return (text, []) if return_regions else text
+        
+        import cv2
+        
+        with METRICS.stage('image_decode'):
+            if isinstance(image_path, np.ndarray):
+                gray = cv2.cvtColor(image_path, cv2.COLOR_BGR2GRAY) if image_path.ndim == 3 else image_path
+            else:
+                # Decode straight to one byte per pixel
+                gray = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+        if gray is None:
+            raise ValueError(f"Could not read image: {image_path}")
+        
+        boxes = detect_tiled(gray, lambda tile: self.detect_boxes(tile, mag_ratio=mag_ratio),
+                             tile_size=tile_size or self.tile_size,
+                             overlap=overlap if overlap is not None else self.tile_overlap,
+                             workers=workers or self.tile_workers)
+        
+        # Recognize in batches so crop buffers stay small
+        regions = []
+        for start in range(0, len(boxes), RECOGNITION_BATCH):
+            batch = boxes[start:start + RECOGNITION_BATCH]
+            for box, (text, conf) in zip(batch, self.recognize_boxes(gray, batch)):
+                if text:
+                    regions.append({'box': box, 'text': text, 'confidence': conf})
+        
+        lines = reading_lines([r['box'] for r in regions])
+        text = '\n'.join(' '.join(regions[i]['text'] for i in line) for line in lines)
+        if not text:
+            text = "(No text detected in image)"
+        return (text, regions) if return_regions else text
+    
+    def open_stream(self, **kwargs):
+        """
+        Start a streaming recognition session for camera / video frames.
+        
+        Args:
+            **kwargs: StreamRecognizer options (diff_threshold, stable_frames, ...)
+            
+        Returns:
+            StreamRecognizer; call process(frame) for every frame
+        """
+        return StreamRecognizer(self.detect_boxes, self.recognize_boxes, **kwargs)
+    
     def predict_batch(self, image_paths: list) -> list:
         """
-        Predict text from multiple images.
+        Predict text from multiple images, one after the other.
+        
+        EasyOCR's multi-strategy read works on one image at a time, so there
+        is no batched inference here (BATCHED_INFERENCE is not set).
         
         Args:
-            image_paths: List of image file paths
+            image_paths: List of image file paths or decoded images
             
         Returns:
             List of recognized text strings
@@ -188,14 +565,25 @@ class EasyOCRPredictor:
         return [self.predict(path) for path in image_paths]
 
 
-def create_predictor():
+def create_predictor(region_cache_size: int = 10000, model_store: Optional[str] = None,
+                     quantize: bool = True, tile_threshold: Optional[int] = 16_000_000,
+                     tile_workers: int = 1):
     """
     Factory function to create and setup an EasyOCR predictor.
     
+    Args:
+        region_cache_size: Maximum number of cached text regions (0 disables the cache)
+        model_store: Local model store directory with memory-mapped weights
+        quantize: Apply EasyOCR's dynamic int8 quantization
+        tile_threshold: Pixel count above which images are processed in tiles
+        tile_workers: Tiles detected in parallel in tiled mode
+    
     Returns:
         Initialized EasyOCRPredictor instance
     """
-    predictor = EasyOCRPredictor()
+    predictor = EasyOCRPredictor(region_cache_size=region_cache_size, model_store=model_store,
+                                 quantize=quantize, tile_threshold=tile_threshold,
+                                 tile_workers=tile_workers)
     predictor.setup()
     return predictor
 
@@ -6,21 +6,31 @@ Based on the arshjot/Handwritten-Text-Recognition repository.
 
 import os
 import json
+import bisect
+import importlib.util
+from collections import OrderedDict
 import numpy as np
 import cv2
-from typing import Optional, List
+from typing import Optional, List, Tuple, Union
 
-# Try to import TensorFlow, but gracefully handle if not available
-try:
-    import tensorflow as tf
-    # Enable TensorFlow 1.x compatibility mode
-    tf.compat.v1.disable_eager_execution()
-    tf.compat.v1.disable_v2_behavior()
-    TF_AVAILABLE = True
-except ImportError:
-    print("WARNING: TensorFlow not available. Running in mock mode.")
-    TF_AVAILABLE = False
-    tf = None
+from model.utils.metrics import METRICS
+from model.mains.crnn_runtime import create_runtime, RUNTIME_NAMES
+
+# TensorFlow is imported on first use: only the Session backend needs it, and
+# importing it (with v1 behaviour switched on) dominates startup time
+TF_AVAILABLE = importlib.util.find_spec('tensorflow') is not None
+tf = None
+
+
+def _import_tf():
+    """Import TensorFlow in TF1 compatibility mode (once)."""
+    global tf
+    if tf is None:
+        import tensorflow
+        tensorflow.compat.v1.disable_eager_execution()
+        tensorflow.compat.v1.disable_v2_behavior()
+        tf = tensorflow
+    return tf
 
 
 class HandwritingPredictor:
@@ -29,6 +39,9 @@ class HandwritingPredictor:
     Loads a pretrained TensorFlow model and performs inference on images.
     """
     
+    # predict_batch() runs lines of similar width through the model together
+    BATCHED_INFERENCE = True
+    
     def __init__(self, config_path: str):
         """
         Initialize the predictor with configuration.
@@ -44,10 +57,24 @@ class HandwritingPredictor:
         self.img_width = self.config.get('image_width', 128)
         self.num_channels = self.config.get('num_channels', 1)
         
+        # Variable-width input: lines keep their aspect ratio at img_height and are
+        # padded up to the nearest bucket width (empty/null: fixed img_width squash)
+        self.width_buckets = sorted(self.config.get('width_buckets') or [])
+        # The CNN downsamples the width by this factor into CTC time steps
+        self.width_downsample = self.config.get('width_downsample', 4)
+        self.batch_size = self.config.get('inference_batch_size', 32)
+        # Layout of dense model output: (time, batch, classes) if true, else (batch, time, classes)
+        self.output_time_major = bool(self.config.get('output_time_major', False))
+        
         # Character list for decoding
         self.char_list = self.config.get('char_list', '')
         self.num_classes = len(self.char_list) + 1  # +1 for blank
         
+        # 'auto' uses a converted TFLite/ONNX model when one exists (scripts/convert_crnn.py),
+        # otherwise the TensorFlow Session; 'session', 'tflite' or 'onnx' force one
+        self.inference_backend = self.config.get('inference_backend', 'auto')
+        self.runtime = None
+        
         # Model placeholders
         self.session = None
         self.input_tensor = None
@@ -65,14 +92,18 @@ class HandwritingPredictor:
     
     def setup(self):
         """
-        Load the TensorFlow model and prepare for inference.
+        Load the model and prepare for inference.
         This should be called once during application startup.
         """
+        if self.inference_backend != 'session' and self._load_runtime():
+            return
+        
         # Check if TensorFlow is available
         if not TF_AVAILABLE:
             print("WARNING: TensorFlow not installed. Using mock predictor.")
             self._use_mock_model()
             return
+        _import_tf()
         
         model_path = self.config.get('model_path', 'model/models/best_model')
         
@@ -87,8 +118,12 @@ class HandwritingPredictor:
             # Reset default graph
             tf.compat.v1.reset_default_graph()
             
-            # Create TensorFlow session
-            self.session = tf.compat.v1.Session()
+            # Create TensorFlow session with the configured thread pools
+            runtime = self.config.get('runtime', {})
+            session_config = tf.compat.v1.ConfigProto(
+                intra_op_parallelism_threads=runtime.get('tf_intra_op_threads') or 0,
+                inter_op_parallelism_threads=runtime.get('tf_inter_op_threads') or 0)
+            self.session = tf.compat.v1.Session(config=session_config)
             
             # Load the saved model
             saver = tf.compat.v1.train.import_meta_graph(model_path + '.meta')
@@ -100,6 +135,13 @@ class HandwritingPredictor:
             self.seq_len_tensor = graph.get_tensor_by_name('seq_len:0')
             self.output_tensor = graph.get_tensor_by_name('output:0')
             
+            # A graph exported with a static input width cannot take bucketed input
+            static_width = self.input_tensor.shape.as_list()[2] if self.input_tensor.shape.rank else None
+            if self.width_buckets and static_width is not None:
+                print(f"WARNING: Model input width is fixed at {static_width}; width buckets disabled")
+                self.width_buckets = []
+                self.img_width = static_width
+            
             print(f"SUCCESS: Model loaded successfully from {model_path}")
             
         except Exception as e:
@@ -107,41 +149,130 @@ class HandwritingPredictor:
             print("Using mock predictor for demonstration.")
             self._use_mock_model()
     
+    def _load_runtime(self) -> bool:
+        """
+        Load a converted model into a lightweight runtime.
+        
+        Returns:
+            True if a runtime was loaded
+        """
+        names = RUNTIME_NAMES if self.inference_backend == 'auto' else (self.inference_backend,)
+        threads = self.config.get('runtime', {}).get('tf_intra_op_threads')
+        for name in names:
+            model_path = self.config.get(f'{name}_model_path')
+            if not model_path or not os.path.exists(model_path):
+                if self.inference_backend != 'auto':
+                    print(f"WARNING: {name} model not found at {model_path}; run scripts/convert_crnn.py")
+                continue
+            try:
+                self.runtime = create_runtime(name, model_path, threads)
+            except Exception as e:
+                print(f"WARNING: Could not load {name} model: {e}")
+                continue
+            
+            if self.width_buckets and self.runtime.static_width is not None:
+                print(f"WARNING: Model input width is fixed at {self.runtime.static_width}; width buckets disabled")
+                self.width_buckets = []
+                self.img_width = self.runtime.static_width
+            print(f"SUCCESS: Model loaded successfully from {model_path} ({name})")
+            return True
+        
+        if self.inference_backend != 'auto':
+            print("Falling back to the TensorFlow Session backend.")
+        return False
+    
     def _use_mock_model(self):
         """Use a mock model when the actual model is not available."""
         self.session = None
         print("MOCK MODE: Mock model activated - will return sample predictions")
     
-    def preprocess_image(self, image_path: str) -> np.ndarray:
+    def bucket_width(self, width: int) -> int:
         """
-        Preprocess an image for prediction.
+        Padded width for a line of the given width.
         
         Args:
-            image_path: Path to the image file
+            width: Width after the aspect-preserving resize
             
         Returns:
-            Preprocessed image as numpy array
+            Smallest bucket that fits (the largest bucket for wider lines),
+            or img_width when bucketing is disabled
+        """
+        if not self.width_buckets:
+            return self.img_width
+        index = bisect.bisect_left(self.width_buckets, width)
+        return self.width_buckets[min(index, len(self.width_buckets) - 1)]
+    
+    def seq_len_for(self, width: int) -> int:
+        """CTC time steps covering the real (unpadded) content of a line."""
+        return max(1, -(-width // self.width_downsample))
+    
+    def prepare_line(self, image_path: Union[str, np.ndarray]) -> Tuple[np.ndarray, int]:
+        """
+        Load and resize one line image without padding.
+        
+        Args:
+            image_path: Path to the image file, or a decoded BGR/grayscale NumPy array
+            
+        Returns:
+            (normalized float32 image of img_height rows, content width)
         """
         # Read image in grayscale
-        img = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+        if isinstance(image_path, np.ndarray):
+            img = cv2.cvtColor(image_path, cv2.COLOR_BGR2GRAY) if image_path.ndim == 3 else image_path
+        else:
+            with METRICS.stage('image_decode'):
+                img = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
         
         if img is None:
             raise ValueError(f"Could not read image: {image_path}")
         
-        # Resize to target dimensions
-        img = cv2.resize(img, (self.img_width, self.img_height))
+        with METRICS.stage('preprocess'):
+            if self.width_buckets:
+                # Keep the aspect ratio; only lines wider than the largest bucket are squeezed
+                height, width = img.shape[:2]
+                width = int(round(width * self.img_height / max(1, height)))
+                width = min(max(1, width), self.width_buckets[-1])
+            else:
+                width = self.img_width
+            img = cv2.resize(img, (width, self.img_height), interpolation=cv2.INTER_AREA)
         
         # Normalize to [0, 1]
-        img = img.astype(np.float32) / 255.0
+        return img.astype(np.float32) / 255.0, width
+    
+    def pad_batch(self, lines: List[np.ndarray], width: int) -> np.ndarray:
+        """
+        Stack lines into one model input, padding each to the bucket width.
+        
+        Args:
+            lines: Normalized line images from prepare_line
+            width: Bucket width
+            
+        Returns:
+            Array of shape (batch, img_height, width[, 1])
+        """
+        batch = np.empty((len(lines), self.img_height, width), dtype=np.float32)
+        for i, line in enumerate(lines):
+            batch[i, :, :line.shape[1]] = line
+            # Pad with the line's background (the median pixel of a text line)
+            batch[i, :, line.shape[1]:] = np.median(line)
         
         # Add channel dimension if needed
         if self.num_channels == 1:
-            img = np.expand_dims(img, axis=-1)
-        
-        # Add batch dimension
-        img = np.expand_dims(img, axis=0)
+            batch = np.expand_dims(batch, axis=-1)
+        return batch
+    
+    def preprocess_image(self, image_path: Union[str, np.ndarray]) -> np.ndarray:
+        """
+        Preprocess an image for prediction.
         
-        return img
+        Args:
+            image_path: Path to the image file, or a decoded BGR/grayscale NumPy array
+            
+        Returns:
+            Preprocessed image as numpy array with a batch dimension of 1
+        """
+        line, width = self.prepare_line(image_path)
+        return self.pad_batch([line], self.bucket_width(width))
     
     def decode_prediction(self, output: np.ndarray) -> str:
         """
@@ -174,64 +305,127 @@ class HandwritingPredictor:
         
         return text.strip()
     
-    def predict(self, image_path: str) -> str:
+    def decode_batch(self, output, seq_len: np.ndarray) -> List[str]:
+        """
+        Decode the CTC output of a batch.
+        
+        Args:
+            output: Sparse (indices, values, shape) or dense output, laid out as
+                (time, batch, classes) if output_time_major else (batch, time, classes)
+            seq_len: Valid time steps per sample; padded steps are ignored
+            
+        Returns:
+            Decoded text per sample
+        """
+        if isinstance(output, tuple) and len(output) == 3:
+            indices, values, _ = output
+            rows = np.asarray(indices)[:, 0] if len(values) else np.zeros(0, dtype=np.int64)
+            return [self.decode_prediction((None, np.asarray(values)[rows == i], None))
+                    for i in range(len(seq_len))]
+        output = np.asarray(output)
+        if self.output_time_major:
+            # The layout comes from config, not the shape: with a bucket of as many time
+            # steps as the batch size, (batch, time) and (time, batch) look the same
+            if output.ndim != 3 or output.shape[1] != len(seq_len):
+                raise ValueError(f"Time-major output expected, got shape {output.shape} for {len(seq_len)} samples")
+            output = output.transpose(1, 0, 2)
+        return [self.decode_prediction(output[i, :seq_len[i]]) for i in range(len(seq_len))]
+    
+    def _mock_prediction(self, image_path: Union[str, np.ndarray]) -> str:
+        sample_texts = [
+            "Sample handwritten text",
+            "Hello World!",
+            "This is a demo prediction",
+            "Handwriting recognition",
+            "Upload your handwritten image"
+        ]
+        # Use image path (or content) hash to get consistent "prediction"
+        key = image_path.tobytes() if isinstance(image_path, np.ndarray) else image_path
+        idx = hash(key) % len(sample_texts)
+        return sample_texts[idx]
+    
+    def _run_bucket(self, lines: List[np.ndarray], widths: List[int], bucket: int) -> List[str]:
+        """Run one padded batch of lines that share a bucket."""
+        img = self.pad_batch(lines, bucket)
+        seq_len = np.array([self.seq_len_for(w) for w in widths], dtype=np.int32)
+        
+        # Run inference
+        with METRICS.stage('recognition', strategy='crnn', bucket=str(bucket)):
+            if self.runtime is not None:
+                output = self.runtime.run(img, seq_len)
+            else:
+                feed_dict = {
+                    self.input_tensor: img,
+                    self.seq_len_tensor: seq_len
+                }
+                output = self.session.run(self.output_tensor, feed_dict=feed_dict)
+        
+        # Decode the output
+        with METRICS.stage('text_decode'):
+            return self.decode_batch(output, seq_len)
+    
+    def predict(self, image_path: Union[str, np.ndarray]) -> str:
         """
         Predict handwritten text from an image.
         
         Args:
-            image_path: Path to the image file
+            image_path: Path to the image file, or a decoded BGR/grayscale NumPy array
             
         Returns:
             Recognized text string
         """
         # Preprocess the image
-        img = self.preprocess_image(image_path)
+        line, width = self.prepare_line(image_path)
         
         # If using mock model, return sample text
-        if self.session is None:
-            sample_texts = [
-                "Sample handwritten text",
-                "Hello World!",
-                "This is a demo prediction",
-                "Handwriting recognition",
-                "Upload your handwritten image"
-            ]
-            # Use image path hash to get consistent "prediction"
-            idx = hash(image_path) % len(sample_texts)
-            return sample_texts[idx]
+        if self.session is None and self.runtime is None:
+            return self._mock_prediction(image_path)
         
         try:
-            # Create sequence length (full width for each image)
-            seq_len = np.array([self.img_width // 4] * img.shape[0])
-            
-            # Run inference
-            feed_dict = {
-                self.input_tensor: img,
-                self.seq_len_tensor: seq_len
-            }
-            
-            output = self.session.run(self.output_tensor, feed_dict=feed_dict)
-            
-            # Decode the output
-            text = self.decode_prediction(output)
-            
-            return text
+            return self._run_bucket([line], [width], self.bucket_width(width))[0]
             
         except Exception as e:
             print(f"Prediction error: {e}")
             return f"Error during prediction: {str(e)}"
     
-    def predict_batch(self, image_paths: List[str]) -> List[str]:
+    def predict_batch(self, image_paths: List[Union[str, np.ndarray]]) -> List[str]:
         """
         Predict text from multiple images.
         
+        Lines are grouped by bucket width and run in batches of up to
+        batch_size, so padding is bounded by the bucket spacing rather than
+        the widest line of the request.
+        
         Args:
-            image_paths: List of image file paths
+            image_paths: List of image file paths or decoded images
             
         Returns:
             List of recognized text strings
         """
-        return [self.predict(path) for path in image_paths]
+        if self.session is None and self.runtime is None:
+            return [self.predict(path) for path in image_paths]
+        
+        results = [None] * len(image_paths)
+        buckets = OrderedDict()
+        for i, path in enumerate(image_paths):
+            try:
+                line, width = self.prepare_line(path)
+            except ValueError as e:
+                results[i] = f"Error during prediction: {str(e)}"
+                continue
+            buckets.setdefault(self.bucket_width(width), []).append((i, line, width))
+        
+        for bucket, items in buckets.items():
+            for start in range(0, len(items), self.batch_size):
+                chunk = items[start:start + self.batch_size]
+                try:
+                    texts = self._run_bucket([line for _, line, _ in chunk], [w for _, _, w in chunk], bucket)
+                except Exception as e:
+                    print(f"Prediction error: {e}")
+                    texts = [f"Error during prediction: {str(e)}"] * len(chunk)
+                for (i, _, _), text in zip(chunk, texts):
+                    results[i] = text
+        return results
     
     def __del__(self):
         """Clean up TensorFlow session."""
@@ -0,0 +1,166 @@
+"""
+OCR Queue Worker
+Consumes OCR tasks from a task queue (model/utils/task_queue.py) in batches,
+runs them through the requested predictor backend and publishes the results.
+Start any number of workers, on any number of machines that can reach the
+queue; see scripts/run_worker.py.
+"""
+
+import time
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+import cv2
+import numpy as np
+
+from model.utils.metrics import METRICS
+from model.utils.prediction_errors import is_prediction_error
+from model.utils.task_queue import TaskQueue, new_worker_id
+
+
+class QueueWorker:
+    """Claims task batches from a queue and runs them."""
+
+    def __init__(self, queue: TaskQueue, backends: Dict[str, Callable], batch_size: int = 8,
+                 lease_seconds: float = 300.0, poll_interval: float = 0.5, max_attempts: int = 3,
+                 worker_id: Optional[str] = None, watchdog=None):
+        """
+        Initialize the worker.
+
+        Args:
+            queue: Task queue to consume
+            backends: Mapping of backend name to a zero-argument predictor factory;
+                predictors are created on first use
+            batch_size: Tasks claimed per queue round-trip
+            lease_seconds: Seconds a claimed batch may take before it is redelivered
+            poll_interval: Seconds to sleep when the queue is empty
+            max_attempts: Deliveries of a failing task before its error is published
+            worker_id: Identifier recorded with results (generated if None)
+            watchdog: MemoryWatchdog; when it asks for recycling, run() returns after
+                the current batch (claimed tasks are always finished first)
+        """
+        self.queue = queue
+        self.backends = backends
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.worker_id = worker_id or new_worker_id()
+        self.watchdog = watchdog
+        self.predictors = {}
+        self.processed = 0
+        self.failed = 0
+
+    def predictor(self, backend: str):
+        """Predictor for a backend, created on first use."""
+        if backend not in self.predictors:
+            if backend not in self.backends:
+                raise ValueError(f"Backend not served by this worker: {backend}")
+            print(f"Worker {self.worker_id}: loading backend {backend}")
+            self.predictors[backend] = self.backends[backend]()
+        return self.predictors[backend]
+
+    @staticmethod
+    def load_image(task) -> np.ndarray:
+        """Decode a task's image from its bytes or its path."""
+        if task.payload is not None:
+            image = cv2.imdecode(np.frombuffer(task.payload, np.uint8), cv2.IMREAD_COLOR)
+        else:
+            image = cv2.imread(task.payload_ref)
+        if image is None:
+            raise ValueError("Could not decode image")
+        return image
+
+    def run_once(self) -> int:
+        """
+        Claim and process one batch.
+
+        Returns:
+            Number of tasks claimed
+        """
+        with METRICS.stage('queue_claim'):
+            tasks = self.queue.claim(self.worker_id, self.batch_size, self.lease_seconds, self.max_attempts)
+        if not tasks:
+            return 0
+
+        # Tasks without options for the same backend go through predict_batch together
+        groups = OrderedDict()
+        for task in tasks:
+            key = (task.backend, None) if not task.options else (task.backend, task.task_id)
+            groups.setdefault(key, []).append(task)
+
+        for (backend, _), group in groups.items():
+            images, ready = [], []
+            for task in group:
+                try:
+                    images.append(self.load_image(task))
+                    ready.append(task)
+                except Exception as e:
+                    self._fail(task, e)
+            if not ready:
+                continue
+
+            start = time.perf_counter()
+            try:
+                predictor = self.predictor(backend)
+                with METRICS.stage('queue_predict'):
+                    if ready[0].options:
+                        texts = [predictor.predict(images[0], **ready[0].options)]
+                    else:
+                        texts = predictor.predict_batch(images)
+            except Exception as e:
+                for task in ready:
+                    self._fail(task, e)
+                continue
+            seconds = (time.perf_counter() - start) / len(ready)
+
+            for task, text in zip(ready, texts):
+                if is_prediction_error(text):
+                    # Error text is a failure, so it is retried and published as an error
+                    self._fail(task, RuntimeError(text))
+                    continue
+                self.queue.complete(task.task_id, {
+                    'recognized_text': text,
+                    'backend': backend,
+                    'seconds': round(seconds, 4),
+                }, self.worker_id)
+                self.processed += 1
+        return len(tasks)
+
+    def _fail(self, task, error: Exception):
+        print(f"Worker {self.worker_id}: task {task.task_id} failed (attempt {task.attempts}): {error}")
+        self.failed += 1
+        self.queue.fail(task.task_id, str(error), self.max_attempts)
+
+    def run(self, stop_event: Optional[threading.Event] = None,
+            max_idle_seconds: Optional[float] = None) -> Optional[str]:
+        """
+        Process batches until stopped.
+
+        Args:
+            stop_event: Set it to stop after the current batch
+            max_idle_seconds: Return after the queue has been empty this long (None: never)
+
+        Returns:
+            The watchdog's recycle reason if the worker stopped to be recycled, else None
+        """
+        stop_event = stop_event or threading.Event()
+        idle_since = None
+        recycle_reason = None
+        print(f"Worker {self.worker_id} started (batch size {self.batch_size})")
+        while not stop_event.is_set():
+            claimed = self.run_once()
+            if claimed and self.watchdog is not None:
+                recycle_reason = self.watchdog.record_request(claimed)
+                if recycle_reason is not None:
+                    break
+            if claimed:
+                idle_since = None
+                continue
+            idle_since = idle_since or time.monotonic()
+            if max_idle_seconds is not None and time.monotonic() - idle_since >= max_idle_seconds:
+                break
+            stop_event.wait(self.poll_interval)
+        print(f"Worker {self.worker_id} stopped: {self.processed} processed, {self.failed} failed")
+        return recycle_reason
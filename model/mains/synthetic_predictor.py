@@ -0,0 +1,232 @@
+"""
+Synthetic Latency-Profile Predictor
+Stands in for a real backend in capacity tests: instead of running a model
+it replays per-stage latency distributions recorded from real runs, burning
+CPU for the recorded share of each stage and sleeping for the rest. Stages
+are reported through METRICS like the real ones, so /metrics and ?timings=1
+look the same as in production.
+
+Record a profile with `python scripts/load_test.py record easyocr profile.json`
+and serve it with HTR_BACKEND=synthetic HTR_SYNTHETIC_PROFILE=profile.json.
+"""
+
+import os
+import json
+import time
+import threading
+from typing import List, Optional, Union
+
+import numpy as np
+
+from model.utils.metrics import METRICS
+
+
+# Used when no profile is given: one recognition stage of roughly 150-600 ms.
+# Only good for exercising the serving layer; record a real profile for sizing.
+DEFAULT_PROFILE = {
+    'backend': 'default',
+    'requests': 0,
+    'cpu_fraction': 0.9,
+    'stages': {
+        'recognition': {
+            'calls_per_request': 1.0,
+            'bounds': [0.1, 0.25, 0.5, 1.0],
+            'counts': [0, 6, 3, 1],
+        },
+    },
+}
+
+
+def record_profile(predictor, images: list, backend: str = '', registry=None) -> dict:
+    """
+    Record a latency profile by running a real predictor.
+
+    Args:
+        predictor: Predictor with predict()
+        images: Image paths or arrays to run
+        backend: Backend name stored in the profile
+        registry: Metrics registry the predictor reports to (METRICS if None)
+
+    Returns:
+        Profile dictionary (JSON-serializable)
+    """
+    registry = registry or METRICS
+    if not registry.enabled:
+        raise ValueError("Metrics are disabled (HTR_METRICS=0); stage latencies cannot be recorded")
+
+    before = registry.stage_seconds.snapshot()
+    wall = cpu = 0.0
+    for image in images:
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        predictor.predict(image)
+        wall += time.perf_counter() - wall_start
+        cpu += time.process_time() - cpu_start
+    after = registry.stage_seconds.snapshot()
+
+    # Merge label sets (strategy, bucket, ...) per stage name, keeping first-seen order
+    bounds = [b for b in registry.stage_seconds.buckets if b != float('inf')]
+    stages = {}
+    for key, series in after.items():
+        name = dict(key).get('stage')
+        if name is None or name == 'request':
+            continue
+        previous = before.get(key, {'counts': [0] * len(series['counts']), 'count': 0})
+        counts = [a - b for a, b in zip(series['counts'], previous['counts'])]
+        if not any(counts):
+            continue
+        stage = stages.setdefault(name, {'calls': 0, 'counts': [0] * len(counts)})
+        stage['calls'] += series['count'] - previous['count']
+        stage['counts'] = [a + b for a, b in zip(stage['counts'], counts)]
+
+    requests = max(1, len(images))
+    return {
+        'backend': backend,
+        'recorded': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'requests': len(images),
+        # CPU seconds per wall second; above 1.0 when the backend uses several threads
+        'cpu_fraction': round(cpu / wall, 4) if wall > 0 else 1.0,
+        'stages': {name: {'calls_per_request': round(stage['calls'] / requests, 4),
+                          'bounds': bounds + [None],
+                          'counts': stage['counts']}
+                   for name, stage in stages.items()},
+    }
+
+
+def load_profile(path: Optional[str]) -> dict:
+    """
+    Load a latency profile.
+
+    Args:
+        path: Profile JSON written by record_profile (DEFAULT_PROFILE if None)
+
+    Returns:
+        Profile dictionary
+    """
+    if not path:
+        return DEFAULT_PROFILE
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def _burn(seconds: float):
+    """Keep one core busy for about this long (NumPy releases the GIL like real kernels)."""
+    deadline = time.perf_counter() + seconds
+    a = np.full((96, 96), 0.01, dtype=np.float32)
+    while time.perf_counter() < deadline:
+        np.dot(a, a)
+
+
+class SyntheticPredictor:
+    """Predictor that replays a recorded latency profile."""
+
+    QOS_TIERS = {
+        'full': {},
+        'reduced': {'work_scale': 0.5},
+        'minimal': {'work_scale': 0.25},
+    }
+
+    def __init__(self, profile: Optional[dict] = None, time_scale: float = 1.0, seed: Optional[int] = None,
+                 burn_cpu: bool = True):
+        """
+        Initialize the predictor.
+
+        Args:
+            profile: Latency profile (DEFAULT_PROFILE if None)
+            time_scale: Multiplier for all replayed latencies (e.g. 0.1 for quick CI runs)
+            seed: Random seed for latency sampling
+            burn_cpu: Burn CPU for the recorded CPU share; otherwise only sleep
+        """
+        self.profile = profile or DEFAULT_PROFILE
+        self.time_scale = time_scale
+        self.burn_cpu = burn_cpu
+        self.cpu_fraction = min(1.0, float(self.profile.get('cpu_fraction', 1.0)))
+        self._rng = np.random.default_rng(seed)
+        self._rng_lock = threading.Lock()
+
+        self._stages = []
+        for name, stage in self.profile['stages'].items():
+            counts = np.asarray(stage['counts'], dtype=np.float64)
+            bounds = [float('inf') if b is None else float(b) for b in stage['bounds']]
+            lower = [0.0] + bounds[:-1]
+            self._stages.append((name, float(stage['calls_per_request']), counts / counts.sum(), lower, bounds))
+
+    def sample_plan(self, work_scale: float = 1.0) -> List[tuple]:
+        """
+        Draw the stages and latencies of one request.
+
+        Args:
+            work_scale: Fraction of the recorded stage calls to run (cheaper QoS tiers)
+
+        Returns:
+            List of (stage name, seconds)
+        """
+        plan = []
+        with self._rng_lock:
+            for name, calls_per_request, probabilities, lower, upper in self._stages:
+                expected = calls_per_request * work_scale
+                calls = int(expected) + int(self._rng.random() < expected - int(expected))
+                for bucket in self._rng.choice(len(probabilities), size=calls, p=probabilities):
+                    # Uniform within the bucket; the open-ended last bucket uses its lower bound
+                    high = upper[bucket] if upper[bucket] != float('inf') else lower[bucket]
+                    plan.append((name, self._rng.uniform(lower[bucket], high) * self.time_scale))
+        return plan
+
+    def predict(self, image_path: Union[str, np.ndarray], return_debug: bool = False,
+                work_scale: float = 1.0, **options):
+        """
+        Replay one request's worth of latency.
+
+        Args:
+            image_path: Ignored (kept for interface compatibility)
+            return_debug: Also return the replayed stages
+            work_scale: Fraction of the recorded work (set by the QoS tiers)
+            **options: Other backend options, ignored
+
+        Returns:
+            Placeholder text (and the replayed stages if return_debug)
+        """
+        plan = self.sample_plan(work_scale)
+        for name, seconds in plan:
+            with METRICS.stage(name, backend='synthetic'):
+                busy = seconds * self.cpu_fraction if self.burn_cpu else 0.0
+                if busy > 0:
+                    _burn(busy)
+                if seconds - busy > 0:
+                    time.sleep(seconds - busy)
+        text = "Synthetic prediction"
+        if return_debug:
+            return text, [{'stage': name, 'ms': round(seconds * 1000.0, 3)} for name, seconds in plan]
+        return text
+
+    def predict_batch(self, image_paths: list) -> list:
+        """
+        Predict text from multiple images.
+
+        Args:
+            image_paths: List of image paths or arrays
+
+        Returns:
+            List of placeholder texts
+        """
+        return [self.predict(path) for path in image_paths]
+
+
+def create_predictor(profile_path: Optional[str] = None, time_scale: float = 1.0,
+                     seed: Optional[int] = None) -> SyntheticPredictor:
+    """
+    Factory function to create a synthetic predictor.
+
+    Args:
+        profile_path: Recorded profile (HTR_SYNTHETIC_PROFILE, then DEFAULT_PROFILE if None)
+        time_scale: Multiplier for replayed latencies (HTR_SYNTHETIC_TIME_SCALE if not given)
+        seed: Random seed
+
+    Returns:
+        SyntheticPredictor instance
+    """
+    profile_path = profile_path or os.environ.get('HTR_SYNTHETIC_PROFILE')
+    if time_scale == 1.0 and os.environ.get('HTR_SYNTHETIC_TIME_SCALE'):
+        time_scale = float(os.environ['HTR_SYNTHETIC_TIME_SCALE'])
+    if not profile_path:
+        print("WARNING: No synthetic latency profile given; using the built-in default profile.")
+    return SyntheticPredictor(load_profile(profile_path), time_scale=time_scale, seed=seed)
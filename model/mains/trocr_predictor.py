@@ -16,8 +16,20 @@ import os
 
 from typing import Optional, Union
 
+from model.utils.metrics import METRICS
+from model.utils.model_store import load_trocr
+from model.utils.tiling import segment_lines, split_wide_box, image_pixels
+
 class TrOCR_Predictor:
-    def __init__(self, model_name: str = "microsoft/trocr-base-handwritten", gpu: bool = False):
+    # predict() keyword arguments per QoS tier (see model/utils/qos.py)
+    QOS_TIERS = {
+        'full': {},
+        'reduced': {'num_beams': 2},
+        'minimal': {'num_beams': 1},
+    }
+
+    def __init__(self, model_name: str = "microsoft/trocr-base-handwritten", gpu: bool = False,
+                 model_store: Optional[str] = None, tile_threshold: Optional[int] = 4_000_000):
         """
         Initialize TrOCR model for handwriting recognition.
         
@@ -27,8 +39,14 @@ class TrOCR_Predictor:
                 - "microsoft/trocr-base-printed" (for printed text)
                 - "microsoft/trocr-large-handwritten" (larger, more accurate)
             gpu: Whether to use GPU acceleration
+            model_store: Local model store (scripts/model_store.py prepare) with
+                safetensors weights; loaded memory-mapped and offline
+            tile_threshold: Images with more pixels than this are segmented into
+                lines with predict_tiled() (None disables automatic tiling)
         """
         self.model_name = model_name
+        self.tile_threshold = tile_threshold
+        self.model_store = model_store
         self.device = torch.device("cuda" if gpu and torch.cuda.is_available() else "cpu")
         self.processor: Optional[TrOCRProcessor] = None
         self.model: Optional[VisionEncoderDecoderModel] = None
@@ -37,6 +55,12 @@ class TrOCR_Predictor:
     def _load_model(self):
         """Load TrOCR model and processor."""
         try:
+            if self.model_store:
+                print(f"Loading TrOCR model from store: {self.model_store}")
+                self.processor, self.model = load_trocr(self.model_store, self.device)
+                print("✅ TrOCR model loaded from local store!")
+                return
+
             print(f"Loading TrOCR model: {self.model_name}")
             print(f"Device: {self.device}")
             print("NOTE: First time will download ~1.5GB model (requires internet)")
@@ -58,12 +82,13 @@ class TrOCR_Predictor:
             self.processor = None
             self.model = None
 
-    def predict(self, image_path: str) -> str:
+    def predict(self, image_path: Union[str, np.ndarray], num_beams: Optional[int] = None) -> str:
         """
         Predict text from handwritten image using TrOCR.
         
         Args:
-            image_path: Path to the input image
+            image_path: Path to the input image, or a decoded BGR/grayscale NumPy array
+            num_beams: Beam width for generation (model default if None, 1 = greedy)
             
         Returns:
             Recognized text string
@@ -72,17 +97,32 @@ class TrOCR_Predictor:
             return "Mock prediction: TrOCR not loaded"
         
         try:
+            # TrOCR reads single lines; whole pages go through the line pipeline
+            if self.tile_threshold is not None and image_pixels(image_path) > self.tile_threshold:
+                return self.predict_tiled(image_path, num_beams=num_beams)
+            
             # Load and preprocess image
-            image = Image.open(image_path).convert('RGB')
+            if isinstance(image_path, np.ndarray):
+                code = cv2.COLOR_GRAY2RGB if image_path.ndim == 2 else cv2.COLOR_BGR2RGB
+                image = Image.fromarray(cv2.cvtColor(image_path, code))
+            else:
+                with METRICS.stage('image_decode'):
+                    image = Image.open(image_path).convert('RGB')
             
             # Process image for TrOCR
-            inputs = self.processor(image)
-            pixel_values = torch.tensor(inputs['pixel_values']).to(self.device)
+            with METRICS.stage('preprocess'):
+                inputs = self.processor(image)
+                pixel_values = torch.tensor(inputs['pixel_values']).to(self.device)
             
             # Generate text
             with torch.no_grad():
-                generated_ids = self.model.generate(pixel_values)
-                generated_text = self.processor.batch_decode(generated_ids, skip_special_tokens=True)[0]
+                with METRICS.stage('recognition', strategy='generate'):
+                    if num_beams is not None:
+                        generated_ids = self.model.generate(pixel_values, num_beams=num_beams)
+                    else:
+                        generated_ids = self.model.generate(pixel_values)
+                with METRICS.stage('text_decode'):
+                    generated_text = self.processor.batch_decode(generated_ids, skip_special_tokens=True)[0]
             
             return generated_text.strip()
             
@@ -90,6 +130,68 @@ class TrOCR_Predictor:
             print(f"❌ ERROR during TrOCR prediction: {e}")
             return f"Error during recognition: {e}"
 
+    def predict_tiled(self, image_path: Union[str, np.ndarray], strip_height: int = 1024,
+                      overlap: int = 128, max_aspect: float = 8.0, batch_size: int = 8,
+                      num_beams: Optional[int] = None) -> str:
+        """
+        Recognize a large page line by line with bounded memory.
+        
+        Lines are found strip by strip with projection profiles, long lines
+        are split at word gaps, and the pieces are recognized in small batches.
+        
+        Args:
+            image_path: Path to the input image, or a decoded BGR/grayscale NumPy array
+            strip_height: Rows segmented at a time
+            overlap: Rows shared by neighbouring strips (should exceed the tallest line)
+            max_aspect: Maximum width / height of one recognized piece
+            batch_size: Pieces per generate() call
+            num_beams: Beam width for generation (model default if None)
+            
+        Returns:
+            Recognized text, one line per text line
+        """
+        if not self.model or not self.processor:
+            return "Mock prediction: TrOCR not loaded"
+        
+        try:
+            with METRICS.stage('image_decode'):
+                if isinstance(image_path, np.ndarray):
+                    gray = cv2.cvtColor(image_path, cv2.COLOR_BGR2GRAY) if image_path.ndim == 3 else image_path
+                else:
+                    gray = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+            if gray is None:
+                return f"Error during recognition: could not read {image_path}"
+        
+            with METRICS.stage('detection', strategy='lines'):
+                pieces = []
+                for line_index, line in enumerate(segment_lines(gray, strip_height, overlap)):
+                    pieces += [(line_index, box) for box in split_wide_box(gray, line, max_aspect)]
+        
+            texts = {}
+            for start in range(0, len(pieces), batch_size):
+                batch = pieces[start:start + batch_size]
+                images = [Image.fromarray(cv2.cvtColor(gray[b[2]:b[3], b[0]:b[1]], cv2.COLOR_GRAY2RGB))
+                          for _, b in batch]
+                with METRICS.stage('preprocess'):
+                    pixel_values = torch.tensor(self.processor(images)['pixel_values']).to(self.device)
+                with torch.no_grad():
+                    with METRICS.stage('recognition', strategy='generate'):
+                        if num_beams is not None:
+                            generated_ids = self.model.generate(pixel_values, num_beams=num_beams)
+                        else:
+                            generated_ids = self.model.generate(pixel_values)
+                    with METRICS.stage('text_decode'):
+                        decoded = self.processor.batch_decode(generated_ids, skip_special_tokens=True)
+                for (line_index, _), text in zip(batch, decoded):
+                    texts.setdefault(line_index, []).append(text.strip())
+        
+            text = '\n'.join(' '.join(t for t in texts[i] if t) for i in sorted(texts)).strip()
+            return text or "(No text detected in image)"
+            
+        except Exception as e:
+            print(f"❌ ERROR during TrOCR tiled prediction: {e}")
+            return f"Error during recognition: {e}"
+    
     def predict_batch(self, image_paths: list) -> list:
         """
         Predict text from multiple images.
@@ -106,13 +208,14 @@ class TrOCR_Predictor:
             results.append(result)
         return results
 
-def create_trocr_predictor(model_variant="handwritten", gpu=False):
+def create_trocr_predictor(model_variant="handwritten", gpu=False, model_store=None):
     """
     Factory function to create a TrOCR predictor.
     
     Args:
         model_variant: "handwritten", "printed", or "large"
         gpu: Whether to use GPU acceleration
+        model_store: Local model store directory (overrides model_variant)
         
     Returns:
         TrOCR_Predictor instance
@@ -124,7 +227,7 @@ def create_trocr_predictor(model_variant="handwritten", gpu=False):
     }
     
     model_name = model_map.get(model_variant, "microsoft/trocr-base-handwritten")
-    return TrOCR_Predictor(model_name=model_name, gpu=gpu)
+    return TrOCR_Predictor(model_name=model_name, gpu=gpu, model_store=model_store)
 
 # For backward compatibility
 def create_predictor():
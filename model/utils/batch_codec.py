@@ -0,0 +1,148 @@
+"""
+Batch Codec
+Compact framed binary format for sending many images in one request to
+/predict_batch, and for its optional binary response. All integers are
+little-endian.
+
+Request (Content-Type: application/x-htr-batch):
+    b'HTRB' | u32 count | count x (u32 length | encoded image bytes)
+
+Response (sent when the request has Accept: application/x-htr-batch-results):
+    b'HTRR' | u32 count | count x (u8 flags | u32 length | UTF-8 text)
+    flags bit 0: success (text is the recognized text, else the error message)
+    flags bit 1: served from the prediction cache
+
+Framing costs 4 bytes per image, against a multipart part header and a JSON
+response per image when calling /predict once per image.
+"""
+
+import struct
+from typing import List, Tuple
+
+
+BATCH_MAGIC = b'HTRB'
+RESULTS_MAGIC = b'HTRR'
+BATCH_CONTENT_TYPE = 'application/x-htr-batch'
+RESULTS_CONTENT_TYPE = 'application/x-htr-batch-results'
+
+FLAG_SUCCESS = 1
+FLAG_CACHE_HIT = 2
+
+_HEADER = struct.Struct('<4sI')
+_LENGTH = struct.Struct('<I')
+_RESULT = struct.Struct('<BI')
+
+
+class BatchFormatError(ValueError):
+    """Raised for malformed batch frames."""
+
+
+def _read_header(data, magic: bytes) -> int:
+    if len(data) < _HEADER.size:
+        raise BatchFormatError("Truncated batch header")
+    found, count = _HEADER.unpack_from(data, 0)
+    if found != magic:
+        raise BatchFormatError(f"Bad magic {bytes(found)!r}, expected {magic!r}")
+    return count
+
+
+def encode_batch(images: List[bytes]) -> bytes:
+    """
+    Frame encoded images into a batch request body.
+
+    Args:
+        images: Encoded image bytes (PNG, JPEG, ...)
+
+    Returns:
+        Batch request body
+    """
+    parts = [_HEADER.pack(BATCH_MAGIC, len(images))]
+    for data in images:
+        parts.append(_LENGTH.pack(len(data)))
+        parts.append(bytes(data))
+    return b''.join(parts)
+
+
+def decode_batch(data: bytes, max_items: int = 0) -> List[memoryview]:
+    """
+    Split a batch request body into its images without copying them.
+
+    Args:
+        data: Batch request body
+        max_items: Reject batches with more images (0: no limit)
+
+    Returns:
+        List of memoryviews, one per image, in request order
+
+    Raises:
+        BatchFormatError: If the frame is malformed, truncated or too large
+    """
+    view = memoryview(data)
+    count = _read_header(view, BATCH_MAGIC)
+    if max_items and count > max_items:
+        raise BatchFormatError(f"Batch of {count} images exceeds the limit of {max_items}")
+
+    images = []
+    offset = _HEADER.size
+    for index in range(count):
+        if offset + _LENGTH.size > len(view):
+            raise BatchFormatError(f"Truncated length of image {index}")
+        (length,) = _LENGTH.unpack_from(view, offset)
+        offset += _LENGTH.size
+        if offset + length > len(view):
+            raise BatchFormatError(f"Truncated image {index}: {length} bytes declared")
+        images.append(view[offset:offset + length])
+        offset += length
+    if offset != len(view):
+        raise BatchFormatError(f"{len(view) - offset} trailing bytes after {count} images")
+    return images
+
+
+def encode_results(results: List[dict]) -> bytes:
+    """
+    Frame per-image results into a binary response body.
+
+    Args:
+        results: Result dictionaries as returned in /predict_batch's JSON
+            ('success', 'recognized_text' or 'error', 'cache_hit')
+
+    Returns:
+        Binary response body
+    """
+    parts = [_HEADER.pack(RESULTS_MAGIC, len(results))]
+    for result in results:
+        flags = (FLAG_SUCCESS if result['success'] else 0) | (FLAG_CACHE_HIT if result.get('cache_hit') else 0)
+        text = (result['recognized_text'] if result['success'] else result['error']).encode('utf-8')
+        parts.append(_RESULT.pack(flags, len(text)))
+        parts.append(text)
+    return b''.join(parts)
+
+
+def decode_results(data: bytes) -> List[Tuple[bool, str, bool]]:
+    """
+    Parse a binary response body.
+
+    Args:
+        data: Binary response body
+
+    Returns:
+        List of (success, text or error message, cache_hit) in request order
+
+    Raises:
+        BatchFormatError: If the frame is malformed or truncated
+    """
+    view = memoryview(data)
+    count = _read_header(view, RESULTS_MAGIC)
+    results = []
+    offset = _HEADER.size
+    for index in range(count):
+        if offset + _RESULT.size > len(view):
+            raise BatchFormatError(f"Truncated result {index}")
+        flags, length = _RESULT.unpack_from(view, offset)
+        offset += _RESULT.size
+        if offset + length > len(view):
+            raise BatchFormatError(f"Truncated result {index}: {length} bytes declared")
+        text = bytes(view[offset:offset + length]).decode('utf-8')
+        results.append((bool(flags & FLAG_SUCCESS), text, bool(flags & FLAG_CACHE_HIT)))
+        offset += length
+    return results
@@ -0,0 +1,530 @@
+"""
+Benchmark Utilities
+Synthetic handwriting-like test data, latency/throughput/memory measurement
+and regression comparison for the predictor backends.
+"""
+
+import os
+import io
+import sys
+import json
+import time
+import platform
+import resource
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+# Canvas sizes (width, height, lines of text) used for synthetic samples
+SIZE_PRESETS = {
+    'word': (256, 64, 1),
+    'line': (1024, 96, 1),
+    'page': (1240, 1754, 12),
+}
+
+WORDS = [
+    "the", "quick", "brown", "fox", "jumps", "over", "lazy", "dog", "hello",
+    "world", "invoice", "total", "amount", "date", "name", "signature",
+    "address", "received", "payment", "thank", "you", "order", "number",
+    "meeting", "notes", "tomorrow", "morning", "please", "call", "back",
+]
+
+
+def generate_sample(size: str, rng: np.random.RandomState) -> Tuple[np.ndarray, str]:
+    """
+    Render one synthetic handwriting-like image.
+
+    Text is drawn with the Hershey script font, then slanted, blurred and
+    given paper noise so that it loosely resembles a handwritten scan.
+
+    Args:
+        size: One of SIZE_PRESETS
+        rng: Random state for reproducible samples
+
+    Returns:
+        (grayscale image, ground truth text)
+    """
+    width, height, num_lines = SIZE_PRESETS[size]
+    img = np.full((height, width), 255, dtype=np.uint8)
+
+    line_height = height // (num_lines + 1) if num_lines > 1 else height
+    scale = 1.4 if size != 'word' else 1.2
+    lines = []
+
+    for i in range(num_lines):
+        words = []
+        # Add words until the line is full
+        while True:
+            candidate = ' '.join(words + [WORDS[rng.randint(len(WORDS))]])
+            (text_w, _), _ = cv2.getTextSize(candidate, cv2.FONT_HERSHEY_SCRIPT_SIMPLEX, scale, 2)
+            if text_w > width - 40 and words:
+                break
+            words = candidate.split(' ')
+            if size == 'word':
+                break
+        text = ' '.join(words)
+        lines.append(text)
+
+        baseline = (i + 1) * line_height if num_lines > 1 else int(height * 0.7)
+        cv2.putText(img, text, (10 + rng.randint(10), baseline), cv2.FONT_HERSHEY_SCRIPT_SIMPLEX,
+                    scale, int(rng.randint(0, 60)), int(rng.randint(2, 4)), cv2.LINE_AA)
+
+    # Slant like cursive writing
+    shear = rng.uniform(-0.25, 0.05)
+    matrix = np.float32([[1, shear, -shear * height / 2], [0, 1, 0]])
+    img = cv2.warpAffine(img, matrix, (width, height), borderValue=255)
+
+    # Pen blur and paper noise
+    img = cv2.GaussianBlur(img, (3, 3), 0)
+    noise = rng.normal(0, 8, img.shape)
+    img = np.clip(img.astype(np.float32) + noise, 0, 255).astype(np.uint8)
+
+    return img, ' '.join(lines)
+
+
+def generate_synthetic_samples(out_dir: str, sizes: List[str], count: int,
+                               seed: int = 0) -> List[Dict[str, str]]:
+    """
+    Generate synthetic samples on disk.
+
+    Args:
+        out_dir: Directory for generated PNG files
+        sizes: Size presets to generate
+        count: Number of samples per size
+        seed: Random seed
+
+    Returns:
+        List of {'path', 'text', 'size'} dictionaries
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    rng = np.random.RandomState(seed)
+    samples = []
+
+    for size in sizes:
+        if size not in SIZE_PRESETS:
+            raise ValueError(f"Unknown size preset: {size}")
+        for i in range(count):
+            img, text = generate_sample(size, rng)
+            path = os.path.join(out_dir, f"{size}_{i:04d}.png")
+            cv2.imwrite(path, img)
+            samples.append({'path': path, 'text': text, 'size': size})
+
+    return samples
+
+
+def edit_distance(a: str, b: str) -> int:
+    """
+    Levenshtein distance between two strings.
+
+    Args:
+        a: First string
+        b: Second string
+
+    Returns:
+        Minimum number of insertions, deletions and substitutions
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+def character_error_rate(reference: str, hypothesis: str) -> float:
+    """
+    Character error rate with whitespace normalized.
+
+    Args:
+        reference: Ground truth text
+        hypothesis: Recognized text
+
+    Returns:
+        Edit distance divided by reference length
+    """
+    reference = ' '.join(reference.split())
+    hypothesis = ' '.join((hypothesis or '').split())
+    if not reference:
+        return 0.0 if not hypothesis else 1.0
+    return edit_distance(reference, hypothesis) / len(reference)
+
+
+def percentile(values: List[float], q: float) -> float:
+    """
+    Percentile with linear interpolation.
+
+    Args:
+        values: Sample values
+        q: Percentile in [0, 100]
+
+    Returns:
+        Percentile value (0.0 for empty input)
+    """
+    if not values:
+        return 0.0
+    return float(np.percentile(np.asarray(values, dtype=np.float64), q))
+
+
+def current_rss_mb() -> float:
+    """Current resident set size of this process in MB."""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError):
+        return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and kilobytes elsewhere
+    if sys.platform == 'darwin':
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+class RSSSampler:
+    """
+    Samples this process's RSS in a background thread while a run is active.
+    ru_maxrss only knows the peak of the whole process, so after the first
+    backend every later run would report the largest peak seen so far.
+    """
+
+    def __init__(self, interval: float = 0.01):
+        """
+        Initialize the sampler.
+
+        Args:
+            interval: Seconds between samples
+        """
+        self.interval = interval
+        self.start_mb = 0.0
+        self.peak_mb = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak_mb = max(self.peak_mb, current_rss_mb())
+
+    def __enter__(self):
+        self.start_mb = self.peak_mb = current_rss_mb()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak_mb = max(self.peak_mb, current_rss_mb())
+        return False
+
+    @property
+    def growth_mb(self) -> float:
+        """Peak RSS of the run above its starting RSS."""
+        return max(0.0, self.peak_mb - self.start_mb)
+
+
+def summarize(latencies: List[float], elapsed: float, num_images: int,
+              cers: List[float], memory: Optional[RSSSampler] = None) -> dict:
+    """
+    Summarize one benchmark run.
+
+    Args:
+        latencies: Per-image latencies in seconds
+        elapsed: Wall time of the whole run in seconds
+        num_images: Number of processed images
+        cers: Per-image character error rates
+        memory: Sampler that was active during the run (peak is the current RSS if None)
+
+    Returns:
+        Dictionary with latency percentiles (ms), throughput, memory and CER
+    """
+    latencies_ms = [v * 1000.0 for v in latencies]
+    rss = current_rss_mb()
+    return {
+        'images': num_images,
+        'latency_ms': {
+            'p50': percentile(latencies_ms, 50),
+            'p95': percentile(latencies_ms, 95),
+            'p99': percentile(latencies_ms, 99),
+            'mean': float(np.mean(latencies_ms)) if latencies_ms else 0.0,
+        },
+        'images_per_sec': num_images / elapsed if elapsed > 0 else 0.0,
+        # Peak during this run only, and how far the run pushed RSS above its start
+        'peak_rss_mb': memory.peak_mb if memory is not None else rss,
+        'rss_growth_mb': memory.growth_mb if memory is not None else 0.0,
+        'rss_mb': rss,
+        'cer': float(np.mean(cers)) if cers else None,
+    }
+
+
+def _reset_caches(predictor, app_module=None):
+    """Drop cached results so every measurement runs inference."""
+    region_cache = getattr(predictor, 'region_cache', None)
+    if region_cache is not None:
+        region_cache.clear()
+    if app_module is not None:
+        app_module.prediction_cache.clear()
+
+
+def run_single(predictor, samples: List[dict], iterations: int = 1) -> dict:
+    """
+    Benchmark predictor.predict() one image at a time.
+
+    Args:
+        predictor: Predictor with a predict(path) method
+        samples: Samples from generate_synthetic_samples()
+        iterations: Passes over the samples
+
+    Returns:
+        Summary dictionary
+    """
+    latencies, cers = [], []
+    with RSSSampler() as memory:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            for sample in samples:
+                _reset_caches(predictor)
+                t0 = time.perf_counter()
+                text = predictor.predict(sample['path'])
+                latencies.append(time.perf_counter() - t0)
+                cers.append(character_error_rate(sample['text'], text))
+        elapsed = time.perf_counter() - start
+    return summarize(latencies, elapsed, len(latencies), cers, memory)
+
+
+def run_batch(predictor, samples: List[dict], batch_size: int = 8, iterations: int = 1) -> dict:
+    """
+    Benchmark predictor.predict_batch().
+
+    Latency percentiles are per image, amortized over each batch.
+
+    Args:
+        predictor: Predictor with a predict_batch(paths) method
+        samples: Samples from generate_synthetic_samples()
+        batch_size: Images per batch
+        iterations: Passes over the samples
+
+    Returns:
+        Summary dictionary
+    """
+    latencies, cers = [], []
+    with RSSSampler() as memory:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            for i in range(0, len(samples), batch_size):
+                batch = samples[i:i + batch_size]
+                _reset_caches(predictor)
+                t0 = time.perf_counter()
+                texts = predictor.predict_batch([s['path'] for s in batch])
+                per_image = (time.perf_counter() - t0) / len(batch)
+                for sample, text in zip(batch, texts):
+                    latencies.append(per_image)
+                    cers.append(character_error_rate(sample['text'], text))
+        elapsed = time.perf_counter() - start
+    return summarize(latencies, elapsed, len(latencies), cers, memory)
+
+
+def run_http(predictor, samples: List[dict], iterations: int = 1) -> dict:
+    """
+    Benchmark the full /predict route through the Flask test client.
+
+    Args:
+        predictor: Predictor installed as the app's global predictor
+        samples: Samples from generate_synthetic_samples()
+        iterations: Passes over the samples
+
+    Returns:
+        Summary dictionary (with an 'errors' count)
+    """
+    import app as app_module
+
+    app_module.predictor = predictor
+    client = app_module.app.test_client()
+    latencies, cers = [], []
+    errors = 0
+
+    with RSSSampler() as memory:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            for sample in samples:
+                _reset_caches(predictor, app_module)
+                with open(sample['path'], 'rb') as f:
+                    data = f.read()
+                t0 = time.perf_counter()
+                response = client.post('/predict',
+                                       data={'file': (io.BytesIO(data), os.path.basename(sample['path']))},
+                                       content_type='multipart/form-data')
+                latencies.append(time.perf_counter() - t0)
+                payload = response.get_json() or {}
+                if response.status_code != 200 or not payload.get('success'):
+                    errors += 1
+                    continue
+                cers.append(character_error_rate(sample['text'], payload.get('recognized_text', '')))
+        elapsed = time.perf_counter() - start
+
+    summary = summarize(latencies, elapsed, len(latencies), cers, memory)
+    summary['errors'] = errors
+    return summary
+
+
+def create_backend(name: str, config_path: str = 'model/configs/config.json'):
+    """
+    Create and set up a predictor backend by name.
+
+    Args:
+        name: 'crnn', 'easyocr', 'trocr' or 'synthetic'
+        config_path: CRNN configuration file
+
+    Returns:
+        Predictor instance
+    """
+    if name == 'crnn':
+        from model.mains.predictor import create_predictor
+        return create_predictor(config_path)
+    if name == 'easyocr':
+        from model.mains.easyocr_predictor import create_predictor
+        return create_predictor()
+    if name == 'trocr':
+        from model.mains.trocr_predictor import create_predictor
+        return create_predictor()
+    if name == 'synthetic':
+        # Replays the latency profile in $HTR_SYNTHETIC_PROFILE (capacity tests)
+        from model.mains.synthetic_predictor import create_predictor
+        return create_predictor()
+    raise ValueError(f"Unknown backend: {name}")
+
+
+BACKEND_NAMES = ['crnn', 'easyocr', 'trocr', 'synthetic']
+
+
+MODES = {
+    'single': run_single,
+    'batch': run_batch,
+    'http': run_http,
+}
+
+
+def run_suite(backends: Dict[str, Callable], samples: List[dict], modes: List[str],
+              iterations: int = 1, batch_size: int = 8) -> dict:
+    """
+    Run every backend through every mode, per size preset.
+
+    Args:
+        backends: Mapping of backend name to a zero-argument predictor factory
+        samples: Samples from generate_synthetic_samples()
+        modes: Modes from MODES to run
+        iterations: Passes over the samples per run
+        batch_size: Images per batch in batch mode
+
+    Returns:
+        Report dictionary suitable for JSON serialization
+    """
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'platform': {
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'system': platform.system(),
+            'cpu_count': os.cpu_count(),
+        },
+        'results': [],
+        'skipped': {},
+    }
+    sizes = sorted(set(s['size'] for s in samples), key=list(SIZE_PRESETS).index)
+
+    for backend_name, factory in backends.items():
+        rss_before = current_rss_mb()
+        t0 = time.perf_counter()
+        try:
+            predictor = factory()
+        except Exception as e:
+            print(f"Skipping backend {backend_name}: {e}")
+            report['skipped'][backend_name] = str(e)
+            continue
+        load_seconds = time.perf_counter() - t0
+        print(f"Loaded {backend_name} in {load_seconds:.2f}s")
+
+        for mode in modes:
+            for size in sizes:
+                subset = [s for s in samples if s['size'] == size]
+                print(f"Running {backend_name} / {mode} / {size} ({len(subset)} images)...")
+                if mode == 'batch':
+                    summary = run_batch(predictor, subset, batch_size=batch_size, iterations=iterations)
+                else:
+                    summary = MODES[mode](predictor, subset, iterations=iterations)
+                summary.update({
+                    'backend': backend_name,
+                    'mode': mode,
+                    'size': size,
+                    'load_seconds': load_seconds,
+                    'model_rss_mb': max(0.0, current_rss_mb() - rss_before),
+                })
+                report['results'].append(summary)
+
+        del predictor
+
+    return report
+
+
+def save_report(report: dict, path: str):
+    """
+    Save a benchmark report as JSON.
+
+    Args:
+        report: Report from run_suite()
+        path: Output file path
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+
+
+def compare_reports(current: dict, baseline: dict, tolerance: float = 0.10,
+                    cer_tolerance: float = 0.02) -> List[str]:
+    """
+    Flag regressions of a report against a baseline report.
+
+    Args:
+        current: New report
+        baseline: Previous report
+        tolerance: Allowed relative slowdown of p95 latency and throughput
+        cer_tolerance: Allowed absolute CER increase
+
+    Returns:
+        List of human-readable regression messages (empty if none)
+    """
+    def key(result):
+        return (result['backend'], result['mode'], result['size'])
+
+    previous = {key(r): r for r in baseline.get('results', [])}
+    regressions = []
+
+    for result in current.get('results', []):
+        old = previous.get(key(result))
+        if old is None:
+            continue
+        name = '/'.join(key(result))
+
+        new_p95, old_p95 = result['latency_ms']['p95'], old['latency_ms']['p95']
+        if old_p95 > 0 and new_p95 > old_p95 * (1 + tolerance):
+            regressions.append(f"{name}: p95 latency {old_p95:.1f}ms -> {new_p95:.1f}ms")
+
+        new_tput, old_tput = result['images_per_sec'], old['images_per_sec']
+        if old_tput > 0 and new_tput < old_tput * (1 - tolerance):
+            regressions.append(f"{name}: throughput {old_tput:.2f} -> {new_tput:.2f} images/sec")
+
+        if result.get('cer') is not None and old.get('cer') is not None:
+            if result['cer'] > old['cer'] + cer_tolerance:
+                regressions.append(f"{name}: CER {old['cer']:.3f} -> {result['cer']:.3f}")
+
+    return regressions
@@ -0,0 +1,210 @@
+"""
+Form Templates for Field Extraction
+Aligns incoming pages to a registered reference form and crops only the
+declared regions of interest, so recognition runs on a handful of fields
+instead of the whole page.
+"""
+
+import os
+import json
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+class FormTemplate:
+    """
+    A registered form layout: reference image plus named regions of interest.
+    Field boxes are [x, y, width, height] in reference image coordinates.
+    """
+
+    def __init__(self, name: str, reference: np.ndarray, fields: Dict[str, List[int]],
+                 max_features: int = 2000, min_matches: int = 12):
+        """
+        Initialize a form template.
+
+        Args:
+            name: Template name
+            reference: Reference page as grayscale numpy array
+            fields: Mapping of field name to [x, y, width, height]
+            max_features: Number of ORB features used for alignment
+            min_matches: Minimum good matches required to trust a homography
+        """
+        if reference is None or reference.ndim != 2:
+            raise ValueError("Reference image must be a grayscale array")
+
+        self.name = name
+        self.reference = reference
+        self.fields = {key: [int(v) for v in box] for key, box in fields.items()}
+        self.max_features = max_features
+        self.min_matches = min_matches
+
+        for key, box in self.fields.items():
+            if len(box) != 4 or box[2] <= 0 or box[3] <= 0:
+                raise ValueError(f"Invalid box for field '{key}': {box}")
+
+        # Reference features are computed once and reused for every page
+        self._ref_keypoints, self._ref_descriptors = cv2.ORB_create(max_features).detectAndCompute(reference, None)
+
+    def align(self, page: np.ndarray) -> np.ndarray:
+        """
+        Warp a page onto the reference layout using ORB matching and a homography.
+
+        Args:
+            page: Incoming page as grayscale numpy array
+
+        Returns:
+            Page warped to reference image size
+        """
+        ref_h, ref_w = self.reference.shape[:2]
+
+        # OpenCV detectors and matchers keep per-call state, so concurrent requests
+        # must not share them; creating them is cheap next to the detection itself
+        keypoints, descriptors = cv2.ORB_create(self.max_features).detectAndCompute(page, None)
+        if descriptors is None or self._ref_descriptors is None:
+            raise ValueError(f"Could not align page to template '{self.name}': no features found")
+
+        # Lowe's ratio test on the two nearest neighbours
+        good = []
+        for pair in cv2.BFMatcher(cv2.NORM_HAMMING).knnMatch(descriptors, self._ref_descriptors, k=2):
+            if len(pair) == 2 and pair[0].distance < 0.75 * pair[1].distance:
+                good.append(pair[0])
+
+        if len(good) < self.min_matches:
+            raise ValueError(f"Could not align page to template '{self.name}': "
+                             f"only {len(good)} feature matches")
+
+        src = np.float32([keypoints[m.queryIdx].pt for m in good]).reshape(-1, 1, 2)
+        dst = np.float32([self._ref_keypoints[m.trainIdx].pt for m in good]).reshape(-1, 1, 2)
+        homography, _ = cv2.findHomography(src, dst, cv2.RANSAC, 5.0)
+        if homography is None:
+            raise ValueError(f"Could not align page to template '{self.name}': homography failed")
+
+        return cv2.warpPerspective(page, homography, (ref_w, ref_h), borderValue=255)
+
+    def field_boxes(self) -> List[Tuple[str, List[int]]]:
+        """
+        Get field boxes in EasyOCR horizontal_list format.
+
+        Returns:
+            List of (field_name, [x_min, x_max, y_min, y_max])
+        """
+        return [(key, [x, x + w, y, y + h]) for key, (x, y, w, h) in self.fields.items()]
+
+    def save(self, directory: str):
+        """
+        Save the template (reference.png + template.json) to a directory.
+
+        Args:
+            directory: Target directory
+        """
+        os.makedirs(directory, exist_ok=True)
+        cv2.imwrite(os.path.join(directory, 'reference.png'), self.reference)
+        with open(os.path.join(directory, 'template.json'), 'w') as f:
+            json.dump({'name': self.name, 'fields': self.fields}, f, indent=2)
+
+    @classmethod
+    def load(cls, directory: str) -> 'FormTemplate':
+        """
+        Load a template saved with save().
+
+        Args:
+            directory: Template directory
+
+        Returns:
+            FormTemplate instance
+        """
+        with open(os.path.join(directory, 'template.json'), 'r') as f:
+            meta = json.load(f)
+        reference = cv2.imread(os.path.join(directory, 'reference.png'), cv2.IMREAD_GRAYSCALE)
+        if reference is None:
+            raise FileNotFoundError(f"Reference image missing for template in {directory}")
+        return cls(meta['name'], reference, meta['fields'])
+
+
+class TemplateRegistry:
+    """
+    Directory-backed registry of form templates.
+    Each template is stored in its own sub-directory and cached in memory once loaded.
+    """
+
+    def __init__(self, root: str):
+        """
+        Initialize the registry.
+
+        Args:
+            root: Directory holding one sub-directory per template
+        """
+        self.root = root
+        self._templates = {}
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    @staticmethod
+    def _check_name(name: str):
+        if not name or not re.match(r'^[A-Za-z0-9_\-]+$', name):
+            raise ValueError("Template name may only contain letters, digits, '_' and '-'")
+
+    def register(self, name: str, reference: np.ndarray, fields: Dict[str, List[int]]) -> FormTemplate:
+        """
+        Register (or replace) a template.
+
+        Args:
+            name: Template name
+            reference: Reference page (grayscale or BGR numpy array)
+            fields: Mapping of field name to [x, y, width, height]
+
+        Returns:
+            The registered FormTemplate
+        """
+        self._check_name(name)
+        if reference is not None and reference.ndim == 3:
+            reference = cv2.cvtColor(reference, cv2.COLOR_BGR2GRAY)
+
+        template = FormTemplate(name, reference, fields)
+        template.save(os.path.join(self.root, name))
+        with self._lock:
+            self._templates[name] = template
+        return template
+
+    def get(self, name: str) -> Optional[FormTemplate]:
+        """
+        Get a template by name.
+
+        Args:
+            name: Template name
+
+        Returns:
+            FormTemplate or None if not registered
+        """
+        self._check_name(name)
+        with self._lock:
+            if name in self._templates:
+                return self._templates[name]
+
+        directory = os.path.join(self.root, name)
+        if not os.path.exists(os.path.join(directory, 'template.json')):
+            return None
+
+        template = FormTemplate.load(directory)
+        with self._lock:
+            self._templates[name] = template
+        return template
+
+    def list(self) -> Dict[str, List[str]]:
+        """
+        List registered templates.
+
+        Returns:
+            Mapping of template name to its field names
+        """
+        result = {}
+        for name in sorted(os.listdir(self.root)):
+            path = os.path.join(self.root, name, 'template.json')
+            if os.path.exists(path):
+                with open(path, 'r') as f:
+                    result[name] = list(json.load(f)['fields'].keys())
+        return result
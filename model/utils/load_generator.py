@@ -0,0 +1,258 @@
+"""
+Load Generator
+Drives /predict at a target concurrency (closed loop: N clients, each sending
+its next request when the previous one returns) or at a target arrival rate
+(open loop: Poisson arrivals, whether or not earlier requests have finished)
+and reports throughput, latency percentiles, error rate and shed rate.
+
+Closed loops find the throughput ceiling; open loops show what users see at a
+given traffic level, because a slow server cannot slow the arrivals down.
+Open-loop latency is measured from each request's scheduled arrival time, so
+time spent waiting for a free client counts against the server.
+
+Pair it with the synthetic backend (model/mains/synthetic_predictor.py) to size
+the serving layer without model hardware; see scripts/load_test.py.
+"""
+
+import io
+import json
+import time
+import uuid
+import struct
+import threading
+import itertools
+import urllib.error
+import urllib.request
+from collections import Counter as CounterDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+from model.utils.benchmark import percentile
+
+
+# Statuses counted as load shedding rather than errors: QoS cache_only rejections
+# and draining workers answer 503, rate limiters 429
+SHED_STATUSES = (429, 503)
+
+
+def encode_multipart(fields: dict, files: dict) -> Tuple[bytes, str]:
+    """
+    Encode a multipart/form-data body.
+
+    Args:
+        fields: Form field name -> value
+        files: Form field name -> (filename, bytes)
+
+    Returns:
+        (body, content type header value)
+    """
+    boundary = uuid.uuid4().hex
+    body = io.BytesIO()
+    for name, value in fields.items():
+        body.write(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    for name, (filename, data) in files.items():
+        body.write(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                   f'Content-Type: application/octet-stream\r\n\r\n'.encode())
+        body.write(data)
+        body.write(b'\r\n')
+    body.write(f'--{boundary}--\r\n'.encode())
+    return body.getvalue(), f'multipart/form-data; boundary={boundary}'
+
+
+class HTTPSender:
+    """Posts images to a running server's /predict."""
+
+    def __init__(self, base_url: str, timeout: float = 60.0, fields: Optional[dict] = None):
+        """
+        Initialize the sender.
+
+        Args:
+            base_url: Server URL, e.g. http://localhost:5000
+            timeout: Seconds before a request counts as failed
+            fields: Extra form fields sent with every request (e.g. {'tier': 'reduced'})
+        """
+        self.url = base_url.rstrip('/') + '/predict'
+        self.timeout = timeout
+        self.fields = fields or {}
+
+    def __call__(self, data: bytes, filename: str) -> Tuple[int, dict]:
+        body, content_type = encode_multipart(self.fields, {'file': (filename, data)})
+        req = urllib.request.Request(self.url, data=body, headers={'Content-Type': content_type})
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as response:
+                return response.status, json.loads(response.read() or b'{}')
+        except urllib.error.HTTPError as e:
+            try:
+                payload = json.loads(e.read() or b'{}')
+            except ValueError:
+                payload = {}
+            return e.code, payload
+
+
+class FlaskSender:
+    """Posts images to an in-process Flask app through its test client."""
+
+    def __init__(self, app, fields: Optional[dict] = None):
+        """
+        Initialize the sender.
+
+        Args:
+            app: Flask application
+            fields: Extra form fields sent with every request
+        """
+        self.app = app
+        self.fields = fields or {}
+
+    def __call__(self, data: bytes, filename: str) -> Tuple[int, dict]:
+        form = dict(self.fields)
+        form['file'] = (io.BytesIO(data), filename)
+        # One client per request: test clients keep per-client state and are not thread-safe
+        response = self.app.test_client().post('/predict', data=form, content_type='multipart/form-data')
+        return response.status_code, response.get_json(silent=True) or {}
+
+
+class _Recorder:
+    """Collects request outcomes from sender threads."""
+
+    def __init__(self):
+        self.records = []
+        self._lock = threading.Lock()
+        self._sequence = itertools.count()
+
+    def unique(self, data: bytes) -> bytes:
+        # Bytes after the image's end marker are ignored by decoders but change the file
+        # hash, so every request misses the prediction cache like distinct uploads would
+        return data + struct.pack('<Q', next(self._sequence))
+
+    def send(self, send: Callable, data: bytes, filename: str, started: float):
+        try:
+            status, payload = send(data, filename)
+        except Exception as e:
+            status, payload = 0, {'error': str(e)}
+        latency = time.perf_counter() - started
+        with self._lock:
+            self.records.append((status, latency, payload))
+
+
+def summarize_load(records: List[tuple], elapsed: float, sent: int) -> dict:
+    """
+    Summarize a load run.
+
+    Args:
+        records: (status, latency seconds, response payload) per finished request
+        elapsed: Wall time of the run in seconds
+        sent: Requests sent (including unfinished ones)
+
+    Returns:
+        Dictionary with throughput, latency percentiles (ms) of successful
+        requests, error and shed rates, and status and QoS tier counts
+    """
+    ok = [latency * 1000.0 for status, latency, payload in records if status == 200 and payload.get('success')]
+    shed = sum(1 for status, _, _ in records if status in SHED_STATUSES)
+    errors = len(records) - len(ok) - shed
+    return {
+        'sent': sent,
+        'finished': len(records),
+        'completed': len(ok),
+        'elapsed_seconds': round(elapsed, 3),
+        'throughput_rps': len(ok) / elapsed if elapsed > 0 else 0.0,
+        'latency_ms': {
+            'p50': percentile(ok, 50),
+            'p95': percentile(ok, 95),
+            'p99': percentile(ok, 99),
+            'mean': float(np.mean(ok)) if ok else 0.0,
+            'max': max(ok) if ok else 0.0,
+        },
+        'error_rate': errors / sent if sent else 0.0,
+        'shed_rate': shed / sent if sent else 0.0,
+        'status_counts': {str(status): count for status, count in
+                          sorted(CounterDict(status for status, _, _ in records).items())},
+        'qos_tiers': dict(CounterDict(payload.get('qos_tier') for status, _, payload in records
+                                      if payload.get('qos_tier'))),
+    }
+
+
+def run_closed_loop(send: Callable, images: List[Tuple[str, bytes]], concurrency: int,
+                    duration: Optional[float] = None, requests: Optional[int] = None,
+                    unique: bool = True) -> dict:
+    """
+    Run a fixed number of clients that each send back-to-back requests.
+
+    Args:
+        send: Sender, called as send(data, filename) -> (status, payload)
+        images: (filename, encoded bytes) pairs, used round-robin
+        concurrency: Number of concurrent clients
+        duration: Stop sending after this many seconds
+        requests: Stop after this many requests in total (one of duration/requests is required)
+        unique: Make every request's bytes unique so none is served from the cache
+
+    Returns:
+        Summary from summarize_load() with 'mode' and 'concurrency'
+    """
+    if duration is None and requests is None:
+        raise ValueError("duration or requests is required")
+    recorder = _Recorder()
+    tickets = itertools.count()
+    start = time.perf_counter()
+    deadline = start + duration if duration is not None else None
+
+    def client():
+        while True:
+            ticket = next(tickets)
+            if (requests is not None and ticket >= requests) or \
+                    (deadline is not None and time.perf_counter() >= deadline):
+                return
+            filename, data = images[ticket % len(images)]
+            recorder.send(send, recorder.unique(data) if unique else data, filename, time.perf_counter())
+
+    threads = [threading.Thread(target=client, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    summary = summarize_load(recorder.records, time.perf_counter() - start, len(recorder.records))
+    summary.update({'mode': 'closed', 'concurrency': concurrency})
+    return summary
+
+
+def run_open_loop(send: Callable, images: List[Tuple[str, bytes]], rate: float, duration: float,
+                  max_clients: int = 256, seed: int = 0, unique: bool = True) -> dict:
+    """
+    Send requests with Poisson arrivals at a target rate.
+
+    Args:
+        send: Sender, called as send(data, filename) -> (status, payload)
+        images: (filename, encoded bytes) pairs, used round-robin
+        rate: Mean arrivals per second
+        duration: Seconds of arrivals to generate
+        max_clients: Concurrent requests the generator can hold open; arrivals beyond
+            that wait for a client, and the wait counts toward their latency
+        seed: Random seed for the arrival schedule
+        unique: Make every request's bytes unique so none is served from the cache
+
+    Returns:
+        Summary from summarize_load() with 'mode', 'offered_rps' and 'max_clients'
+    """
+    rng = np.random.default_rng(seed)
+    recorder = _Recorder()
+    sent = 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_clients) as pool:
+        scheduled = start
+        while True:
+            scheduled += rng.exponential(1.0 / rate)
+            if scheduled - start >= duration:
+                break
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            filename, data = images[sent % len(images)]
+            pool.submit(recorder.send, send, recorder.unique(data) if unique else data, filename, scheduled)
+            sent += 1
+
+    summary = summarize_load(recorder.records, time.perf_counter() - start, sent)
+    summary.update({'mode': 'open', 'offered_rps': rate, 'max_clients': max_clients})
+    return summary
@@ -0,0 +1,324 @@
+"""
+Worker Memory Watchdog
+Long-running workers slowly gain resident memory: caches fill up, and the
+allocator keeps freed arenas of the large temporary images each request
+creates. The watchdog tracks RSS and glibc allocator statistics, returns
+free arena memory to the OS periodically (malloc_trim), and when a worker
+passes its request budget or memory ceiling it starts draining: /health
+reports 503 so the load balancer stops routing new work, and once no
+request is in flight the worker asks its process manager to replace it.
+Without a process manager nothing would replace the worker, so the due
+recycle is only reported (stats() and /metrics) and the worker keeps serving.
+
+Settings live in the "memory" section of model/configs/config.json.
+"""
+
+import os
+import sys
+import json
+import time
+import ctypes
+import ctypes.util
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+
+
+DEFAULT_MEMORY = {
+    'enabled': True,
+    # Recycle after this many requests (0: never)
+    'max_requests': 0,
+    # Recycle when RSS stays above this after trimming (0: never)
+    'rss_ceiling_mb': 0,
+    # Return free allocator memory to the OS every N requests (0: never)
+    'trim_every': 50,
+    # Attribute RSS growth to pipeline stages (one /proc read per stage)
+    'stage_rss': False,
+    # Maximum entries in the app's prediction cache (least recently used are evicted)
+    'prediction_cache_entries': 5000,
+}
+
+
+class _MallInfo2(ctypes.Structure):
+    _fields_ = [(name, ctypes.c_size_t) for name in
+                ('arena', 'ordblks', 'smblks', 'hblks', 'hblkhd', 'usmblks',
+                 'fsmblks', 'uordblks', 'fordblks', 'keepcost')]
+
+
+# glibc only; elsewhere trimming and allocator statistics are skipped
+try:
+    _libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6')
+    _malloc_trim = _libc.malloc_trim
+    _malloc_trim.argtypes = [ctypes.c_size_t]
+    MALLOC_TRIM_AVAILABLE = True
+except (OSError, AttributeError):
+    _libc = None
+    MALLOC_TRIM_AVAILABLE = False
+
+try:
+    _mallinfo2 = _libc.mallinfo2
+    _mallinfo2.restype = _MallInfo2
+    MALLINFO_AVAILABLE = True
+except AttributeError:
+    MALLINFO_AVAILABLE = False
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def load_memory_config(config_path: str) -> dict:
+    """
+    Load the memory section of a config file, filled with defaults.
+
+    Args:
+        config_path: Path to the configuration JSON file
+
+    Returns:
+        Memory watchdog settings dictionary
+    """
+    settings = dict(DEFAULT_MEMORY)
+    if os.path.exists(config_path):
+        with open(config_path, 'r') as f:
+            settings.update(json.load(f).get('memory', {}))
+    return settings
+
+
+def rss_bytes() -> int:
+    """Current resident set size of this process in bytes (0 if unknown)."""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError):
+        return 0
+
+
+def malloc_stats() -> Optional[dict]:
+    """
+    glibc allocator statistics.
+
+    Returns:
+        Dictionary with arena, mmap, in_use and free bytes, or None if unavailable
+    """
+    if not MALLINFO_AVAILABLE:
+        return None
+    info = _mallinfo2()
+    return {
+        'arena_bytes': info.arena,
+        'mmap_bytes': info.hblkhd,
+        'in_use_bytes': info.uordblks,
+        'free_bytes': info.fordblks,
+    }
+
+
+def malloc_trim() -> bool:
+    """
+    Return free heap memory to the operating system.
+
+    Returns:
+        True if memory was released
+    """
+    return bool(_malloc_trim(0)) if MALLOC_TRIM_AVAILABLE else False
+
+
+class BoundedCache:
+    """Thread-safe dictionary that evicts the least recently used entries."""
+
+    def __init__(self, max_entries: int = 5000):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of entries (0 or less: unbounded)
+        """
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._entries:
+                return default
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def __getitem__(self, key):
+        with self._lock:
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while 0 < self.max_entries < len(self._entries):
+                self._entries.popitem(last=False)
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class MemoryWatchdog:
+    """Tracks a worker's memory and decides when it should be recycled."""
+
+    def __init__(self, settings: Optional[dict] = None, on_recycle: Optional[Callable[[str], None]] = None):
+        """
+        Initialize the watchdog.
+
+        Args:
+            settings: Memory settings (see DEFAULT_MEMORY)
+            on_recycle: Called once with the reason when a draining worker is idle;
+                None only reports that recycling is due
+        """
+        self.settings = dict(DEFAULT_MEMORY)
+        self.settings.update(settings or {})
+        self.on_recycle = on_recycle
+        self.started = time.time()
+        self.baseline_rss = rss_bytes()
+        self.peak_rss = self.baseline_rss
+        self.requests = 0
+        self.trims = 0
+        self.recycle_reason = None
+        self.in_flight = 0
+        self._recycled = False
+        self._lock = threading.Lock()
+
+    @property
+    def recycle_due(self) -> bool:
+        """True once the worker has passed its request budget or memory ceiling."""
+        return self.recycle_reason is not None
+
+    @property
+    def draining(self) -> bool:
+        """True once the worker should stop taking new work (only if it will be replaced)."""
+        return self.recycle_due and self.on_recycle is not None
+
+    def request_started(self):
+        """Count a request (of any kind) as in flight."""
+        with self._lock:
+            self.in_flight += 1
+
+    def request_finished(self):
+        """Count an in-flight request as finished."""
+        with self._lock:
+            self.in_flight = max(0, self.in_flight - 1)
+
+    def record_request(self, count: int = 1) -> Optional[str]:
+        """
+        Account for finished requests and check the limits.
+
+        Args:
+            count: Requests (or queue tasks) just finished
+
+        Returns:
+            Recycle reason if the worker is now draining, else None
+        """
+        if not self.settings['enabled']:
+            return None
+        with self._lock:
+            before = self.requests
+            self.requests += count
+            trim_every = int(self.settings['trim_every'] or 0)
+            if trim_every and self.requests // trim_every != before // trim_every:
+                self.trim()
+
+            rss = rss_bytes()
+            ceiling = float(self.settings['rss_ceiling_mb'] or 0) * 1024 * 1024
+            if ceiling and rss >= ceiling:
+                # Freed-but-kept arena memory is not a reason to restart
+                self.trim()
+                rss = rss_bytes()
+            self.peak_rss = max(self.peak_rss, rss)
+
+            if self.recycle_reason is None:
+                max_requests = int(self.settings['max_requests'] or 0)
+                if ceiling and rss >= ceiling:
+                    self.recycle_reason = f'rss {rss / (1024 * 1024):.0f}MB >= {ceiling / (1024 * 1024):.0f}MB'
+                elif max_requests and self.requests >= max_requests:
+                    self.recycle_reason = f'{self.requests} requests >= {max_requests}'
+                if self.recycle_reason is not None and self.on_recycle is not None:
+                    print(f"Memory watchdog: draining worker {os.getpid()} ({self.recycle_reason})")
+                elif self.recycle_reason is not None:
+                    print(f"Memory watchdog: worker {os.getpid()} is due for recycling ({self.recycle_reason}), "
+                          f"but no process manager would replace it; it keeps serving")
+            return self.recycle_reason
+
+    def request_recycle(self, reason: str):
+        """
+        Start draining for a reason outside the watchdog's own limits
+        (e.g. the inference process died); the first reason is kept.
+
+        Args:
+            reason: Why the worker should be replaced
+        """
+        with self._lock:
+            if self.recycle_reason is None:
+                self.recycle_reason = reason
+                print(f"Memory watchdog: worker {os.getpid()} should be replaced ({reason})")
+
+    def trim(self) -> bool:
+        """Return free allocator memory to the OS."""
+        self.trims += 1
+        return malloc_trim()
+
+    def maybe_recycle(self, in_flight: Optional[int] = None) -> bool:
+        """
+        Recycle a draining worker once it is idle.
+
+        Args:
+            in_flight: Requests still being processed by this worker
+                (the request_started/request_finished count if None)
+
+        Returns:
+            True if on_recycle was called now
+        """
+        if in_flight is None:
+            in_flight = self.in_flight
+        if not self.draining or in_flight > 0 or self._recycled or self.on_recycle is None:
+            return False
+        self._recycled = True
+        print(f"Memory watchdog: recycling worker {os.getpid()} ({self.recycle_reason})")
+        self.on_recycle(self.recycle_reason)
+        return True
+
+    def install_stage_probe(self, registry):
+        """Attribute RSS growth to pipeline stages of a metrics registry (if enabled)."""
+        if self.settings['enabled'] and self.settings['stage_rss']:
+            registry.memory_probe = rss_bytes
+
+    def stats(self) -> dict:
+        """
+        Memory telemetry of this worker.
+
+        Returns:
+            Dictionary with RSS, growth since start, allocator stats and drain state
+        """
+        rss = rss_bytes()
+        mb = 1024 * 1024
+        return {
+            'pid': os.getpid(),
+            'rss_mb': round(rss / mb, 1),
+            'peak_rss_mb': round(max(self.peak_rss, rss) / mb, 1),
+            'growth_mb': round((rss - self.baseline_rss) / mb, 1),
+            'uptime_seconds': round(time.time() - self.started, 1),
+            'requests': self.requests,
+            'trims': self.trims,
+            'malloc': malloc_stats(),
+            'in_flight': self.in_flight,
+            'recycle_due': self.recycle_due,
+            'draining': self.draining,
+            'recycle_reason': self.recycle_reason,
+        }
+
+
+def supervised() -> bool:
+    """True when a process manager restarts workers that exit (gunicorn, or HTR_RECYCLE=1)."""
+    if os.environ.get('HTR_RECYCLE') is not None:
+        return os.environ['HTR_RECYCLE'] == '1'
+    return 'gunicorn' in sys.modules
@@ -0,0 +1,261 @@
+"""
+Lightweight Metrics Collection
+Stage timings, counters and gauges exported in Prometheus text format.
+When disabled, stage() returns a shared no-op context manager so the
+instrumentation left in the predictors costs a single attribute check.
+"""
+
+import os
+import time
+import threading
+from typing import Dict, List, Optional, Tuple
+
+
+# Latency buckets in seconds, from cache lookups up to full-page sweeps
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...], extra: Optional[Tuple[str, str]] = None) -> str:
+    """Render a label set as {key="value",...}."""
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ''
+    escaped = []
+    for key, value in items:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        escaped.append(f'{key}="{value}"')
+    return '{' + ','.join(escaped) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))
+
+
+class Counter:
+    """Monotonically increasing counter with labels."""
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+
+class Gauge:
+    """Value that can go up and down, with labels."""
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def set(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = float(value)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Cumulative histogram with labels, in Prometheus bucket semantics."""
+
+    def __init__(self, name: str, help_text: str, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['counts'][i] += 1
+                    break
+            series['sum'] += value
+            series['count'] += 1
+
+    def snapshot(self) -> Dict[Tuple, dict]:
+        """Copy of per-label-set bucket counts (non-cumulative), sum and count."""
+        with self._lock:
+            return {key: {'counts': list(s['counts']), 'sum': s['sum'], 'count': s['count']}
+                    for key, s in self._series.items()}
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, series in sorted(self.snapshot().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series['counts']):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(labels, ('le', _format_value(bound)))} "
+                             f"{cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(series['sum'])}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {series['count']}")
+        return lines
+
+
+class _NullStage:
+    """No-op stage used when metrics are disabled."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    """Times one pipeline stage into the stage histogram and the request breakdown."""
+
+    __slots__ = ('registry', 'name', 'labels', 'start', 'rss')
+
+    def __init__(self, registry, name: str, labels: dict):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+        self.start = 0.0
+        self.rss = None
+
+    def __enter__(self):
+        probe = self.registry.memory_probe
+        if probe is not None:
+            self.rss = probe()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        self.registry.stage_seconds.observe(elapsed, stage=self.name, **self.labels)
+        if self.rss is not None:
+            # Process-wide RSS, so concurrent requests blur it; stages that leak still
+            # stand out as steadily growing totals
+            growth = self.registry.memory_probe() - self.rss
+            if growth > 0:
+                self.registry.stage_rss_growth.inc(growth, stage=self.name)
+        timings = getattr(self.registry._local, 'timings', None)
+        if timings is not None:
+            entry = {'stage': self.name, 'ms': round(elapsed * 1000.0, 3)}
+            entry.update(self.labels)
+            timings.append(entry)
+        return False
+
+
+class MetricsRegistry:
+    """
+    Registry of metrics for the application.
+    Per-request stage breakdowns are collected in thread-local storage.
+    """
+
+    def __init__(self, enabled: bool = True):
+        """
+        Initialize the registry.
+
+        Args:
+            enabled: Whether stage timings and counters are recorded
+        """
+        self.enabled = enabled
+        self._metrics = []
+        self._local = threading.local()
+
+        self.stage_seconds = self.histogram('htr_stage_seconds', 'Time spent per pipeline stage')
+        self.requests_total = self.counter('htr_requests_total', 'Requests handled by endpoint and status')
+        self.cache_lookups_total = self.counter('htr_cache_lookups_total', 'Cache lookups by cache and result')
+        self.stage_rss_growth = self.counter('htr_stage_rss_growth_bytes_total',
+                                             'Resident memory growth observed across each pipeline stage')
+        # Callable returning the current RSS in bytes; set by the memory watchdog to
+        # attribute memory growth to stages
+        self.memory_probe = None
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        metric = Counter(name, help_text)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge(self, name: str, help_text: str) -> Gauge:
+        metric = Gauge(name, help_text)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help_text: str, buckets=DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, help_text, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def stage(self, name: str, **labels):
+        """
+        Context manager timing a pipeline stage.
+
+        Args:
+            name: Stage name (e.g. 'detection')
+            **labels: Extra labels (e.g. strategy='original_mag1.5')
+
+        Returns:
+            Context manager
+        """
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name, labels)
+
+    def count_cache_lookup(self, cache: str, hit: bool):
+        if self.enabled:
+            self.cache_lookups_total.inc(cache=cache, result='hit' if hit else 'miss')
+
+    def start_request(self):
+        """Begin collecting a stage breakdown for the current thread's request."""
+        if self.enabled:
+            self._local.timings = []
+
+    def end_request(self) -> List[dict]:
+        """
+        Stop collecting the current request's breakdown.
+
+        Returns:
+            List of {'stage', 'ms', ...labels} in completion order
+        """
+        timings = getattr(self._local, 'timings', None)
+        self._local.timings = None
+        return timings or []
+
+    def render(self) -> str:
+        """
+        Render all metrics in Prometheus text exposition format.
+
+        Returns:
+            Metrics text
+        """
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+# Process-wide registry; set HTR_METRICS=0 to disable collection
+METRICS = MetricsRegistry(enabled=os.environ.get('HTR_METRICS', '1') != '0')
@@ -0,0 +1,313 @@
+"""
+Local Model Store
+Weights are prepared once into a local directory in a memory-mappable
+format, then loaded with mmap so that every worker process shares the same
+pages through the OS page cache instead of holding a private copy.
+
+- TrOCR: save_pretrained(safe_serialization=True) -> safetensors
+- EasyOCR: detector/recognizer .pth plus a copy in torch's zip format,
+  which torch.load(mmap=True) can map without reading the whole file
+
+Each store has a manifest.json with SHA-256 checksums. Checksums are fully
+verified the first time a store is loaded (or after a file changes) and a
+stamp file records the verified sizes and mtimes for later starts.
+"""
+
+import os
+import json
+import hashlib
+import contextlib
+from typing import Optional
+
+
+MANIFEST = 'manifest.json'
+VERIFIED_STAMP = '.verified.json'
+MMAP_SUFFIX = '.mmap.pt'
+
+
+def sha256_file(path: str, chunk_size: int = 8 * 1024 * 1024) -> str:
+    """
+    Calculate the SHA-256 of a file.
+
+    Args:
+        path: Path to the file
+        chunk_size: Read size in bytes
+
+    Returns:
+        Hex digest
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def write_manifest(store_dir: str, backend: str, source: str) -> dict:
+    """
+    Write manifest.json with checksums for every file in a store.
+
+    Args:
+        store_dir: Store directory
+        backend: Backend name ('easyocr' or 'trocr')
+        source: Where the weights came from (model name or directory)
+
+    Returns:
+        The manifest dictionary
+    """
+    files = {}
+    for root, _, names in os.walk(store_dir):
+        for name in sorted(names):
+            if name in (MANIFEST, VERIFIED_STAMP):
+                continue
+            path = os.path.join(root, name)
+            rel = os.path.relpath(path, store_dir)
+            files[rel] = {'sha256': sha256_file(path), 'size': os.path.getsize(path)}
+
+    manifest = {'backend': backend, 'source': source, 'files': files}
+    with open(os.path.join(store_dir, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    # Freshly written files need no re-verification
+    _write_stamp(store_dir, files)
+    return manifest
+
+
+def _file_state(path: str) -> list:
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _write_stamp(store_dir: str, files: dict, previous: Optional[dict] = None):
+    stamp = {rel: _file_state(os.path.join(store_dir, rel)) for rel in files}
+    if stamp == previous:
+        return
+    # Workers start concurrently: write a temporary file and rename it, so a reader
+    # never sees a half-written stamp
+    path = os.path.join(store_dir, VERIFIED_STAMP)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump(stamp, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        # Read-only stores still load; they are just re-hashed on every start
+        print(f"Note: could not record model store verification in {store_dir}: {e}")
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+
+
+def verify_store(store_dir: str, backend: Optional[str] = None, force: bool = False) -> dict:
+    """
+    Verify a store against its manifest.
+
+    Files whose size and mtime match the last successful verification are
+    not re-hashed unless force is set.
+
+    Args:
+        store_dir: Store directory
+        backend: Expected backend name (not checked if None)
+        force: Re-hash every file
+
+    Returns:
+        The manifest dictionary
+
+    Raises:
+        FileNotFoundError: If the store or a listed file is missing
+        ValueError: If the backend or a checksum does not match
+    """
+    manifest_path = os.path.join(store_dir, MANIFEST)
+    if not os.path.exists(manifest_path):
+        raise FileNotFoundError(f"No model store manifest at {manifest_path}")
+    with open(manifest_path, 'r') as f:
+        manifest = json.load(f)
+
+    if backend is not None and manifest.get('backend') != backend:
+        raise ValueError(f"Model store {store_dir} is for '{manifest.get('backend')}', not '{backend}'")
+
+    stamp = {}
+    stamp_path = os.path.join(store_dir, VERIFIED_STAMP)
+    if os.path.exists(stamp_path) and not force:
+        try:
+            with open(stamp_path, 'r') as f:
+                stamp = json.load(f)
+        except (OSError, ValueError):
+            # An unreadable stamp only costs a full re-hash
+            stamp = {}
+
+    for rel, info in manifest['files'].items():
+        path = os.path.join(store_dir, rel)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Model store file missing: {path}")
+        if os.path.getsize(path) != info['size']:
+            raise ValueError(f"Model store file has wrong size: {path}")
+        if stamp.get(rel) == _file_state(path):
+            continue
+        if sha256_file(path) != info['sha256']:
+            raise ValueError(f"Model store checksum mismatch: {path}")
+
+    _write_stamp(store_dir, manifest['files'], previous=stamp)
+    return manifest
+
+
+def prepare_trocr_store(model_name: str, store_dir: str) -> dict:
+    """
+    Download (if needed) a TrOCR model and save it as safetensors.
+
+    Args:
+        model_name: Hugging Face model name
+        store_dir: Output directory
+
+    Returns:
+        The manifest dictionary
+    """
+    from transformers import TrOCRProcessor, VisionEncoderDecoderModel
+
+    os.makedirs(store_dir, exist_ok=True)
+    processor = TrOCRProcessor.from_pretrained(model_name)
+    model = VisionEncoderDecoderModel.from_pretrained(model_name)
+    processor.save_pretrained(store_dir)
+    model.save_pretrained(store_dir, safe_serialization=True)
+    return write_manifest(store_dir, 'trocr', model_name)
+
+
+def load_trocr(store_dir: str, device='cpu'):
+    """
+    Load TrOCR from a verified store with memory-mapped safetensors.
+
+    Args:
+        store_dir: Store directory from prepare_trocr_store()
+        device: Torch device
+
+    Returns:
+        (processor, model)
+    """
+    from transformers import TrOCRProcessor, VisionEncoderDecoderModel
+
+    verify_store(store_dir, backend='trocr')
+    processor = TrOCRProcessor.from_pretrained(store_dir, local_files_only=True)
+    model = VisionEncoderDecoderModel.from_pretrained(store_dir, local_files_only=True,
+                                                      use_safetensors=True, low_cpu_mem_usage=True)
+    return processor, model.to(device)
+
+
+def prepare_easyocr_store(store_dir: str, lang_list=('en',)) -> dict:
+    """
+    Fetch EasyOCR weights (if needed) and add mmap-able copies of them.
+
+    The original .pth files are copied unchanged because EasyOCR checks their
+    MD5 sums; each gets a sibling <name>.mmap.pt in torch's zip format, which
+    torch.load(mmap=True) can map without reading the whole file.
+
+    Args:
+        store_dir: Output directory
+        lang_list: Languages whose models should be included
+
+    Returns:
+        The manifest dictionary
+    """
+    import torch
+    import shutil
+    import easyocr
+
+    # Let EasyOCR download into its usual location first
+    reader = easyocr.Reader(list(lang_list), gpu=False, verbose=False)
+    source_dir = reader.model_storage_directory
+
+    os.makedirs(store_dir, exist_ok=True)
+    for name in sorted(os.listdir(source_dir)):
+        if name.endswith('.pth'):
+            source = os.path.join(source_dir, name)
+            shutil.copy2(source, os.path.join(store_dir, name))
+            state_dict = torch.load(source, map_location='cpu', weights_only=False)
+            torch.save(state_dict, os.path.join(store_dir, name + MMAP_SUFFIX))
+    return write_manifest(store_dir, 'easyocr', source_dir)
+
+
+@contextlib.contextmanager
+def _mmap_torch_load(loaded: list):
+    """
+    Redirect torch.load to the mmap-able copy of each checkpoint while EasyOCR
+    builds its networks, recording the files that were loaded.
+    """
+    import torch
+
+    original = torch.load
+
+    def load(f, *args, **kwargs):
+        if isinstance(f, str) and os.path.exists(f + MMAP_SUFFIX):
+            f = f + MMAP_SUFFIX
+            kwargs['mmap'] = True
+        loaded.append(f)
+        return original(f, *args, **kwargs)
+
+    torch.load = load
+    try:
+        yield
+    finally:
+        torch.load = original
+
+
+def _rebind_to_mmap(module, checkpoint_path: str):
+    """Point a module's parameters at a memory-mapped checkpoint instead of private copies."""
+    import torch
+
+    state_dict = torch.load(checkpoint_path, map_location='cpu', mmap=True, weights_only=False)
+    state_dict = {(k[7:] if k.startswith('module.') else k): v for k, v in state_dict.items()}
+    module.load_state_dict(state_dict, assign=True)
+
+
+def load_easyocr_reader(store_dir: str, lang_list=('en',), quantize: bool = False):
+    """
+    Build an EasyOCR reader from a verified store.
+
+    With quantize=False the detector and recognizer parameters stay backed by
+    the mapped files, so their pages are shared by every worker. EasyOCR's
+    dynamic int8 quantization creates private copies of the quantized layers,
+    trading page sharing for faster CPU inference: quantize=True turns page
+    sharing off.
+
+    Args:
+        store_dir: Store directory from prepare_easyocr_store()
+        lang_list: Languages to load
+        quantize: Apply EasyOCR's dynamic quantization
+
+    Returns:
+        easyocr.Reader instance
+    """
+    import easyocr
+
+    verify_store(store_dir, backend='easyocr')
+    loaded = []
+    with _mmap_torch_load(loaded):
+        reader = easyocr.Reader(list(lang_list), gpu=False, verbose=False, quantize=quantize,
+                                model_storage_directory=store_dir, download_enabled=False)
+
+    # EasyOCR loads the detector first, then the recognizer
+    if not quantize and len(loaded) >= 2:
+        for module, path in ((reader.detector, loaded[0]), (reader.recognizer, loaded[-1])):
+            if path.endswith(MMAP_SUFFIX):
+                _rebind_to_mmap(module, path)
+
+    return reader
+
+
+def rss_breakdown() -> dict:
+    """
+    Memory of this process from /proc/self/smaps_rollup (Linux).
+
+    Returns:
+        Dictionary with rss_mb, pss_mb, shared_mb and private_mb (empty if unavailable)
+    """
+    fields = {'Rss': 'rss_mb', 'Pss': 'pss_mb', 'Shared_Clean': 'shared_mb',
+              'Private_Clean': 'private_clean_mb', 'Private_Dirty': 'private_mb'}
+    result = {}
+    try:
+        with open('/proc/self/smaps_rollup', 'r') as f:
+            for line in f:
+                key, _, rest = line.partition(':')
+                if key in fields:
+                    result[fields[key]] = int(rest.split()[0]) / 1024.0
+    except OSError:
+        pass
+    return result
@@ -0,0 +1,23 @@
+"""
+Prediction Error Text
+Some predictors report failures as text instead of raising (CRNN returns
+"Error during prediction: ...", TrOCR "Error during recognition: ...").
+Callers that cache or publish results use these helpers so such text is
+treated as an error, never as recognized text.
+"""
+
+
+PREDICTION_ERROR_PREFIXES = ('Error during prediction:', 'Error during recognition:')
+
+
+def is_prediction_error(text) -> bool:
+    """
+    Check whether a predictor returned an error message in place of text.
+
+    Args:
+        text: Value returned by predict() or predict_batch()
+
+    Returns:
+        True if it is an error message
+    """
+    return isinstance(text, str) and text.startswith(PREDICTION_ERROR_PREFIXES)
@@ -0,0 +1,324 @@
+"""
+Request Profiling
+Opt-in cProfile (or pyinstrument) and torch profiler capture for single
+requests, plus 1-in-N sampling that keeps only the top-K slowest traces.
+
+Safe for production use: at most one request is profiled at a time, other
+requests run unprofiled, and the number of traces kept on disk is bounded.
+Both hold across gunicorn workers sharing the output directory: the active
+profile and the index are guarded by file locks (POSIX only; elsewhere the
+guarantees are per process).
+"""
+
+import os
+import io
+import sys
+import json
+import time
+import uuid
+import pstats
+import cProfile
+import threading
+import contextlib
+from typing import List, Optional
+
+# fcntl is POSIX only; without it locking is per process
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    fcntl = None
+    FCNTL_AVAILABLE = False
+
+# pyinstrument is optional; cProfile is always available
+try:
+    from pyinstrument import Profiler as PyInstrumentProfiler
+    PYINSTRUMENT_AVAILABLE = True
+except ImportError:
+    PyInstrumentProfiler = None
+    PYINSTRUMENT_AVAILABLE = False
+
+
+# File suffix per artifact kind
+ARTIFACTS = {
+    'prof': '.prof',
+    'txt': '.txt',
+    'html': '.html',
+    'trace': '.trace.json',
+}
+
+
+class ProfileSession:
+    """Profilers running for one request."""
+
+    def __init__(self, profile_id: str, label: str, reason: str, use_torch: bool):
+        self.profile_id = profile_id
+        self.label = label
+        self.reason = reason
+        self.start = 0.0
+        self.duration = 0.0
+        self.status = None
+        self._cprofile = None
+        self._pyinstrument = None
+        self._torch_profiler = None
+        self._use_torch = use_torch
+
+    def start_profilers(self):
+        self.start = time.perf_counter()
+        if PYINSTRUMENT_AVAILABLE:
+            self._pyinstrument = PyInstrumentProfiler()
+            self._pyinstrument.start()
+        else:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+
+        # Only trace torch when a torch backend is already loaded
+        torch = sys.modules.get('torch') if self._use_torch else None
+        if torch is not None:
+            try:
+                self._torch_profiler = torch.profiler.profile(
+                    activities=[torch.profiler.ProfilerActivity.CPU], record_shapes=True)
+                self._torch_profiler.__enter__()
+            except Exception as e:
+                print(f"Warning: torch profiler unavailable: {e}")
+                self._torch_profiler = None
+
+    def stop_profilers(self):
+        self.duration = time.perf_counter() - self.start
+        if self._torch_profiler is not None:
+            try:
+                self._torch_profiler.__exit__(None, None, None)
+            except Exception as e:
+                print(f"Warning: torch profiler failed: {e}")
+                self._torch_profiler = None
+        if self._pyinstrument is not None:
+            self._pyinstrument.stop()
+        if self._cprofile is not None:
+            self._cprofile.disable()
+
+    def save(self, directory: str) -> List[str]:
+        """
+        Write the captured artifacts.
+
+        Args:
+            directory: Output directory
+
+        Returns:
+            List of artifact kinds written
+        """
+        base = os.path.join(directory, self.profile_id)
+        written = []
+
+        if self._cprofile is not None:
+            self._cprofile.dump_stats(base + ARTIFACTS['prof'])
+            stream = io.StringIO()
+            pstats.Stats(self._cprofile, stream=stream).sort_stats('cumulative').print_stats(40)
+            with open(base + ARTIFACTS['txt'], 'w') as f:
+                f.write(stream.getvalue())
+            written += ['prof', 'txt']
+
+        if self._pyinstrument is not None:
+            with open(base + ARTIFACTS['txt'], 'w') as f:
+                f.write(self._pyinstrument.output_text())
+            with open(base + ARTIFACTS['html'], 'w') as f:
+                f.write(self._pyinstrument.output_html())
+            written += ['txt', 'html']
+
+        if self._torch_profiler is not None:
+            try:
+                self._torch_profiler.export_chrome_trace(base + ARTIFACTS['trace'])
+                written.append('trace')
+            except Exception as e:
+                print(f"Warning: could not export torch trace: {e}")
+
+        return written
+
+
+class RequestProfiler:
+    """
+    Decides which requests to profile and keeps the resulting traces.
+
+    On-demand profiles are always kept; sampled profiles are kept only while
+    they are among the top_k slowest sampled requests.
+    """
+
+    def __init__(self, output_dir: str, sample_rate: int = 0, top_k: int = 20,
+                 use_torch: bool = True):
+        """
+        Initialize the profiler.
+
+        Args:
+            output_dir: Directory where traces are written
+            sample_rate: Profile 1 in N requests (0 disables sampling)
+            top_k: Maximum number of traces kept on disk per kind (sampled / on-demand)
+            use_torch: Capture a torch profiler trace when torch is loaded
+        """
+        self.output_dir = output_dir
+        self.sample_rate = sample_rate
+        self.top_k = top_k
+        self.use_torch = use_torch
+        self._active = threading.Lock()
+        self._active_file = None
+        self._index_lock = threading.Lock()
+        self._counter = 0
+        self._index_path = os.path.join(output_dir, 'index.json')
+        os.makedirs(output_dir, exist_ok=True)
+
+    @contextlib.contextmanager
+    def _locked_index(self):
+        """Hold the index lock of this process and, where available, of all processes."""
+        with self._index_lock:
+            if not FCNTL_AVAILABLE:
+                yield
+                return
+            with open(self._index_path + '.lock', 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _acquire_active(self) -> bool:
+        """Claim the single profiling slot shared by all workers (non-blocking)."""
+        if not self._active.acquire(blocking=False):
+            return False
+        if FCNTL_AVAILABLE:
+            lock_file = open(os.path.join(self.output_dir, 'active.lock'), 'a')
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                # Another worker is profiling
+                lock_file.close()
+                self._active.release()
+                return False
+            self._active_file = lock_file
+        return True
+
+    def _release_active(self):
+        if self._active_file is not None:
+            fcntl.flock(self._active_file, fcntl.LOCK_UN)
+            self._active_file.close()
+            self._active_file = None
+        self._active.release()
+
+    def start(self, label: str, requested: bool = False) -> Optional[ProfileSession]:
+        """
+        Start profiling the current request if it was requested or sampled.
+
+        Args:
+            label: Description of the request (e.g. endpoint and filename)
+            requested: Whether the caller explicitly asked for a profile
+
+        Returns:
+            ProfileSession, or None if this request is not profiled
+        """
+        reason = None
+        if requested:
+            reason = 'on_demand'
+        elif self.sample_rate > 0:
+            with self._index_lock:
+                self._counter += 1
+                if self._counter % self.sample_rate == 0:
+                    reason = 'sampled'
+        if reason is None:
+            return None
+
+        # Never profile two requests at once; the other one just runs normally
+        if not self._acquire_active():
+            return None
+
+        session = ProfileSession(uuid.uuid4().hex[:12], label, reason, self.use_torch)
+        try:
+            session.start_profilers()
+        except Exception as e:
+            print(f"Warning: could not start profiler: {e}")
+            self._release_active()
+            return None
+        return session
+
+    def finish(self, session: ProfileSession, status: Optional[int] = None):
+        """
+        Stop a session and store its traces if they are worth keeping.
+
+        Args:
+            session: Session returned by start()
+            status: HTTP status code of the profiled request
+        """
+        try:
+            session.stop_profilers()
+        finally:
+            self._release_active()
+
+        session.status = status
+        with self._locked_index():
+            entries = self._load_index()
+            same_kind = [e for e in entries if e['reason'] == session.reason]
+
+            # Keep only the slowest traces per kind
+            if len(same_kind) >= self.top_k:
+                fastest = min(same_kind, key=lambda e: e['duration_ms'])
+                if session.reason == 'sampled' and fastest['duration_ms'] >= session.duration * 1000.0:
+                    return
+                self._delete(fastest)
+                entries.remove(fastest)
+
+            artifacts = session.save(self.output_dir)
+            entries.append({
+                'id': session.profile_id,
+                'label': session.label,
+                'reason': session.reason,
+                'status': status,
+                'duration_ms': round(session.duration * 1000.0, 3),
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'artifacts': artifacts,
+            })
+            self._save_index(entries)
+
+    def list(self) -> List[dict]:
+        """
+        List stored traces, slowest first.
+
+        Returns:
+            List of trace metadata dictionaries
+        """
+        with self._locked_index():
+            return sorted(self._load_index(), key=lambda e: e['duration_ms'], reverse=True)
+
+    def artifact_name(self, profile_id: str, kind: str) -> Optional[str]:
+        """
+        Get the file name of a stored artifact.
+
+        Args:
+            profile_id: Trace id
+            kind: One of ARTIFACTS
+
+        Returns:
+            File name inside output_dir, or None if it does not exist
+        """
+        for entry in self.list():
+            if entry['id'] == profile_id and kind in entry['artifacts']:
+                return profile_id + ARTIFACTS[kind]
+        return None
+
+    def _delete(self, entry: dict):
+        for kind in entry.get('artifacts', []):
+            try:
+                os.remove(os.path.join(self.output_dir, entry['id'] + ARTIFACTS[kind]))
+            except OSError:
+                pass
+
+    def _load_index(self) -> List[dict]:
+        if not os.path.exists(self._index_path):
+            return []
+        try:
+            with open(self._index_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return []
+
+    def _save_index(self, entries: List[dict]):
+        # Per-process name, so a writer can never replace the index with another's partial file
+        tmp_path = f"{self._index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(entries, f, indent=2)
+        os.replace(tmp_path, self._index_path)
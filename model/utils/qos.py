@@ -0,0 +1,244 @@
+"""
+Load-Aware Quality of Service
+Picks a service tier for each request from the number of requests in
+flight and the recent request latency, so that under bursts the service
+degrades to cheaper recognition instead of timing out everywhere.
+
+Tiers, best first:
+- full:       every recognition strategy (EasyOCR) / full beam search (TrOCR)
+- reduced:    the two historically best strategies / fewer beams
+- minimal:    one strategy at a lower mag_ratio / greedy decoding
+- cache_only: cached results only; everything else is rejected with 503
+
+Clients may ask for a cheaper tier or give a deadline; they never get a
+better tier than the current load allows.
+"""
+
+import os
+import json
+import time
+import threading
+from typing import Optional
+
+
+TIERS = ('full', 'reduced', 'minimal', 'cache_only')
+
+DEFAULT_QOS = {
+    'enabled': True,
+    # Requests in flight (including this one) at which each tier starts
+    'queue_depth': {'reduced': 3, 'minimal': 5, 'cache_only': 10},
+    # Smoothed request latency in seconds at which each tier starts
+    'latency_seconds': {'reduced': 4.0, 'minimal': 8.0, 'cache_only': 20.0},
+    'ewma_alpha': 0.2,
+    # The smoothed latency halves every this many seconds without a finished request, so
+    # a worker that went cache_only after a slow spike (and so stopped measuring) recovers
+    'latency_half_life_seconds': 10.0,
+    # Requests the predictor serves in parallel, used for deadline estimates
+    'concurrency': 1,
+    # Optional per-tier predictor keyword arguments overriding the predictor's QOS_TIERS
+    'tier_options': {},
+}
+
+
+def load_qos_config(config_path: str) -> dict:
+    """
+    Load the qos section of a config file, filled with defaults.
+
+    Args:
+        config_path: Path to the configuration JSON file
+
+    Returns:
+        QoS settings dictionary
+    """
+    settings = dict(DEFAULT_QOS)
+    if os.path.exists(config_path):
+        with open(config_path, 'r') as f:
+            settings.update(json.load(f).get('qos', {}))
+    return settings
+
+
+class QoSTicket:
+    """Admission of one request at a tier; use as a context manager."""
+
+    def __init__(self, controller: 'QoSController', tier: str, reason: str):
+        self.controller = controller
+        self.tier = tier
+        self.reason = reason
+        self.start = time.perf_counter()
+        self._released = False
+
+    @property
+    def rejected(self) -> bool:
+        return self.tier == 'cache_only'
+
+    def release(self):
+        """Leave the in-flight set and record the latency (idempotent)."""
+        if not self._released:
+            self._released = True
+            self.controller._release(self, time.perf_counter() - self.start)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+
+class QoSController:
+    """Tracks load and assigns service tiers."""
+
+    def __init__(self, settings: Optional[dict] = None):
+        """
+        Initialize the controller.
+
+        Args:
+            settings: QoS settings (see DEFAULT_QOS)
+        """
+        self.settings = dict(DEFAULT_QOS)
+        self.settings.update(settings or {})
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._latency = None
+        self._latency_at = 0.0
+        self._tier_latency = {}
+        self._served = {tier: 0 for tier in TIERS}
+
+    def load_tier(self, depth: Optional[int] = None) -> str:
+        """
+        Tier allowed by the current load.
+
+        Args:
+            depth: Requests in flight including the new one (current value if None)
+
+        Returns:
+            Tier name
+        """
+        if not self.settings['enabled']:
+            return 'full'
+        if depth is None:
+            depth = self._in_flight + 1
+
+        latency = self.current_latency()
+        index = 0
+        for i, tier in enumerate(TIERS[1:], start=1):
+            depth_limit = self.settings['queue_depth'].get(tier)
+            latency_limit = self.settings['latency_seconds'].get(tier)
+            if (depth_limit is not None and depth >= depth_limit) or \
+                    (latency_limit is not None and latency is not None and latency >= latency_limit):
+                index = i
+        return TIERS[index]
+
+    def current_latency(self) -> Optional[float]:
+        """
+        Smoothed request latency, decayed for the time since the last finished request.
+
+        Returns:
+            Seconds, or None before the first finished request
+        """
+        if self._latency is None:
+            return None
+        half_life = float(self.settings['latency_half_life_seconds'] or 0)
+        if half_life <= 0:
+            return self._latency
+        return self._latency * 0.5 ** ((time.monotonic() - self._latency_at) / half_life)
+
+    def estimate_seconds(self, tier: str, depth: int) -> Optional[float]:
+        """
+        Expected latency of a new request at a tier.
+
+        Args:
+            tier: Tier name
+            depth: Requests in flight including the new one
+
+        Returns:
+            Seconds, or None if the tier has not been observed yet
+        """
+        service = self._tier_latency.get(tier)
+        if service is None:
+            return None
+        waves = (depth - 1) // max(1, int(self.settings['concurrency'])) + 1
+        return service * waves
+
+    def admit(self, requested_tier: Optional[str] = None,
+              deadline_ms: Optional[float] = None) -> QoSTicket:
+        """
+        Choose the tier for a new request and count it as in flight.
+
+        Args:
+            requested_tier: Tier the client asked for (only cheaper tiers are honoured)
+            deadline_ms: Latency budget; the best tier expected to meet it is chosen
+
+        Returns:
+            QoSTicket; ticket.rejected is True for the cache_only tier
+        """
+        if requested_tier is not None and requested_tier not in TIERS:
+            raise ValueError(f"Unknown QoS tier: {requested_tier}. Choose from {', '.join(TIERS)}")
+
+        with self._lock:
+            self._in_flight += 1
+            depth = self._in_flight
+            tier = self.load_tier(depth)
+            reason = 'load' if tier != 'full' else 'default'
+
+            if requested_tier is not None and TIERS.index(requested_tier) > TIERS.index(tier):
+                tier, reason = requested_tier, 'requested'
+
+            if deadline_ms is not None and tier != 'cache_only':
+                budget = float(deadline_ms) / 1000.0
+                for candidate in TIERS[TIERS.index(tier):]:
+                    estimate = self.estimate_seconds(candidate, depth)
+                    if candidate == 'cache_only' or estimate is None or estimate <= budget:
+                        if candidate != tier:
+                            tier, reason = candidate, 'deadline'
+                        break
+
+            self._served[tier] += 1
+        return QoSTicket(self, tier, reason)
+
+    def _release(self, ticket: QoSTicket, seconds: float):
+        alpha = float(self.settings['ewma_alpha'])
+        with self._lock:
+            self._in_flight = max(0, self._in_flight - 1)
+            # Rejections are instant and would hide real latency
+            if ticket.tier == 'cache_only':
+                return
+            latency = self.current_latency()
+            self._latency = seconds if latency is None else alpha * seconds + (1 - alpha) * latency
+            self._latency_at = time.monotonic()
+            previous = self._tier_latency.get(ticket.tier)
+            self._tier_latency[ticket.tier] = seconds if previous is None else \
+                alpha * seconds + (1 - alpha) * previous
+
+    def options_for(self, tier: str, predictor) -> dict:
+        """
+        Predictor keyword arguments for a tier.
+
+        Args:
+            tier: Tier name
+            predictor: Predictor instance (its QOS_TIERS supplies the defaults)
+
+        Returns:
+            Keyword arguments for predictor.predict()
+        """
+        options = dict(getattr(predictor, 'QOS_TIERS', {}).get(tier, {}))
+        options.update(self.settings['tier_options'].get(tier, {}))
+        return options
+
+    def stats(self) -> dict:
+        """
+        Current load and tier counters.
+
+        Returns:
+            Dictionary with in_flight, latency, current tier and served counts
+        """
+        with self._lock:
+            latency = self.current_latency()
+            return {
+                'enabled': bool(self.settings['enabled']),
+                'in_flight': self._in_flight,
+                'latency_seconds': round(latency, 4) if latency is not None else None,
+                'tier_latency_seconds': {t: round(v, 4) for t, v in self._tier_latency.items()},
+                'current_tier': self.load_tier(self._in_flight + 1),
+                'served': dict(self._served),
+            }
@@ -0,0 +1,159 @@
+"""
+Region-level Recognition Cache
+Reuses recognized text for identical text regions across requests.
+Useful for recurring form templates where printed labels repeat on every page.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+class RegionCache:
+    """
+    LRU cache mapping a normalized region crop to its recognized text and confidence.
+
+    Crops are normalized before hashing (grayscale, fixed height, Otsu
+    binarization) so that re-scans of the same printed label hash identically
+    even when small illumination or scale differences are present.
+    """
+
+    def __init__(self, max_entries: int = 10000, norm_height: int = 32):
+        """
+        Initialize the region cache.
+
+        Args:
+            max_entries: Maximum number of cached regions (least recently used are evicted)
+            norm_height: Height that crops are resized to before hashing
+        """
+        self.max_entries = max_entries
+        self.norm_height = norm_height
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def normalize(self, crop: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Normalize a region crop for hashing.
+
+        Args:
+            crop: Grayscale or BGR crop as numpy array
+
+        Returns:
+            Binarized crop resized to norm_height, or None for empty crops
+        """
+        if crop is None or crop.size == 0:
+            return None
+
+        if crop.ndim == 3:
+            crop = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+
+        height, width = crop.shape[:2]
+        if height == 0 or width == 0:
+            return None
+
+        # Resize to fixed height while keeping aspect ratio
+        new_width = max(1, int(round(width * self.norm_height / float(height))))
+        resized = cv2.resize(crop, (new_width, self.norm_height), interpolation=cv2.INTER_AREA)
+
+        # Binarize to remove illumination differences between scans
+        _, binary = cv2.threshold(resized, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        return binary
+
+    def key_for(self, crop: np.ndarray) -> Optional[str]:
+        """
+        Compute the cache key of a region crop.
+
+        Args:
+            crop: Grayscale or BGR crop as numpy array
+
+        Returns:
+            Hex digest of the normalized crop, or None if the crop is empty
+        """
+        normalized = self.normalize(crop)
+        if normalized is None:
+            return None
+
+        hash_md5 = hashlib.md5()
+        hash_md5.update(str(normalized.shape).encode())
+        hash_md5.update(np.ascontiguousarray(normalized).tobytes())
+        return hash_md5.hexdigest()
+
+    def get(self, key: Optional[str]) -> Optional[Tuple[str, float]]:
+        """
+        Look up a cached recognition result.
+
+        Args:
+            key: Cache key from key_for()
+
+        Returns:
+            (text, confidence) tuple or None on a miss
+        """
+        if key is None:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Optional[str], text: str, confidence: float):
+        """
+        Store a recognition result.
+
+        Args:
+            key: Cache key from key_for()
+            text: Recognized text
+            confidence: Recognition confidence
+        """
+        if key is None:
+            return
+
+        with self._lock:
+            self._entries[key] = (text, float(confidence))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> int:
+        """
+        Remove all cached regions.
+
+        Returns:
+            Number of entries removed
+        """
+        with self._lock:
+            size = len(self._entries)
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+        return size
+
+    def stats(self) -> dict:
+        """
+        Get cache statistics.
+
+        Returns:
+            Dictionary with size, hits, misses and hit rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,225 @@
+"""
+CPU Runtime Configuration
+Sets and pins the torch, OpenCV and TensorFlow thread pools per worker so
+concurrent requests do not oversubscribe the available cores.
+
+Settings live in the "runtime" section of model/configs/config.json and can
+be written by scripts/autotune_threads.py.
+"""
+
+import os
+import re
+import sys
+import json
+from typing import List, Optional
+
+
+DEFAULT_RUNTIME = {
+    # Web worker processes started by gunicorn.conf.py
+    'workers': 1,
+    'torch_threads': None,
+    'torch_interop_threads': None,
+    'opencv_threads': None,
+    'tf_intra_op_threads': None,
+    'tf_inter_op_threads': None,
+    'pin_cpus': False,
+    'model_store': None,
+    # EasyOCR int8 quantization; None: only without a model_store, whose
+    # memory-mapped weights would otherwise be copied into every worker
+    'quantize': None,
+    # Run the model in a separate process fed through shared memory (model/utils/shm_transport.py)
+    'inference_process': False,
+    # Images in flight to the inference process, and the largest decoded image in MB
+    'inference_slots': 8,
+    'inference_slot_mb': 64,
+}
+
+
+def load_runtime_config(config_path: str) -> dict:
+    """
+    Load the runtime section of a config file, filled with defaults.
+
+    Args:
+        config_path: Path to the configuration JSON file
+
+    Returns:
+        Runtime settings dictionary
+    """
+    settings = dict(DEFAULT_RUNTIME)
+    if os.path.exists(config_path):
+        with open(config_path, 'r') as f:
+            settings.update(json.load(f).get('runtime', {}))
+    return settings
+
+
+def _splice_runtime(text: str, runtime: dict) -> Optional[str]:
+    """
+    Replace (or append) the top-level "runtime" object in a config's text.
+
+    Args:
+        text: Config file contents, with LF line endings
+        runtime: Runtime settings to store
+
+    Returns:
+        The new text, or None if the section could not be located
+    """
+    config = json.loads(text)
+    decoder = json.JSONDecoder()
+    block = json.dumps(runtime, indent=2)
+
+    for match in re.finditer(r'"runtime"\s*:\s*', text):
+        try:
+            _, end = decoder.raw_decode(text, match.end())
+        except json.JSONDecodeError:
+            continue
+        # Indent the object's lines to match the key's
+        line_start = text.rfind('\n', 0, match.start()) + 1
+        indent = re.match(r'[ \t]*', text[line_start:]).group(0)
+        spliced = text[:match.end()] + block.replace('\n', '\n' + indent) + text[end:]
+        try:
+            result = json.loads(spliced)
+        except json.JSONDecodeError:
+            continue
+        # Only accept the top-level key, not a "runtime" nested elsewhere or inside a string
+        if result.get('runtime') == runtime and \
+                {k: v for k, v in result.items() if k != 'runtime'} == \
+                {k: v for k, v in config.items() if k != 'runtime'}:
+            return spliced
+
+    if 'runtime' in config:
+        return None
+    # No section yet: add it as the last key
+    close = text.rstrip().rfind('}')
+    body = text[:close].rstrip()
+    separator = ',' if config else ''
+    return body + separator + '\n  "runtime": ' + block.replace('\n', '\n  ') + '\n' + text[close:]
+
+
+def save_runtime_config(config_path: str, settings: dict):
+    """
+    Write runtime settings into a config file, keeping its other keys.
+    Only the "runtime" object is rewritten; the rest of the file keeps its
+    formatting and line endings.
+
+    Args:
+        config_path: Path to the configuration JSON file
+        settings: Runtime settings to store
+    """
+    runtime = {key: settings.get(key) for key in DEFAULT_RUNTIME}
+    text = None
+    newline = '\n'
+    if os.path.exists(config_path):
+        with open(config_path, 'r', newline='') as f:
+            raw = f.read()
+        if '\r\n' in raw:
+            newline = '\r\n'
+        text = _splice_runtime(raw.replace('\r\n', '\n'), runtime)
+        if text is None:
+            # Could not find the section textually; fall back to re-serializing
+            config = json.loads(raw)
+            config['runtime'] = runtime
+            text = json.dumps(config, indent=2) + '\n'
+    if text is None:
+        text = json.dumps({'runtime': runtime}, indent=2) + '\n'
+
+    tmp_path = config_path + '.tmp'
+    with open(tmp_path, 'w', newline=newline) as f:
+        f.write(text)
+    os.replace(tmp_path, config_path)
+
+
+def cpus_for_worker(worker_index: int, threads: int, cpu_ids: Optional[List[int]] = None) -> List[int]:
+    """
+    Pick a contiguous block of CPUs for one worker.
+
+    Args:
+        worker_index: Index of the worker process
+        threads: Threads (and CPUs) per worker
+        cpu_ids: Available CPU ids (defaults to this process's affinity)
+
+    Returns:
+        List of CPU ids assigned to the worker
+    """
+    if cpu_ids is None:
+        cpu_ids = sorted(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') \
+            else list(range(os.cpu_count() or 1))
+    threads = max(1, min(threads, len(cpu_ids)))
+    blocks = max(1, len(cpu_ids) // threads)
+    start = (worker_index % blocks) * threads
+    return cpu_ids[start:start + threads]
+
+
+def set_thread_env(settings: dict):
+    """
+    Export thread-count environment variables.
+    Must run before torch/TensorFlow/OpenMP are imported to take full effect.
+
+    Args:
+        settings: Runtime settings dictionary
+    """
+    torch_threads = settings.get('torch_threads')
+    if torch_threads:
+        for name in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+            os.environ.setdefault(name, str(torch_threads))
+    if settings.get('tf_intra_op_threads'):
+        os.environ.setdefault('TF_NUM_INTRAOP_THREADS', str(settings['tf_intra_op_threads']))
+    if settings.get('tf_inter_op_threads'):
+        os.environ.setdefault('TF_NUM_INTEROP_THREADS', str(settings['tf_inter_op_threads']))
+
+
+def apply_runtime_config(settings: dict, worker_index: int = 0) -> dict:
+    """
+    Apply thread pool sizes and optional CPU pinning to this process.
+    Frameworks that are not imported are left alone.
+
+    Args:
+        settings: Runtime settings dictionary
+        worker_index: Index of this worker, used for CPU pinning
+
+    Returns:
+        Dictionary describing what was applied
+    """
+    set_thread_env(settings)
+    applied = {}
+
+    if settings.get('pin_cpus') and hasattr(os, 'sched_setaffinity'):
+        threads = settings.get('torch_threads') or settings.get('tf_intra_op_threads') or 1
+        cpus = cpus_for_worker(worker_index, threads)
+        try:
+            os.sched_setaffinity(0, cpus)
+            applied['cpus'] = cpus
+        except OSError as e:
+            print(f"Warning: could not set CPU affinity: {e}")
+
+    torch = sys.modules.get('torch')
+    if torch is not None:
+        if settings.get('torch_threads'):
+            torch.set_num_threads(int(settings['torch_threads']))
+            applied['torch_threads'] = torch.get_num_threads()
+        if settings.get('torch_interop_threads'):
+            try:
+                torch.set_num_interop_threads(int(settings['torch_interop_threads']))
+                applied['torch_interop_threads'] = int(settings['torch_interop_threads'])
+            except RuntimeError as e:
+                # Can only be set before any inter-op parallel work has started
+                print(f"Warning: could not set torch inter-op threads: {e}")
+
+    if settings.get('opencv_threads') is not None:
+        import cv2
+        cv2.setNumThreads(int(settings['opencv_threads']))
+        applied['opencv_threads'] = cv2.getNumThreads()
+
+    tf = sys.modules.get('tensorflow')
+    if tf is not None:
+        try:
+            if settings.get('tf_intra_op_threads'):
+                tf.config.threading.set_intra_op_parallelism_threads(int(settings['tf_intra_op_threads']))
+                applied['tf_intra_op_threads'] = int(settings['tf_intra_op_threads'])
+            if settings.get('tf_inter_op_threads'):
+                tf.config.threading.set_inter_op_parallelism_threads(int(settings['tf_inter_op_threads']))
+                applied['tf_inter_op_threads'] = int(settings['tf_inter_op_threads'])
+        except RuntimeError as e:
+            # TensorFlow refuses once its runtime is initialized
+            print(f"Warning: could not set TensorFlow threads: {e}")
+
+    return applied
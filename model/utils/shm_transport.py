@@ -0,0 +1,483 @@
+"""
+Shared-Memory Image Transport
+Ring buffer of fixed-size slots in multiprocessing.shared_memory, used to
+hand decoded images (or TrOCR pixel_values) from the web process to an
+inference process without pickling them.
+
+The writer copies an array into a slot once; readers get a zero-copy NumPy
+view. Slots are reference counted and return to the pool when the last
+holder releases them. When all slots are in use, writers block (backpressure)
+and raise RingFullError after the timeout.
+
+The web app serves through an InferenceProcess when "inference_process" is
+set in the "runtime" section of model/configs/config.json (or
+HTR_INFERENCE_PROCESS=1): each request's image is decoded once into a slot
+and the model runs in its own process, away from the web worker's GIL.
+"""
+
+import os
+import time
+import uuid
+import queue
+import contextlib
+import threading
+import traceback
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from collections import namedtuple
+from typing import Callable, List, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+from model.utils.stream_recognizer import StreamRecognizer
+
+
+# Picklable reference to an array stored in a slot
+SlotHandle = namedtuple('SlotHandle', ['slot', 'shape', 'dtype'])
+
+# Stands in for a lock where none is needed
+_NO_LOCK = contextlib.nullcontext()
+
+# Header holds one int64 reference count per slot
+_HEADER_ITEM = np.dtype(np.int64).itemsize
+
+
+class RingFullError(TimeoutError):
+    """Raised when no slot becomes free before the timeout."""
+
+
+class SharedMemoryRing:
+    """
+    Fixed-size slot allocator over one shared memory block.
+    Create it in the parent process and pass it to child processes as a
+    Process argument; the lock and semaphore are inherited.
+    """
+
+    def __init__(self, num_slots: int = 8, slot_bytes: int = 64 * 1024 * 1024,
+                 name: Optional[str] = None, ctx=None):
+        """
+        Create the ring buffer.
+
+        Args:
+            num_slots: Number of slots (maximum arrays in flight)
+            slot_bytes: Capacity of each slot in bytes
+            name: Shared memory block name (random if not given)
+            ctx: multiprocessing context (default context if not given)
+        """
+        ctx = ctx or mp.get_context()
+        self.num_slots = num_slots
+        self.slot_bytes = slot_bytes
+        self._header_bytes = num_slots * _HEADER_ITEM
+        self._lock = ctx.Lock()
+        self._free = ctx.Semaphore(num_slots)
+        self._owner = True
+
+        self._shm = shared_memory.SharedMemory(
+            name=name or f"htr_ring_{uuid.uuid4().hex[:12]}", create=True,
+            size=self._header_bytes + num_slots * slot_bytes)
+        self._refcounts = np.ndarray((num_slots,), dtype=np.int64, buffer=self._shm.buf)
+        self._refcounts[:] = 0
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def __getstate__(self):
+        # Only the block name travels; the child re-attaches to the same memory
+        return {
+            'num_slots': self.num_slots,
+            'slot_bytes': self.slot_bytes,
+            'name': self._shm.name,
+            'lock': self._lock,
+            'free': self._free,
+        }
+
+    def __setstate__(self, state):
+        self.num_slots = state['num_slots']
+        self.slot_bytes = state['slot_bytes']
+        self._header_bytes = self.num_slots * _HEADER_ITEM
+        self._lock = state['lock']
+        self._free = state['free']
+        self._owner = False
+        self._shm = shared_memory.SharedMemory(name=state['name'])
+        self._refcounts = np.ndarray((self.num_slots,), dtype=np.int64, buffer=self._shm.buf)
+
+    def _slot_view(self, handle: SlotHandle) -> np.ndarray:
+        offset = self._header_bytes + handle.slot * self.slot_bytes
+        return np.ndarray(handle.shape, dtype=np.dtype(handle.dtype), buffer=self._shm.buf, offset=offset)
+
+    def allocate(self, shape: Tuple[int, ...], dtype, timeout: Optional[float] = None
+                 ) -> Tuple[SlotHandle, np.ndarray]:
+        """
+        Reserve a slot and return a writable view of it.
+
+        Args:
+            shape: Array shape
+            dtype: Array dtype
+            timeout: Seconds to wait for a free slot (None waits forever)
+
+        Returns:
+            (handle with reference count 1, writable view)
+        """
+        dtype = np.dtype(dtype)
+        nbytes = int(np.prod(shape)) * dtype.itemsize
+        if nbytes > self.slot_bytes:
+            raise ValueError(f"Array of {nbytes} bytes does not fit in a {self.slot_bytes} byte slot")
+
+        if not self._free.acquire(timeout=timeout):
+            raise RingFullError(f"No free shared memory slot after {timeout}s")
+
+        with self._lock:
+            free = np.flatnonzero(self._refcounts == 0)
+            if len(free) == 0:
+                # Semaphore and refcounts disagree; should never happen
+                self._free.release()
+                raise RuntimeError("Shared memory ring is corrupted: no slot with zero references")
+            slot = int(free[0])
+            self._refcounts[slot] = 1
+
+        handle = SlotHandle(slot, tuple(int(v) for v in shape), dtype.str)
+        return handle, self._slot_view(handle)
+
+    def put(self, array: np.ndarray, timeout: Optional[float] = None) -> SlotHandle:
+        """
+        Copy an array into a free slot.
+
+        Args:
+            array: Array to store
+            timeout: Seconds to wait for a free slot (None waits forever)
+
+        Returns:
+            Handle with reference count 1
+        """
+        handle, view = self.allocate(array.shape, array.dtype, timeout=timeout)
+        np.copyto(view, array)
+        return handle
+
+    def view(self, handle: SlotHandle) -> np.ndarray:
+        """
+        Zero-copy read-only view of a stored array.
+
+        Args:
+            handle: Handle from put() or allocate()
+
+        Returns:
+            Read-only NumPy view backed by shared memory
+        """
+        array = self._slot_view(handle)
+        array.flags.writeable = False
+        return array
+
+    def retain(self, handle: SlotHandle):
+        """Add a reference to a slot."""
+        with self._lock:
+            if self._refcounts[handle.slot] <= 0:
+                raise ValueError(f"Slot {handle.slot} is not allocated")
+            self._refcounts[handle.slot] += 1
+
+    def release(self, handle: SlotHandle):
+        """Drop a reference; the slot is freed when the count reaches zero."""
+        with self._lock:
+            if self._refcounts[handle.slot] <= 0:
+                raise ValueError(f"Slot {handle.slot} released more times than retained")
+            self._refcounts[handle.slot] -= 1
+            freed = self._refcounts[handle.slot] == 0
+        if freed:
+            self._free.release()
+
+    def in_use(self) -> int:
+        """Number of allocated slots."""
+        with self._lock:
+            return int(np.count_nonzero(self._refcounts))
+
+    def close(self):
+        """Detach from the shared memory block (and remove it if this process created it)."""
+        self._refcounts = None
+        self._shm.close()
+        if self._owner:
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+# Predictor methods the inference process serves; each takes the request's images first
+_METHODS = ('predict', 'predict_batch', 'predict_fields', 'detect_boxes', 'recognize_boxes')
+
+# Region cache methods, for /clear_cache, /health and /metrics
+_REGION_CACHE_METHODS = ('clear', 'stats', '__len__')
+
+
+def _capabilities(predictor) -> dict:
+    """What the child's predictor offers, reported to the parent once it is ready."""
+    return {
+        'qos_tiers': getattr(predictor, 'QOS_TIERS', {}),
+        'methods': [name for name in _METHODS if hasattr(predictor, name)],
+        'streaming': hasattr(predictor, 'open_stream') and hasattr(predictor, 'detect_boxes'),
+        'region_cache': getattr(predictor, 'region_cache', None) is not None,
+    }
+
+
+def _inference_loop(ring: SharedMemoryRing, factory: Callable, requests, responses):
+    """Child process: build the predictor, then serve requests until None arrives."""
+    predictor = factory()
+    responses.put(('ready', os.getpid(), _capabilities(predictor)))
+    while True:
+        item = requests.get()
+        if item is None:
+            break
+        request_id, method, handles, args, kwargs = item
+        images = None
+        try:
+            images = [ring.view(handle) for handle in handles]
+            if method == 'predict_batch':
+                result = predictor.predict_batch(images, **kwargs)
+            elif method in _METHODS:
+                result = getattr(predictor, method)(*images, *args, **kwargs)
+            elif method.startswith('region_cache.') and method[len('region_cache.'):] in _REGION_CACHE_METHODS:
+                result = getattr(predictor.region_cache, method[len('region_cache.'):])(*args, **kwargs)
+            else:
+                raise ValueError(f"Unsupported method: {method}")
+            responses.put((request_id, result, None))
+        except Exception as e:
+            responses.put((request_id, None, f"{e}\n{traceback.format_exc()}"))
+        finally:
+            # Drop the views before the slots can be reused
+            images = None
+            for handle in handles:
+                ring.release(handle)
+    ring.close()
+
+
+class _RemoteRegionCache:
+    """The inference process's region cache, as seen from the web process."""
+
+    def __init__(self, process: 'InferenceProcess'):
+        self._process = process
+
+    def clear(self) -> int:
+        return self._process._call('region_cache.clear', [], None, {})
+
+    def stats(self) -> dict:
+        return self._process._call('region_cache.stats', [], None, {})
+
+    def __len__(self) -> int:
+        return self._process._call('region_cache.__len__', [], None, {})
+
+
+class InferenceProcess:
+    """
+    Runs a predictor in a separate process fed through a SharedMemoryRing.
+    Only slot handles and results cross the process boundary. It stands in
+    for the predictor itself: predict, predict_batch and QOS_TIERS always;
+    predict_fields, open_stream and region_cache when the child's predictor
+    has them.
+
+    If the child exits, every waiting call fails, later calls fail at once,
+    and exit_reason says why (the app then reports itself unhealthy).
+    """
+
+    # predict_batch() sends a whole chunk of images in one round trip
+    BATCHED_INFERENCE = True
+
+    def __init__(self, factory: Callable, num_slots: int = 8, slot_bytes: int = 64 * 1024 * 1024,
+                 start_timeout: float = 600.0, timeout: Optional[float] = None,
+                 on_exit: Optional[Callable[[str], None]] = None):
+        """
+        Start the inference process.
+
+        Args:
+            factory: Picklable zero-argument callable returning a predictor whose
+                predict() accepts a NumPy image
+            num_slots: Number of ring slots (maximum requests in flight)
+            slot_bytes: Capacity of each slot in bytes
+            start_timeout: Seconds to wait for the predictor to load
+            timeout: Default seconds to wait for a free slot and for each result
+                (None waits forever)
+            on_exit: Called with the reason if the child process exits unexpectedly
+        """
+        ctx = mp.get_context('spawn')
+        self.ring = SharedMemoryRing(num_slots, slot_bytes, ctx=ctx)
+        self.timeout = timeout
+        self.on_exit = on_exit
+        self.exit_reason = None
+        self._closing = False
+        self._requests = ctx.Queue()
+        self._responses = ctx.Queue()
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._allocate_lock = threading.Lock()
+
+        self._process = ctx.Process(target=_inference_loop,
+                                    args=(self.ring, factory, self._requests, self._responses),
+                                    daemon=True)
+        self._process.start()
+
+        deadline = time.monotonic() + start_timeout
+        while True:
+            try:
+                status, pid, capabilities = self._responses.get(timeout=1.0)
+                break
+            except queue.Empty:
+                if not self._process.is_alive() or time.monotonic() > deadline:
+                    self.ring.close()
+                    raise RuntimeError(f"Inference process failed to start (exit code {self._process.exitcode})")
+        if status != 'ready':
+            raise RuntimeError("Inference process failed to start")
+        self.pid = pid
+        # The child's predictor decides what the QoS tiers change
+        self.QOS_TIERS = capabilities['qos_tiers']
+        # Only offer what the child's predictor has, so callers' hasattr() checks still work
+        if 'predict_fields' in capabilities['methods']:
+            self.predict_fields = self._predict_fields
+        if capabilities['streaming']:
+            self.open_stream = self._open_stream
+        self.region_cache = _RemoteRegionCache(self) if capabilities['region_cache'] else None
+
+        self._reader = threading.Thread(target=self._dispatch_responses, daemon=True)
+        self._reader.start()
+
+    @property
+    def healthy(self) -> bool:
+        """False once the inference process has exited unexpectedly."""
+        return self.exit_reason is None
+
+    def _dispatch_responses(self):
+        while True:
+            try:
+                request_id, result, error = self._responses.get(timeout=1.0)
+            except queue.Empty:
+                if not self._closing and not self._process.is_alive():
+                    self._child_exited()
+                    break
+                continue
+            except (EOFError, OSError):
+                break
+            if request_id is None:
+                break
+            with self._pending_lock:
+                pending = self._pending.pop(request_id, None)
+            if pending is not None:
+                pending[0].put((result, error))
+
+    def _child_exited(self):
+        """Fail every waiting call and give back the slots the child will never release."""
+        reason = f"Inference process {self.pid} exited with code {self._process.exitcode}"
+        print(f"ERROR: {reason}")
+        with self._pending_lock:
+            self.exit_reason = reason
+            pending, self._pending = list(self._pending.values()), {}
+        for waiter, handles in pending:
+            for handle in handles:
+                try:
+                    self.ring.release(handle)
+                except ValueError:
+                    # Released by the child just before it died
+                    pass
+            waiter.put((None, reason))
+        if self.on_exit is not None:
+            self.on_exit(reason)
+
+    def _call(self, method: str, images: List[np.ndarray], timeout: Optional[float], kwargs: dict,
+              args: tuple = ()):
+        if self.exit_reason is not None:
+            raise RuntimeError(self.exit_reason)
+        timeout = timeout if timeout is not None else self.timeout
+        handles = []
+        # One multi-slot allocation at a time: two batches each holding part of the
+        # ring while waiting for the rest would wait forever
+        with self._allocate_lock if len(images) > 1 else _NO_LOCK:
+            try:
+                for image in images:
+                    handles.append(self.ring.put(image, timeout=timeout))
+            except Exception:
+                for handle in handles:
+                    self.ring.release(handle)
+                raise
+        request_id = uuid.uuid4().hex
+        waiter = queue.Queue(maxsize=1)
+        with self._pending_lock:
+            if self.exit_reason is not None:
+                for handle in handles:
+                    self.ring.release(handle)
+                raise RuntimeError(self.exit_reason)
+            self._pending[request_id] = (waiter, handles)
+        self._requests.put((request_id, method, handles, args, kwargs))
+
+        try:
+            result, error = waiter.get(timeout=timeout)
+        except queue.Empty:
+            # The child still owns the slots and releases them when it gets there
+            with self._pending_lock:
+                self._pending.pop(request_id, None)
+            raise TimeoutError(f"Inference did not finish within {timeout}s")
+        if error is not None:
+            raise RuntimeError(f"Inference failed: {error}")
+        return result
+
+    @staticmethod
+    def _decode(image: Union[str, np.ndarray], flags: int) -> np.ndarray:
+        if isinstance(image, str):
+            path, image = image, cv2.imread(image, flags)
+            if image is None:
+                raise ValueError(f"Could not decode image: {path}")
+        return image
+
+    def predict(self, image: Union[str, np.ndarray], timeout: Optional[float] = None, **kwargs):
+        """
+        Run prediction on an image in the inference process.
+
+        Args:
+            image: Decoded image (BGR or grayscale NumPy array), or an image path
+                decoded here straight into shared memory
+            timeout: Seconds to wait for a free slot and for the result (self.timeout if None)
+            **kwargs: Extra keyword arguments for predictor.predict()
+
+        Returns:
+            The predictor's result
+        """
+        return self._call('predict', [self._decode(image, cv2.IMREAD_COLOR)], timeout, kwargs)
+
+    def predict_batch(self, images: List[np.ndarray], timeout: Optional[float] = None, **kwargs) -> list:
+        """
+        Run the predictor's batch path on decoded images in the inference process.
+
+        Args:
+            images: Decoded images; sent in chunks of at most num_slots images
+            timeout: Seconds to wait for free slots and for each chunk's result (self.timeout if None)
+            **kwargs: Extra keyword arguments for predictor.predict_batch()
+
+        Returns:
+            The predictor's results, in order
+        """
+        results = []
+        for start in range(0, len(images), self.ring.num_slots):
+            results.extend(self._call('predict_batch', images[start:start + self.ring.num_slots], timeout, kwargs))
+        return results
+
+    def _predict_fields(self, image: Union[str, np.ndarray], template) -> dict:
+        """predict_fields() in the inference process; the page goes through shared memory."""
+        return self._call('predict_fields', [self._decode(image, cv2.IMREAD_GRAYSCALE)], None, {},
+                          args=(template,))
+
+    def _open_stream(self, **kwargs):
+        """
+        Streaming session whose frame differencing runs here and whose
+        detection and recognition run in the inference process.
+        """
+        return StreamRecognizer(
+            lambda gray, mag_ratio=1.0: self._call('detect_boxes', [gray], None, {'mag_ratio': mag_ratio}),
+            lambda gray, boxes: self._call('recognize_boxes', [gray], None, {}, args=(boxes,)),
+            **kwargs)
+
+    def close(self):
+        """Stop the inference process and free the shared memory."""
+        self._closing = True
+        if self._process.is_alive():
+            self._requests.put(None)
+            self._process.join(timeout=10)
+        if self._process.is_alive():
+            self._process.terminate()
+        self._responses.put((None, None, None))
+        self.ring.close()
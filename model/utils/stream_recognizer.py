@@ -0,0 +1,203 @@
+"""
+Streaming Recognition with Frame Differencing
+For camera / video input: each frame is compared with the previous one and
+only regions that changed (or are new) are re-detected and re-recognized.
+Text in unchanged regions is carried over and becomes "stable" once it has
+survived a few frames, so per-frame OCR cost follows the amount of scene
+change instead of the frame size.
+
+The recognizer is backend-agnostic: it takes a detect function returning
+text boxes for an image and a recognize function returning (text, confidence)
+per box. EasyOCRPredictor.open_stream() wires it to EasyOCR.
+"""
+
+import threading
+from typing import Callable, List, Tuple
+
+import cv2
+import numpy as np
+
+from model.utils.metrics import METRICS
+from model.utils.tiling import Box, box_iou, boxes_overlap, merge_boxes, reading_order
+
+
+class TextTrack:
+    """A text region followed across frames."""
+
+    def __init__(self, track_id: int, box: Box, text: str, confidence: float):
+        self.id = track_id
+        self.box = box
+        self.text = text
+        self.confidence = confidence
+        # Consecutive frames this text has been seen unchanged
+        self.hits = 1
+
+    def to_dict(self, stable_frames: int) -> dict:
+        return {
+            'id': self.id,
+            'box': [int(v) for v in self.box],
+            'text': self.text,
+            'confidence': round(float(self.confidence), 4),
+            'stable': self.hits >= stable_frames,
+        }
+
+
+class StreamRecognizer:
+    """
+    Recognizes a sequence of frames, re-running OCR only where the frame changed.
+    Not thread-safe per instance; use one recognizer per stream.
+    """
+
+    def __init__(self, detect_fn: Callable[[np.ndarray], List[Box]],
+                 recognize_fn: Callable[[np.ndarray, List[Box]], List[Tuple[str, float]]],
+                 diff_threshold: int = 25, min_change_area: int = 64, margin: int = 16,
+                 reset_fraction: float = 0.5, stable_frames: int = 3, diff_scale: float = 0.5):
+        """
+        Initialize the stream.
+
+        Args:
+            detect_fn: Returns text boxes for a grayscale image
+            recognize_fn: Returns (text, confidence) for each box of a grayscale image
+            diff_threshold: Per-pixel grey-level change that counts as changed
+            min_change_area: Ignore changed blobs smaller than this (pixels, full resolution)
+            margin: Pixels added around changed areas before re-detecting
+            reset_fraction: Re-process the whole frame when this fraction changed
+                (camera moved, new page)
+            stable_frames: Frames a text must survive unchanged to be reported stable
+            diff_scale: Downscale factor for the difference image (cheaper, less noisy)
+        """
+        self.detect_fn = detect_fn
+        self.recognize_fn = recognize_fn
+        self.diff_threshold = diff_threshold
+        self.min_change_area = min_change_area
+        self.margin = margin
+        self.reset_fraction = reset_fraction
+        self.stable_frames = stable_frames
+        self.diff_scale = diff_scale
+        self.tracks: List[TextTrack] = []
+        self.frame_index = 0
+        self._previous = None
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def reset(self):
+        """Forget the previous frame and all tracked text."""
+        with self._lock:
+            self.tracks = []
+            self._previous = None
+
+    def _diff_image(self, gray: np.ndarray) -> np.ndarray:
+        small = cv2.resize(gray, None, fx=self.diff_scale, fy=self.diff_scale,
+                           interpolation=cv2.INTER_AREA) if self.diff_scale != 1.0 else gray
+        return cv2.GaussianBlur(small, (5, 5), 0)
+
+    def changed_regions(self, previous: np.ndarray, current: np.ndarray) -> Tuple[List[Box], float]:
+        """
+        Find areas that differ between two prepared (downscaled, blurred) frames.
+
+        Args:
+            previous: Previous difference image
+            current: Current difference image
+
+        Returns:
+            (changed boxes in full-resolution coordinates, changed pixel fraction)
+        """
+        diff = cv2.absdiff(previous, current)
+        _, mask = cv2.threshold(diff, self.diff_threshold, 255, cv2.THRESH_BINARY)
+        fraction = float(np.count_nonzero(mask)) / mask.size
+        if fraction == 0.0:
+            return [], 0.0
+
+        mask = cv2.dilate(mask, np.ones((5, 5), np.uint8), iterations=2)
+        count, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+        scale = 1.0 / self.diff_scale
+        min_area = self.min_change_area * (self.diff_scale ** 2)
+        boxes = []
+        for x, y, w, h, area in stats[1:count]:
+            if area < min_area:
+                continue
+            boxes.append([int(x * scale) - self.margin, int((x + w) * scale) + self.margin,
+                          int(y * scale) - self.margin, int((y + h) * scale) + self.margin])
+        return merge_boxes(boxes), fraction
+
+    def process(self, frame: np.ndarray) -> dict:
+        """
+        Recognize one frame.
+
+        Args:
+            frame: BGR or grayscale image
+
+        Returns:
+            Dictionary with the frame's text, tracked regions and how much work was done
+        """
+        with self._lock:
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+            height, width = gray.shape
+            self.frame_index += 1
+
+            with METRICS.stage('frame_diff'):
+                prepared = self._diff_image(gray)
+                full_frame = self._previous is None or self._previous.shape != prepared.shape
+                fraction = 1.0
+                changed = []
+                if not full_frame:
+                    changed, fraction = self.changed_regions(self._previous, prepared)
+                    full_frame = fraction >= self.reset_fraction
+                self._previous = prepared
+
+            if full_frame:
+                invalidated, self.tracks = self.tracks, []
+                changed = [[0, width, 0, height]]
+            else:
+                # Re-read whole lines that were touched, not just the changed pixels
+                invalidated = []
+                while True:
+                    touched = [t for t in self.tracks if any(boxes_overlap(t.box, c) for c in changed)]
+                    if not touched:
+                        break
+                    invalidated += touched
+                    self.tracks = [t for t in self.tracks if t not in touched]
+                    changed = merge_boxes(changed + [t.box for t in touched])
+
+            for track in self.tracks:
+                track.hits += 1
+
+            # Detect text only inside changed areas, then recognize all new boxes at once
+            new_boxes = []
+            for x_min, x_max, y_min, y_max in changed:
+                x_min, x_max = max(0, x_min), min(width, x_max)
+                y_min, y_max = max(0, y_min), min(height, y_max)
+                if x_max - x_min < 2 or y_max - y_min < 2:
+                    continue
+                for box in self.detect_fn(gray[y_min:y_max, x_min:x_max]):
+                    new_boxes.append([box[0] + x_min, box[1] + x_min, box[2] + y_min, box[3] + y_min])
+
+            recognized = self.recognize_fn(gray, new_boxes) if new_boxes else []
+            for box, (text, confidence) in zip(new_boxes, recognized):
+                if not text:
+                    continue
+                previous = max(invalidated, key=lambda t: box_iou(t.box, box), default=None)
+                if previous is not None and box_iou(previous.box, box) >= 0.5:
+                    # Same place: keep the id, and the stability if the text did not change
+                    previous.hits = previous.hits + 1 if previous.text == text else 1
+                    previous.box, previous.text, previous.confidence = box, text, confidence
+                    invalidated.remove(previous)
+                    self.tracks.append(previous)
+                else:
+                    self.tracks.append(TextTrack(self._next_id, box, text, confidence))
+                    self._next_id += 1
+
+            order = reading_order([t.box for t in self.tracks])
+            self.tracks = [self.tracks[i] for i in order]
+            regions = [t.to_dict(self.stable_frames) for t in self.tracks]
+
+            return {
+                'frame': self.frame_index,
+                'text': ' '.join(r['text'] for r in regions),
+                'stable_text': ' '.join(r['text'] for r in regions if r['stable']),
+                'regions': regions,
+                'full_frame': full_frame,
+                'changed_fraction': round(fraction, 4),
+                'changed_areas': len(changed),
+                'recognized': len(new_boxes),
+            }
@@ -0,0 +1,337 @@
+"""
+OCR Task Queue
+Web nodes enqueue OCR tasks (image bytes or a path to them, plus backend
+and options) and worker nodes claim them in batches and publish results.
+
+Delivery is at-least-once: a claimed task is leased to one worker and is
+handed out again if the lease expires before the result is written.
+Results are keyed on the image's file hash (plus backend and options) and
+the first write wins, so a task processed twice is harmless.
+
+TaskQueue is the interface; SQLiteTaskQueue is a single-machine stand-in
+usable from several processes. Create queues with create_task_queue(url).
+"""
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import hashlib
+from collections import namedtuple
+from typing import List, Optional
+
+
+# A claimed task; exactly one of payload / payload_ref is set
+Task = namedtuple('Task', ['task_id', 'backend', 'options', 'payload', 'payload_ref', 'attempts'])
+
+
+def task_key(file_hash: str, backend: str, options: Optional[dict] = None) -> str:
+    """
+    Result key for an image, backend and options.
+
+    Args:
+        file_hash: Hash of the image file
+        backend: Predictor backend name
+        options: predict() keyword arguments
+
+    Returns:
+        Task id; identical requests share it
+    """
+    key = f"{backend}:{file_hash}"
+    if options:
+        digest = hashlib.md5(json.dumps(options, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+        key += f":{digest}"
+    return key
+
+
+class TaskQueue:
+    """Interface of an OCR task queue."""
+
+    def enqueue(self, file_hash: str, backend: str = 'easyocr', options: Optional[dict] = None,
+                payload: Optional[bytes] = None, payload_ref: Optional[str] = None) -> str:
+        """
+        Add a task unless a successful result exists or it is already queued.
+        A stored error is discarded, so resubmitting retries the image.
+
+        Args:
+            file_hash: Hash of the image file
+            backend: Predictor backend name
+            options: predict() keyword arguments
+            payload: Encoded image bytes
+            payload_ref: Path to the image, readable by the workers
+
+        Returns:
+            Task id
+        """
+        raise NotImplementedError
+
+    def claim(self, worker_id: str, max_tasks: int = 8, lease_seconds: float = 300.0,
+              max_attempts: int = 3) -> List[Task]:
+        """
+        Lease up to max_tasks pending (or lease-expired) tasks to a worker.
+
+        Args:
+            worker_id: Identifier of the claiming worker
+            max_tasks: Batch size
+            lease_seconds: Seconds before an unfinished task is handed out again
+            max_attempts: Lease-expired tasks already delivered this often (their
+                workers died on them) are failed instead of handed out again
+
+        Returns:
+            List of claimed tasks
+        """
+        raise NotImplementedError
+
+    def complete(self, task_id: str, result: dict, worker_id: Optional[str] = None) -> bool:
+        """
+        Publish a result and remove the task.
+
+        Args:
+            task_id: Task id
+            result: JSON-serializable result
+            worker_id: Worker that produced the result
+
+        Returns:
+            True if this call stored the result, False if one already existed
+        """
+        raise NotImplementedError
+
+    def fail(self, task_id: str, error: str, max_attempts: int = 3):
+        """
+        Record a failed attempt; the task is retried until max_attempts.
+
+        Args:
+            task_id: Task id
+            error: Error message
+            max_attempts: Attempts after which the error becomes the result
+        """
+        raise NotImplementedError
+
+    def get_result(self, task_id: str) -> Optional[dict]:
+        """
+        Look up a published result.
+
+        Args:
+            task_id: Task id
+
+        Returns:
+            {'result': ..., 'error': ..., 'worker': ...} or None if not finished
+        """
+        raise NotImplementedError
+
+    def status(self, task_id: str) -> str:
+        """
+        State of a task: 'done', 'pending', 'running' or 'unknown'.
+
+        Args:
+            task_id: Task id
+
+        Returns:
+            State name
+        """
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        """Counts of pending, running and finished tasks."""
+        raise NotImplementedError
+
+
+class SQLiteTaskQueue(TaskQueue):
+    """
+    Task queue in one SQLite database file (WAL mode), shared by processes
+    on one machine. Not suitable for network file systems.
+    """
+
+    def __init__(self, path: str, timeout: float = 30.0):
+        """
+        Open (and create if needed) the queue database.
+
+        Args:
+            path: Database file path
+            timeout: Seconds to wait for a database lock
+        """
+        self.path = path
+        self.timeout = timeout
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS tasks (
+                    task_id TEXT PRIMARY KEY,
+                    backend TEXT NOT NULL,
+                    options TEXT NOT NULL,
+                    payload BLOB,
+                    payload_ref TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    lease_until REAL NOT NULL DEFAULT 0,
+                    worker TEXT,
+                    last_error TEXT,
+                    created REAL NOT NULL
+                )""")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS results (
+                    task_id TEXT PRIMARY KEY,
+                    result TEXT,
+                    error TEXT,
+                    worker TEXT,
+                    completed REAL NOT NULL
+                )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS tasks_lease ON tasks (lease_until, created)")
+
+    def _connect(self) -> sqlite3.Connection:
+        # One short-lived connection per call keeps the queue safe across threads and processes
+        conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+        conn.execute("PRAGMA busy_timeout = %d" % int(self.timeout * 1000))
+        return conn
+
+    def enqueue(self, file_hash, backend='easyocr', options=None, payload=None, payload_ref=None):
+        if (payload is None) == (payload_ref is None):
+            raise ValueError("Exactly one of payload or payload_ref is required")
+        task_id = task_key(file_hash, backend, options)
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            done = conn.execute("SELECT error FROM results WHERE task_id = ?", (task_id,)).fetchone()
+            if done is not None and done[0] is not None:
+                # Errors may be transient (a backend that failed to load); try again
+                conn.execute("DELETE FROM results WHERE task_id = ?", (task_id,))
+                done = None
+            if done is None:
+                conn.execute(
+                    "INSERT OR IGNORE INTO tasks (task_id, backend, options, payload, payload_ref, created) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (task_id, backend, json.dumps(options or {}),
+                     sqlite3.Binary(payload) if payload is not None else None, payload_ref, time.time()))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return task_id
+
+    def claim(self, worker_id, max_tasks=8, lease_seconds=300.0, max_attempts=3):
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            # Tasks that keep killing their worker would otherwise block the head of the queue
+            exhausted = conn.execute(
+                "SELECT task_id, attempts, last_error, worker FROM tasks WHERE lease_until <= ? AND attempts >= ?",
+                (now, max_attempts)).fetchall()
+            for task_id, attempts, last_error, worker in exhausted:
+                self._store(conn, task_id, None, f"Gave up after {attempts} attempts: "
+                            f"{last_error or 'lease expired, worker lost'}", worker)
+            rows = conn.execute(
+                "SELECT task_id, backend, options, payload, payload_ref, attempts FROM tasks "
+                "WHERE lease_until <= ? ORDER BY created LIMIT ?", (now, max_tasks)).fetchall()
+            conn.executemany(
+                "UPDATE tasks SET lease_until = ?, worker = ?, attempts = attempts + 1 WHERE task_id = ?",
+                [(now + lease_seconds, worker_id, row[0]) for row in rows])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return [Task(row[0], row[1], json.loads(row[2]), bytes(row[3]) if row[3] is not None else None,
+                     row[4], row[5] + 1) for row in rows]
+
+    def complete(self, task_id, result, worker_id=None):
+        return self._finish(task_id, json.dumps(result), None, worker_id)
+
+    @staticmethod
+    def _store(conn, task_id, result, error, worker_id) -> bool:
+        # First write wins; a redelivered task finishing later changes nothing
+        stored = conn.execute(
+            "INSERT OR IGNORE INTO results (task_id, result, error, worker, completed) VALUES (?, ?, ?, ?, ?)",
+            (task_id, result, error, worker_id, time.time())).rowcount == 1
+        conn.execute("DELETE FROM tasks WHERE task_id = ?", (task_id,))
+        return stored
+
+    def _finish(self, task_id, result, error, worker_id):
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            stored = self._store(conn, task_id, result, error, worker_id)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return stored
+
+    def fail(self, task_id, error, max_attempts=3):
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT attempts FROM tasks WHERE task_id = ?", (task_id,)).fetchone()
+            if row is not None and row[0] < max_attempts:
+                # Make it claimable again right away
+                conn.execute("UPDATE tasks SET lease_until = 0, last_error = ? WHERE task_id = ?",
+                             (error, task_id))
+            elif row is not None:
+                self._store(conn, task_id, None, error, None)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def get_result(self, task_id):
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT result, error, worker FROM results WHERE task_id = ?",
+                               (task_id,)).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        return {'result': json.loads(row[0]) if row[0] is not None else None, 'error': row[1], 'worker': row[2]}
+
+    def status(self, task_id):
+        conn = self._connect()
+        try:
+            if conn.execute("SELECT 1 FROM results WHERE task_id = ?", (task_id,)).fetchone():
+                return 'done'
+            row = conn.execute("SELECT lease_until FROM tasks WHERE task_id = ?", (task_id,)).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return 'unknown'
+        return 'running' if row[0] > time.time() else 'pending'
+
+    def stats(self):
+        now = time.time()
+        conn = self._connect()
+        try:
+            pending = conn.execute("SELECT COUNT(*) FROM tasks WHERE lease_until <= ?", (now,)).fetchone()[0]
+            running = conn.execute("SELECT COUNT(*) FROM tasks WHERE lease_until > ?", (now,)).fetchone()[0]
+            done = conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        finally:
+            conn.close()
+        return {'pending': pending, 'running': running, 'done': done}
+
+
+def create_task_queue(url: str) -> TaskQueue:
+    """
+    Open a task queue from a URL.
+
+    Args:
+        url: 'sqlite:///path/to/queue.db' (relative paths use 'sqlite://queue.db')
+
+    Returns:
+        TaskQueue instance
+    """
+    if url.startswith('sqlite://'):
+        return SQLiteTaskQueue(url[len('sqlite://'):])
+    raise ValueError(f"Unsupported task queue URL: {url} (supported: sqlite://)")
+
+
+def new_worker_id() -> str:
+    """Worker identifier unique across nodes: host, pid and a random suffix."""
+    return f"{os.uname().nodename if hasattr(os, 'uname') else 'host'}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
@@ -0,0 +1,369 @@
+"""
+Tiled Processing for Large Images
+Splits very large scans into overlapping tiles so detection runs on
+tile-sized inputs, then merges boxes across tile seams and restores
+reading order. Memory for detection is bounded by the tile size; only the
+decoded grayscale page (one byte per pixel) is held for the whole image.
+
+Also contains the box helpers shared with streaming recognition and a
+projection-profile line segmenter for line recognizers such as TrOCR.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator, List, Tuple
+
+import cv2
+import numpy as np
+
+
+# Boxes are [x_min, x_max, y_min, y_max], the EasyOCR horizontal_list layout
+Box = List[int]
+
+
+def box_iou(a: Box, b: Box) -> float:
+    """Intersection over union of two boxes."""
+    ix = max(0, min(a[1], b[1]) - max(a[0], b[0]))
+    iy = max(0, min(a[3], b[3]) - max(a[2], b[2]))
+    inter = ix * iy
+    if inter == 0:
+        return 0.0
+    area_a = (a[1] - a[0]) * (a[3] - a[2])
+    area_b = (b[1] - b[0]) * (b[3] - b[2])
+    return inter / float(area_a + area_b - inter)
+
+
+def boxes_overlap(a: Box, b: Box) -> bool:
+    """Whether two boxes share any area."""
+    return a[0] < b[1] and b[0] < a[1] and a[2] < b[3] and b[2] < a[3]
+
+
+def merge_boxes(boxes: List[Box]) -> List[Box]:
+    """Merge overlapping boxes until none overlap."""
+    boxes = [list(b) for b in boxes]
+    merged = True
+    while merged:
+        merged = False
+        result = []
+        for box in boxes:
+            for other in result:
+                if boxes_overlap(box, other):
+                    other[0], other[1] = min(other[0], box[0]), max(other[1], box[1])
+                    other[2], other[3] = min(other[2], box[2]), max(other[3], box[3])
+                    merged = True
+                    break
+            else:
+                result.append(box)
+        boxes = result
+    return boxes
+
+
+def reading_lines(boxes: List[Box]) -> List[List[int]]:
+    """
+    Group boxes into lines, top to bottom, each line left to right.
+    A box starts a new line when its vertical centre is below the current line.
+
+    Returns:
+        List of lines, each a list of box indices
+    """
+    order = sorted(range(len(boxes)), key=lambda i: (boxes[i][2] + boxes[i][3]) / 2.0)
+    lines = []
+    for i in order:
+        centre = (boxes[i][2] + boxes[i][3]) / 2.0
+        if lines and centre <= lines[-1]['bottom']:
+            lines[-1]['items'].append(i)
+            lines[-1]['bottom'] = max(lines[-1]['bottom'], boxes[i][3])
+        else:
+            lines.append({'items': [i], 'bottom': boxes[i][3]})
+    return [sorted(line['items'], key=lambda j: boxes[j][0]) for line in lines]
+
+
+def reading_order(boxes: List[Box]) -> List[int]:
+    """Indices of boxes in reading order: lines top to bottom, left to right."""
+    return [i for line in reading_lines(boxes) for i in line]
+
+
+def image_pixels(image) -> int:
+    """
+    Pixel count of an image without decoding it.
+
+    Args:
+        image: Path to an image file or a decoded image
+
+    Returns:
+        Width x height (0 if the file cannot be read)
+    """
+    if isinstance(image, np.ndarray):
+        return int(image.shape[0] * image.shape[1])
+    try:
+        from PIL import Image
+        with Image.open(image) as img:
+            return img.width * img.height
+    except Exception:
+        return 0
+
+
+def iter_tiles(height: int, width: int, tile_size: int = 1024,
+               overlap: int = 128) -> Iterator[Tuple[int, int, int, int]]:
+    """
+    Overlapping tiles covering an image, row by row.
+
+    Args:
+        height: Image height
+        width: Image width
+        tile_size: Tile edge length in pixels
+        overlap: Pixels shared by neighbouring tiles (should exceed the tallest text line)
+
+    Yields:
+        (x0, y0, x1, y1) tile bounds
+    """
+    if overlap >= tile_size:
+        raise ValueError("overlap must be smaller than tile_size")
+    step = tile_size - overlap
+
+    def starts(length):
+        if length <= tile_size:
+            return [0]
+        positions = list(range(0, length - tile_size, step))
+        return positions + [length - tile_size]
+
+    for y0 in starts(height):
+        for x0 in starts(width):
+            yield x0, y0, min(x0 + tile_size, width), min(y0 + tile_size, height)
+
+
+def overlapping_pairs(boxes: List[Box], cell: int = 256) -> List[Tuple[int, int]]:
+    """
+    Pairs of overlapping boxes, found through a coarse grid instead of
+    comparing every pair.
+
+    Args:
+        boxes: Boxes to compare
+        cell: Grid cell size in pixels
+
+    Returns:
+        (i, j) index pairs with i < j
+    """
+    grid = {}
+    for i, (x_min, x_max, y_min, y_max) in enumerate(boxes):
+        for gx in range(x_min // cell, (max(x_min, x_max - 1)) // cell + 1):
+            for gy in range(y_min // cell, (max(y_min, y_max - 1)) // cell + 1):
+                grid.setdefault((gx, gy), []).append(i)
+
+    pairs = set()
+    for members in grid.values():
+        for a in range(len(members)):
+            for b in range(a + 1, len(members)):
+                i, j = members[a], members[b]
+                if boxes_overlap(boxes[i], boxes[j]):
+                    pairs.add((min(i, j), max(i, j)))
+    return sorted(pairs)
+
+
+def nms(boxes: List[Box], scores: List[float], overlap_threshold: float = 0.7) -> List[int]:
+    """
+    Non-maximum suppression by overlap relative to the smaller box, so a
+    fragment inside a complete detection is suppressed too.
+
+    Args:
+        boxes: Boxes to filter
+        scores: Score per box (higher wins)
+        overlap_threshold: Intersection / smaller area above which the lower score is dropped
+
+    Returns:
+        Indices of the kept boxes
+    """
+    neighbours = {}
+    for i, j in overlapping_pairs(boxes):
+        a, b = boxes[i], boxes[j]
+        inter = (min(a[1], b[1]) - max(a[0], b[0])) * (min(a[3], b[3]) - max(a[2], b[2]))
+        smaller = min((a[1] - a[0]) * (a[3] - a[2]), (b[1] - b[0]) * (b[3] - b[2]))
+        if smaller > 0 and inter / float(smaller) >= overlap_threshold:
+            neighbours.setdefault(i, []).append(j)
+            neighbours.setdefault(j, []).append(i)
+
+    keep = []
+    suppressed = set()
+    for i in sorted(range(len(boxes)), key=lambda k: scores[k], reverse=True):
+        if i in suppressed:
+            continue
+        keep.append(i)
+        suppressed.update(neighbours.get(i, []))
+    return keep
+
+
+def merge_seam_boxes(tile_boxes: List[Tuple[int, Box]], min_vertical_overlap: float = 0.5) -> List[Box]:
+    """
+    Join boxes cut by a tile seam, then drop duplicates from overlapping tiles.
+
+    Boxes from different tiles are joined when they overlap and share most
+    of their height (the two halves of one word or line). Boxes from the
+    same tile are never joined, so neighbouring words stay separate.
+
+    Args:
+        tile_boxes: (tile index, box) pairs in image coordinates
+        min_vertical_overlap: Shared height / smaller height needed to join
+
+    Returns:
+        Merged boxes
+    """
+    tiles = [tile for tile, _ in tile_boxes]
+    boxes = [list(box) for _, box in tile_boxes]
+
+    # Union-find over seam pairs
+    parent = list(range(len(boxes)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, j in overlapping_pairs(boxes):
+        if tiles[i] == tiles[j]:
+            continue
+        a, b = boxes[i], boxes[j]
+        shared = min(a[3], b[3]) - max(a[2], b[2])
+        smaller = min(a[3] - a[2], b[3] - b[2])
+        if smaller > 0 and shared / float(smaller) >= min_vertical_overlap:
+            parent[find(j)] = find(i)
+
+    groups = {}
+    for i, box in enumerate(boxes):
+        root = find(i)
+        if root in groups:
+            g = groups[root]
+            groups[root] = [min(g[0], box[0]), max(g[1], box[1]), min(g[2], box[2]), max(g[3], box[3])]
+        else:
+            groups[root] = box
+
+    merged = list(groups.values())
+    keep = nms(merged, [(b[1] - b[0]) * (b[3] - b[2]) for b in merged])
+    return [merged[i] for i in sorted(keep)]
+
+
+def detect_tiled(gray: np.ndarray, detect_fn: Callable[[np.ndarray], List[Box]],
+                 tile_size: int = 1024, overlap: int = 128, workers: int = 1) -> List[Box]:
+    """
+    Run a detector tile by tile and merge the boxes across seams.
+
+    At most `workers` tiles are in flight at once, so peak detector memory
+    stays bounded by tile_size regardless of the image size.
+
+    Args:
+        gray: Grayscale page
+        detect_fn: Returns boxes for a grayscale tile (tile coordinates)
+        tile_size: Tile edge length in pixels
+        overlap: Pixels shared by neighbouring tiles
+        workers: Tiles detected in parallel
+
+    Returns:
+        Boxes in image coordinates, in reading order
+    """
+    height, width = gray.shape[:2]
+    tiles = list(iter_tiles(height, width, tile_size, overlap))
+
+    def detect(tile):
+        x0, y0, x1, y1 = tile
+        return [[b[0] + x0, b[1] + x0, b[2] + y0, b[3] + y0] for b in detect_fn(gray[y0:y1, x0:x1])]
+
+    tile_boxes = []
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            # Submit in windows so only `workers` tile inputs exist at a time
+            for start in range(0, len(tiles), workers):
+                window = tiles[start:start + workers]
+                for offset, boxes in enumerate(pool.map(detect, window)):
+                    tile_boxes += [(start + offset, b) for b in boxes]
+    else:
+        for index, tile in enumerate(tiles):
+            tile_boxes += [(index, b) for b in detect(tile)]
+
+    boxes = merge_seam_boxes(tile_boxes)
+    return [boxes[i] for i in reading_order(boxes)]
+
+
+def segment_lines(gray: np.ndarray, strip_height: int = 1024, overlap: int = 128,
+                  min_line_height: int = 8, gap_rows: int = 2) -> List[Box]:
+    """
+    Find text lines with horizontal projection profiles, one strip at a time.
+
+    Each strip is binarized on its own (Otsu), so memory is bounded by the
+    strip, and lines are assigned to the strip in which they start.
+
+    Args:
+        gray: Grayscale page (dark text on light background)
+        strip_height: Rows processed per strip
+        overlap: Rows shared by neighbouring strips (should exceed the tallest line)
+        min_line_height: Ignore ink runs shorter than this
+        gap_rows: Blank rows that end a line
+
+    Returns:
+        Line boxes [x_min, x_max, y_min, y_max], top to bottom
+    """
+    height, width = gray.shape[:2]
+    lines = []
+    for _, y0, _, y1 in iter_tiles(height, 1, strip_height, overlap):
+        strip = gray[y0:y1]
+        _, ink = cv2.threshold(strip, 0, 1, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+        rows = ink.sum(axis=1) > max(1, width // 500)
+
+        # Lines starting in the shared band belong to the next strip
+        core_end = y1 - overlap // 2 if y1 < height else y1
+        start, blank = None, 0
+        for r, has_ink in enumerate(list(rows) + [False] * (gap_rows + 1)):
+            if has_ink:
+                start = r if start is None else start
+                blank = 0
+            elif start is not None:
+                blank += 1
+                if blank > gap_rows:
+                    end = min(r - blank + 1, len(rows))
+                    top = y0 + start
+                    if end - start >= min_line_height and (top >= lines[-1][3] if lines else True) \
+                            and top < core_end:
+                        cols = np.flatnonzero(ink[start:end].any(axis=0))
+                        lines.append([int(cols[0]), int(cols[-1]) + 1, top, y0 + end])
+                    start, blank = None, 0
+    return lines
+
+
+def split_wide_box(gray: np.ndarray, box: Box, max_aspect: float = 8.0) -> List[Box]:
+    """
+    Split a long text line into pieces no wider than max_aspect x its height,
+    cutting at the widest blank column gap near each limit.
+
+    Args:
+        gray: Grayscale page
+        box: Line box
+        max_aspect: Maximum width / height of a piece
+
+    Returns:
+        Boxes covering the line, left to right
+    """
+    x_min, x_max, y_min, y_max = box
+    max_width = int(max_aspect * max(1, y_max - y_min))
+    if x_max - x_min <= max_width:
+        return [list(box)]
+
+    crop = gray[y_min:y_max, x_min:x_max]
+    _, ink = cv2.threshold(crop, 0, 1, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    blank = ink.sum(axis=0) == 0
+
+    pieces = []
+    left = 0
+    while x_max - x_min - left > max_width:
+        limit = left + max_width
+        window = blank[left + max_width // 2:limit]
+        # Cut in the middle of the last blank run in the second half, else hard cut
+        cut = limit
+        if window.any():
+            idx = np.flatnonzero(window)
+            run_end = idx[-1]
+            run_start = run_end
+            while run_start - 1 >= 0 and window[run_start - 1]:
+                run_start -= 1
+            cut = left + max_width // 2 + (run_start + run_end) // 2
+        pieces.append([x_min + left, x_min + cut, y_min, y_max])
+        left = cut
+    pieces.append([x_min + left, x_max, y_min, y_max])
+    return pieces
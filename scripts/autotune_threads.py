@@ -0,0 +1,134 @@
+"""
+Sweep thread counts x worker counts on this machine and store the
+configuration with the best throughput in model/configs/config.json.
+
+Every candidate runs `workers` spawned processes, each with its torch,
+OpenCV and TensorFlow pools sized to `threads` (and optionally pinned to
+its own CPUs), all predicting synthetic images for a fixed duration.
+
+Examples:
+    python scripts/autotune_threads.py --backend easyocr --duration 20
+    python scripts/autotune_threads.py --backend crnn --pin-cpus --dry-run
+"""
+
+import os
+import sys
+import time
+import json
+import argparse
+import tempfile
+import multiprocessing as mp
+
+# Add project root so we can import model package
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from model.utils.runtime_config import (load_runtime_config, set_thread_env, apply_runtime_config,
+                                        save_runtime_config)
+
+CONFIG_PATH = os.path.join(ROOT, 'model', 'configs', 'config.json')
+
+
+def make_settings(workers, threads, pin_cpus):
+    # Start from the current config so non-thread settings (e.g. model_store) are kept
+    settings = load_runtime_config(CONFIG_PATH)
+    settings.update({
+        'workers': workers,
+        'torch_threads': threads,
+        'torch_interop_threads': 1,
+        'opencv_threads': threads,
+        'tf_intra_op_threads': threads,
+        'tf_inter_op_threads': 1,
+        'pin_cpus': pin_cpus,
+    })
+    return settings
+
+
+def worker(backend, settings, worker_index, paths, barrier, duration, results):
+    # Thread env first, so torch/TensorFlow start with the right pool sizes
+    set_thread_env(settings)
+    from model.utils.benchmark import create_backend
+    predictor = create_backend(backend, CONFIG_PATH)
+    apply_runtime_config(settings, worker_index=worker_index)
+
+    # Warm up once, then start together with the other workers
+    predictor.predict(paths[0])
+    barrier.wait()
+
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < duration:
+        predictor.predict(paths[count % len(paths)])
+        count += 1
+    results.put(count / (time.perf_counter() - start))
+
+
+def measure(backend, settings, paths, duration):
+    """Run one candidate and return total images/sec across its workers."""
+    ctx = mp.get_context('spawn')
+    workers = settings['workers']
+    barrier = ctx.Barrier(workers)
+    results = ctx.Queue()
+    processes = [ctx.Process(target=worker, args=(backend, settings, i, paths, barrier, duration, results))
+                 for i in range(workers)]
+    for process in processes:
+        process.start()
+    try:
+        total = sum(results.get(timeout=duration + 600) for _ in processes)
+    finally:
+        for process in processes:
+            process.join(timeout=30)
+            if process.is_alive():
+                process.terminate()
+    return total
+
+
+def powers_of_two(limit):
+    values, value = [], 1
+    while value <= limit:
+        values.append(value)
+        value *= 2
+    if values[-1] != limit:
+        values.append(limit)
+    return values
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Autotune CPU thread topology')
+    parser.add_argument('--backend', default='easyocr', choices=['crnn', 'easyocr', 'trocr'])
+    parser.add_argument('--size', default='line', choices=['word', 'line', 'page'])
+    parser.add_argument('--duration', type=float, default=15.0, help='Seconds per candidate')
+    parser.add_argument('--cpus', type=int, default=len(os.sched_getaffinity(0))
+                        if hasattr(os, 'sched_getaffinity') else os.cpu_count())
+    parser.add_argument('--pin-cpus', action='store_true', help='Pin each worker to its own CPUs')
+    parser.add_argument('--dry-run', action='store_true', help='Do not write the config file')
+    args = parser.parse_args()
+
+    from model.utils.benchmark import generate_synthetic_samples
+
+    candidates = [(w, t) for w in powers_of_two(args.cpus) for t in powers_of_two(args.cpus)
+                  if w * t <= args.cpus]
+    print(f"Sweeping {len(candidates)} candidates on {args.cpus} CPUs ({args.duration:.0f}s each)")
+
+    results = []
+    with tempfile.TemporaryDirectory() as data_dir:
+        paths = [s['path'] for s in generate_synthetic_samples(data_dir, [args.size], 8)]
+        for workers, threads in candidates:
+            settings = make_settings(workers, threads, args.pin_cpus)
+            throughput = measure(args.backend, settings, paths, args.duration)
+            results.append((throughput, -workers, settings))
+            print(f"  workers={workers:<3} threads={threads:<3} -> {throughput:8.2f} images/sec")
+
+    # Highest throughput wins; ties go to fewer workers (less memory)
+    best_throughput, _, best = max(results, key=lambda r: (r[0], r[1]))
+    print(f"\nBest: {json.dumps(best)} at {best_throughput:.2f} images/sec")
+
+    if not args.dry_run:
+        save_runtime_config(CONFIG_PATH, best)
+        print(f"Saved runtime configuration to {CONFIG_PATH}")
+        print(f"`gunicorn app:app` now starts {best['workers']} workers (see gunicorn.conf.py)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""
+Compare shared-memory and pickle transport of decoded images between processes.
+
+Each round trip sends one image to a child process, which touches a
+subsample of pixels (like a predictor starting to read it) and replies.
+
+Example:
+    python scripts/bench_shm_transport.py --megapixels 1 4 12 --rounds 50
+"""
+
+import os
+import sys
+import time
+import pickle
+import argparse
+import multiprocessing as mp
+
+import numpy as np
+
+# Add project root so we can import model package
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from model.utils.shm_transport import SharedMemoryRing
+from model.utils.benchmark import percentile
+
+
+def touch(image):
+    """Read a sparse subsample so both paths do the same minimal work."""
+    return int(image[::64, ::64].sum())
+
+
+def pickle_worker(requests, responses):
+    while True:
+        image = requests.get()
+        if image is None:
+            break
+        responses.put(touch(image))
+
+
+def shm_worker(ring, requests, responses):
+    while True:
+        handle = requests.get()
+        if handle is None:
+            break
+        image = ring.view(handle)
+        result = touch(image)
+        image = None
+        ring.release(handle)
+        responses.put(result)
+    ring.close()
+
+
+def measure(send, receive, image, rounds):
+    latencies = []
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        send(image)
+        receive()
+        latencies.append((time.perf_counter() - t0) * 1000.0)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark image transport between processes')
+    parser.add_argument('--megapixels', nargs='+', type=float, default=[1, 4, 12])
+    parser.add_argument('--channels', type=int, default=3)
+    parser.add_argument('--rounds', type=int, default=30)
+    args = parser.parse_args()
+
+    ctx = mp.get_context('spawn')
+    max_bytes = int(max(args.megapixels) * 1e6) * args.channels
+    ring = SharedMemoryRing(num_slots=4, slot_bytes=max_bytes, ctx=ctx)
+
+    pickle_requests, pickle_responses = ctx.Queue(), ctx.Queue()
+    shm_requests, shm_responses = ctx.Queue(), ctx.Queue()
+    workers = [
+        ctx.Process(target=pickle_worker, args=(pickle_requests, pickle_responses), daemon=True),
+        ctx.Process(target=shm_worker, args=(ring, shm_requests, shm_responses), daemon=True),
+    ]
+    for worker in workers:
+        worker.start()
+
+    print(f"{'MP':>6}{'pickle p50':>12}{'pickle p95':>12}{'shm p50':>10}{'shm p95':>10}"
+          f"{'dumps ms':>10}{'copy ms':>9}")
+    try:
+        for mpix in args.megapixels:
+            side = int((mpix * 1e6) ** 0.5)
+            shape = (side, side, args.channels) if args.channels > 1 else (side, side)
+            image = np.random.randint(0, 255, size=shape, dtype=np.uint8)
+
+            pickled = measure(pickle_requests.put, pickle_responses.get, image, args.rounds)
+            shared = measure(lambda img: shm_requests.put(ring.put(img)), shm_responses.get,
+                             image, args.rounds)
+
+            # Serialization and copy cost on their own
+            t0 = time.perf_counter()
+            pickle.dumps(image, protocol=pickle.HIGHEST_PROTOCOL)
+            dumps_ms = (time.perf_counter() - t0) * 1000.0
+            scratch = np.empty_like(image)
+            t0 = time.perf_counter()
+            np.copyto(scratch, image)
+            copy_ms = (time.perf_counter() - t0) * 1000.0
+
+            print(f"{mpix:>6.1f}{percentile(pickled, 50):>12.2f}{percentile(pickled, 95):>12.2f}"
+                  f"{percentile(shared, 50):>10.2f}{percentile(shared, 95):>10.2f}"
+                  f"{dumps_ms:>10.2f}{copy_ms:>9.2f}")
+    finally:
+        pickle_requests.put(None)
+        shm_requests.put(None)
+        for worker in workers:
+            worker.join(timeout=10)
+        ring.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,264 @@
+"""
+Convert the TF1 CRNN checkpoint into lightweight inference artifacts and
+compare them with the Session path.
+
+`convert` freezes the .meta checkpoint (variables folded into constants,
+training nodes stripped) and writes a TFLite model (run with XNNPACK) and/or
+an ONNX model. It needs TensorFlow (and tf2onnx for ONNX), once.
+`compare` loads each backend in a fresh process and reports import time,
+startup time, latency, and whether the recognized text and raw outputs match
+the Session backend.
+
+Examples:
+    python scripts/convert_crnn.py convert --formats tflite onnx
+    python scripts/convert_crnn.py compare --backends session tflite onnx --dataset data/packed/test
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import importlib
+import subprocess
+
+# Add project root so we can import model package
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import numpy as np
+
+CONFIG_PATH = os.path.join(ROOT, 'model', 'configs', 'config.json')
+
+# Library imported by each backend, timed separately from model loading
+BACKEND_MODULES = {
+    'session': ['tensorflow'],
+    'tflite': ['tflite_runtime.interpreter', 'ai_edge_litert.interpreter'],
+    'onnx': ['onnxruntime'],
+}
+
+
+def freeze_graph(model_path: str, output_node: str):
+    """
+    Load a .meta checkpoint and fold its variables into constants.
+
+    Args:
+        model_path: Checkpoint prefix (model_path + '.meta' must exist)
+        output_node: Name of the output operation
+
+    Returns:
+        Frozen GraphDef
+    """
+    import tensorflow as tf
+
+    graph = tf.Graph()
+    with graph.as_default(), tf.compat.v1.Session(graph=graph) as session:
+        saver = tf.compat.v1.train.import_meta_graph(model_path + '.meta', clear_devices=True)
+        saver.restore(session, model_path)
+        graph_def = tf.compat.v1.graph_util.remove_training_nodes(graph.as_graph_def())
+        return tf.compat.v1.graph_util.convert_variables_to_constants(session, graph_def, [output_node])
+
+
+def convert_tflite(graph_def, output_node: str, out_path: str, select_tf_ops: bool = False):
+    """
+    Write a TFLite model from a frozen graph, keeping the graph's input shapes
+    (a dynamic width stays dynamic, so width buckets keep working).
+
+    Args:
+        graph_def: Frozen GraphDef
+        output_node: Name of the output operation
+        out_path: Output .tflite path
+        select_tf_ops: Allow TensorFlow ops without a TFLite builtin (needs the Flex delegate,
+            which tflite-runtime does not ship; prefer exporting the logits instead)
+    """
+    import tensorflow as tf
+
+    wrapped = tf.compat.v1.wrap_function(lambda: tf.compat.v1.import_graph_def(graph_def, name=''), [])
+    function = wrapped.prune(feeds=['input:0', 'seq_len:0'], fetches=[f'{output_node}:0'])
+    converter = tf.lite.TFLiteConverter.from_concrete_functions([function], wrapped)
+    # No quantization: results must match the Session path
+    ops = [tf.lite.OpsSet.TFLITE_BUILTINS]
+    if select_tf_ops:
+        ops.append(tf.lite.OpsSet.SELECT_TF_OPS)
+    converter.target_spec.supported_ops = ops
+    with open(out_path, 'wb') as f:
+        f.write(converter.convert())
+
+
+def convert_onnx(graph_def, output_node: str, out_path: str, opset: int = 13):
+    """
+    Write an ONNX model from a frozen graph.
+
+    Args:
+        graph_def: Frozen GraphDef
+        output_node: Name of the output operation
+        out_path: Output .onnx path
+        opset: ONNX opset
+    """
+    import tf2onnx
+
+    tf2onnx.convert.from_graph_def(graph_def, input_names=['input:0', 'seq_len:0'],
+                                   output_names=[f'{output_node}:0'], opset=opset, output_path=out_path)
+
+
+def load_images(args) -> list:
+    """Images for the comparison: a packed dataset, a directory, or synthetic lines."""
+    import cv2
+
+    if args.dataset:
+        from model.data_loader.shards import ShardReader
+        reader = ShardReader(args.dataset)
+        return [reader.decode(i) for i in range(min(args.limit, len(reader)))]
+    if args.images:
+        names = sorted(n for n in os.listdir(args.images) if n.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp')))
+        return [cv2.imread(os.path.join(args.images, n), cv2.IMREAD_GRAYSCALE) for n in names[:args.limit]]
+
+    from model.utils.benchmark import generate_synthetic_samples
+    with tempfile.TemporaryDirectory() as tmp:
+        samples = generate_synthetic_samples(tmp, ['word', 'line'], max(1, args.limit // 2))
+        return [cv2.imread(s['path'], cv2.IMREAD_GRAYSCALE) for s in samples]
+
+
+def measure(args):
+    """Child process: load one backend, run the images, write a report."""
+    start = time.perf_counter()
+    for module in BACKEND_MODULES[args.backend]:
+        try:
+            importlib.import_module(module)
+            break
+        except ImportError:
+            continue
+    import_seconds = time.perf_counter() - start
+
+    from model.mains.predictor import HandwritingPredictor
+    predictor = HandwritingPredictor(args.config)
+    predictor.inference_backend = args.backend
+    start = time.perf_counter()
+    predictor.setup()
+    setup_seconds = time.perf_counter() - start
+    loaded = predictor.runtime is not None if args.backend != 'session' else predictor.session is not None
+
+    images = load_images(args)
+    texts, outputs, latencies = [], [], []
+    if loaded:
+        for image in images:
+            line, width = predictor.prepare_line(image)
+            batch = predictor.pad_batch([line], predictor.bucket_width(width))
+            seq_len = np.array([predictor.seq_len_for(width)], dtype=np.int32)
+            start = time.perf_counter()
+            if predictor.runtime is not None:
+                output = predictor.runtime.run(batch, seq_len)
+            else:
+                output = predictor.session.run(predictor.output_tensor, feed_dict={
+                    predictor.input_tensor: batch, predictor.seq_len_tensor: seq_len})
+            latencies.append(time.perf_counter() - start)
+            outputs.append(np.asarray(output))
+            texts.append(predictor.decode_batch(output, seq_len)[0])
+        np.savez(args.outputs, *outputs)
+
+    with open(args.report, 'w') as f:
+        json.dump({'loaded': loaded, 'import_seconds': import_seconds, 'setup_seconds': setup_seconds,
+                   'latencies': latencies, 'texts': texts}, f)
+
+
+def compare(args):
+    """Run every backend in a fresh process and compare it with the first."""
+    from model.utils.benchmark import percentile
+
+    reports = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend in args.backends:
+            report_path = os.path.join(tmp, f'{backend}.json')
+            outputs_path = os.path.join(tmp, f'{backend}.npz')
+            command = [sys.executable, os.path.abspath(__file__), 'measure', backend,
+                       '--report', report_path, '--outputs', outputs_path,
+                       '--config', args.config, '--limit', str(args.limit)]
+            if args.dataset:
+                command += ['--dataset', args.dataset]
+            if args.images:
+                command += ['--images', args.images]
+            subprocess.run(command, check=True)
+            with open(report_path, 'r') as f:
+                reports[backend] = json.load(f)
+            if reports[backend]['loaded']:
+                with np.load(outputs_path) as data:
+                    reports[backend]['outputs'] = [data[k] for k in data.files]
+
+    reference_name = args.backends[0]
+    reference = reports[reference_name]
+    print(f"{'backend':<8} {'import':>8} {'setup':>8} {'p50':>9} {'p95':>9} {'text match':>11} {'max |diff|':>11}")
+    for backend, report in reports.items():
+        if not report['loaded']:
+            print(f"{backend:<8} not loaded")
+            continue
+        latencies_ms = [v * 1000.0 for v in report['latencies']]
+        match, diff = '-', '-'
+        if backend != reference_name and reference['loaded']:
+            same = sum(a == b for a, b in zip(reference['texts'], report['texts']))
+            match = f"{same}/{len(report['texts'])}"
+            diffs = [float(np.max(np.abs(a.astype(np.float64) - b)))
+                     for a, b in zip(reference['outputs'], report['outputs']) if a.shape == b.shape]
+            diff = f"{max(diffs, default=0.0):.2e}"
+        print(f"{backend:<8} {report['import_seconds']:7.2f}s {report['setup_seconds']:7.2f}s "
+              f"{percentile(latencies_ms, 50):7.2f}ms {percentile(latencies_ms, 95):7.2f}ms {match:>11} {diff:>11}")
+
+
+def convert(args):
+    with open(args.config, 'r') as f:
+        config = json.load(f)
+    model_path = args.model_path or config.get('model_path', 'model/models/best_model')
+    if not os.path.exists(model_path + '.meta'):
+        raise SystemExit(f"Checkpoint not found: {model_path}.meta")
+
+    graph_def = freeze_graph(model_path, args.output_node)
+    print(f"Froze {model_path} ({len(graph_def.node)} nodes)")
+    if 'tflite' in args.formats:
+        out_path = config.get('tflite_model_path', 'model/models/crnn.tflite')
+        convert_tflite(graph_def, args.output_node, out_path, args.select_tf_ops)
+        print(f"Wrote {out_path} ({os.path.getsize(out_path) / (1024 * 1024):.1f}MB)")
+    if 'onnx' in args.formats:
+        out_path = config.get('onnx_model_path', 'model/models/crnn.onnx')
+        convert_onnx(graph_def, args.output_node, out_path, args.opset)
+        print(f"Wrote {out_path} ({os.path.getsize(out_path) / (1024 * 1024):.1f}MB)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert and compare CRNN inference backends')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    convert_parser = sub.add_parser('convert', help='Freeze the checkpoint and write TFLite/ONNX models')
+    convert_parser.add_argument('--formats', nargs='+', choices=['tflite', 'onnx'], default=['tflite'])
+    convert_parser.add_argument('--model-path', help='Checkpoint prefix (default: model_path in the config)')
+    convert_parser.add_argument('--output-node', default='output')
+    convert_parser.add_argument('--opset', type=int, default=13)
+    convert_parser.add_argument('--select-tf-ops', action='store_true')
+    convert_parser.add_argument('--config', default=CONFIG_PATH)
+
+    for name, help_text in (('compare', 'Compare backends in fresh processes'),
+                            ('measure', 'Measure one backend (used by compare)')):
+        p = sub.add_parser(name, help=help_text)
+        if name == 'compare':
+            p.add_argument('--backends', nargs='+', choices=list(BACKEND_MODULES),
+                           default=['session', 'tflite', 'onnx'], help='The first one is the reference')
+        else:
+            p.add_argument('backend', choices=list(BACKEND_MODULES))
+            p.add_argument('--report', required=True)
+            p.add_argument('--outputs', required=True)
+        p.add_argument('--dataset', help='Packed dataset (scripts/dataset.py pack)')
+        p.add_argument('--images', help='Directory of line images')
+        p.add_argument('--limit', type=int, default=100)
+        p.add_argument('--config', default=CONFIG_PATH)
+    args = parser.parse_args()
+
+    if args.command == 'convert':
+        convert(args)
+    elif args.command == 'compare':
+        compare(args)
+    else:
+        measure(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Pack datasets into shards and evaluate predictors over them.
+
+`pack` converts the label lists named in the config (data_path + train_data /
+val_data / test_data, one "<image path> <text>" per line) into packed shards
+once. `eval` streams a packed split through a predictor backend and prints
+accuracy and throughput.
+
+Examples:
+    python scripts/dataset.py pack --out data/packed
+    python scripts/dataset.py pack --labels data/test.txt --out data/packed/test
+    python scripts/dataset.py eval crnn data/packed/test --batch-size 64 --group-by-width
+"""
+
+import os
+import sys
+import json
+import argparse
+
+# Add project root so we can import model package
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from model.data_loader.shards import read_label_file, write_shards
+from model.data_loader.loader import ShardLoader, evaluate_predictor
+from model.utils.benchmark import create_backend, BACKEND_NAMES
+
+CONFIG_PATH = os.path.join(ROOT, 'model', 'configs', 'config.json')
+
+
+def pack(args):
+    if args.labels:
+        splits = {'': args.labels}
+    else:
+        with open(args.config, 'r') as f:
+            config = json.load(f)
+        data_path = config.get('data_path', 'data/')
+        splits = {split: os.path.join(data_path, config[key])
+                  for split, key in (('train', 'train_data'), ('val', 'val_data'), ('test', 'test_data'))
+                  if config.get(key)}
+
+    for split, label_path in splits.items():
+        if not os.path.exists(label_path):
+            print(f"Skipping {split or label_path}: {label_path} not found")
+            continue
+        out_dir = os.path.join(args.out, split) if split else args.out
+        samples = read_label_file(label_path, args.image_root)
+        manifest = write_shards(samples, out_dir, shard_size=args.shard_size, source=label_path)
+        print(f"Packed {manifest['samples']} samples ({manifest['skipped']} skipped) "
+              f"into {len(manifest['shards'])} shards in {out_dir}")
+
+
+def evaluate(args):
+    predictor = create_backend(args.backend, args.config)
+    loader = ShardLoader(args.dataset, batch_size=args.batch_size, shuffle=False, workers=args.workers,
+                         prefetch=args.prefetch, grayscale=args.backend == 'crnn',
+                         group_by_width=args.group_by_width, limit=args.limit)
+    report = evaluate_predictor(predictor, loader)
+    print(json.dumps(report, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Packed dataset tools')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    pack_parser = sub.add_parser('pack', help='Convert label lists and images into shards')
+    pack_parser.add_argument('--out', required=True, help='Output directory')
+    pack_parser.add_argument('--labels', help='Single label file (default: the splits in the config)')
+    pack_parser.add_argument('--image-root', help='Directory image paths are relative to')
+    pack_parser.add_argument('--shard-size', type=int, default=4096)
+    pack_parser.add_argument('--config', default=CONFIG_PATH)
+
+    eval_parser = sub.add_parser('eval', help='Measure CER and throughput of a backend on a packed split')
+    eval_parser.add_argument('backend', choices=BACKEND_NAMES)
+    eval_parser.add_argument('dataset', help='Packed dataset directory')
+    eval_parser.add_argument('--batch-size', type=int, default=64)
+    eval_parser.add_argument('--workers', type=int, default=4, help='Decoding threads')
+    eval_parser.add_argument('--prefetch', type=int, default=2, help='Batches decoded ahead')
+    eval_parser.add_argument('--group-by-width', action='store_true',
+                             help='Batch lines of similar width together (CRNN width buckets)')
+    eval_parser.add_argument('--limit', type=int, default=None, help='Evaluate only this many samples')
+    eval_parser.add_argument('--config', default=CONFIG_PATH)
+    args = parser.parse_args()
+
+    if args.command == 'pack':
+        pack(args)
+    else:
+        evaluate(args)
+
+
+if __name__ == '__main__':
+    main()
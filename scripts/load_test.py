@@ -0,0 +1,139 @@
+"""
+Capacity testing with recorded latency profiles.
+
+`record` runs a real backend on synthetic samples and saves its per-stage
+latency distribution and CPU share. `run` drives /predict in a closed loop
+(--concurrency) or open loop (--rate) and reports throughput, latency
+percentiles, error rate and shed rate. Without --url the app runs in this
+process; serve a profile remotely with
+HTR_BACKEND=synthetic HTR_SYNTHETIC_PROFILE=profile.json gunicorn app:app.
+
+Examples:
+    python scripts/load_test.py record easyocr profiles/easyocr_line.json --sizes line --count 20
+    python scripts/load_test.py run --profile profiles/easyocr_line.json --concurrency 8 --duration 30
+    python scripts/load_test.py run --url http://localhost:5000 --rate 20 --duration 60 --output load.json
+"""
+
+import os
+import sys
+import json
+import argparse
+import tempfile
+
+# Add project root so we can import model package
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from model.utils.benchmark import SIZE_PRESETS, BACKEND_NAMES, create_backend, generate_synthetic_samples
+from model.utils.load_generator import HTTPSender, FlaskSender, run_closed_loop, run_open_loop
+from model.mains.synthetic_predictor import record_profile, create_predictor as create_synthetic_predictor
+
+CONFIG_PATH = os.path.join(ROOT, 'model', 'configs', 'config.json')
+
+
+def record(args):
+    with tempfile.TemporaryDirectory() as data_dir:
+        samples = generate_synthetic_samples(data_dir, args.sizes, args.count, seed=args.seed)
+        predictor = create_backend(args.backend, CONFIG_PATH)
+        # Warm-up so one-off loading and allocation do not skew the distribution
+        predictor.predict(samples[0]['path'])
+        profile = record_profile(predictor, [s['path'] for s in samples], backend=args.backend)
+    profile['sizes'] = args.sizes
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(profile, f, indent=2)
+
+    print(f"Recorded {profile['requests']} requests of {args.backend} "
+          f"(CPU share {profile['cpu_fraction']:.2f}):")
+    for name, stage in profile['stages'].items():
+        print(f"  {name:<24}{stage['calls_per_request']:>8.2f} calls/request")
+    print(f"Profile saved to: {args.output}")
+    return 0
+
+
+def run(args):
+    fields = {'tier': args.tier} if args.tier else {}
+    if args.url:
+        send = HTTPSender(args.url, timeout=args.timeout, fields=fields)
+    else:
+        import app as app_module
+        if args.profile or args.backend == 'synthetic':
+            app_module.predictor = create_synthetic_predictor(args.profile, time_scale=args.time_scale)
+        else:
+            app_module.predictor = create_backend(args.backend, CONFIG_PATH)
+        send = FlaskSender(app_module.app, fields=fields)
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        samples = generate_synthetic_samples(data_dir, args.sizes, args.count, seed=args.seed)
+        images = []
+        for sample in samples:
+            with open(sample['path'], 'rb') as f:
+                images.append((os.path.basename(sample['path']), f.read()))
+
+    if args.rate:
+        report = run_open_loop(send, images, args.rate, args.duration, max_clients=args.max_clients,
+                               seed=args.seed, unique=not args.allow_cache)
+    else:
+        report = run_closed_loop(send, images, args.concurrency, duration=args.duration,
+                                 requests=args.requests, unique=not args.allow_cache)
+
+    load = f"{report['offered_rps']} req/s offered" if report['mode'] == 'open' \
+        else f"{report['concurrency']} clients"
+    print(f"\n{report['mode']} loop, {load}: {report['sent']} sent, {report['completed']} completed "
+          f"in {report['elapsed_seconds']:.1f}s")
+    print(f"  throughput  {report['throughput_rps']:.2f} req/s")
+    print(f"  latency ms  p50 {report['latency_ms']['p50']:.1f}  p95 {report['latency_ms']['p95']:.1f}  "
+          f"p99 {report['latency_ms']['p99']:.1f}  max {report['latency_ms']['max']:.1f}")
+    print(f"  errors      {report['error_rate']:.1%}   shed {report['shed_rate']:.1%}")
+    print(f"  statuses    {report['status_counts']}   QoS tiers {report['qos_tiers']}")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report saved to: {args.output}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Record latency profiles and load-test /predict')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    record_parser = subparsers.add_parser('record', help='Record a backend latency profile')
+    record_parser.add_argument('backend', choices=[name for name in BACKEND_NAMES if name != 'synthetic'])
+    record_parser.add_argument('output', help='Profile JSON to write')
+    record_parser.add_argument('--sizes', nargs='+', default=['line'], choices=list(SIZE_PRESETS))
+    record_parser.add_argument('--count', type=int, default=20, help='Images per size')
+    record_parser.add_argument('--seed', type=int, default=0)
+    record_parser.set_defaults(func=record)
+
+    run_parser = subparsers.add_parser('run', help='Drive /predict and report capacity')
+    run_parser.add_argument('--url', default=None, help='Server to test (default: the app in this process)')
+    run_parser.add_argument('--backend', default='synthetic', choices=BACKEND_NAMES,
+                            help='In-process backend (ignored with --url)')
+    run_parser.add_argument('--profile', default=None, help='Latency profile for the in-process synthetic backend')
+    run_parser.add_argument('--time-scale', type=float, default=1.0, help='Multiplier for replayed latencies')
+    load = run_parser.add_mutually_exclusive_group()
+    load.add_argument('--concurrency', type=int, default=4, help='Closed loop: concurrent clients')
+    load.add_argument('--rate', type=float, default=None, help='Open loop: mean arrivals per second')
+    run_parser.add_argument('--duration', type=float, default=30.0, help='Seconds to generate load')
+    run_parser.add_argument('--requests', type=int, default=None, help='Closed loop: stop after this many')
+    run_parser.add_argument('--max-clients', type=int, default=256, help='Open loop: open requests at most')
+    run_parser.add_argument('--tier', default=None, help='Request this QoS tier')
+    run_parser.add_argument('--timeout', type=float, default=60.0)
+    run_parser.add_argument('--sizes', nargs='+', default=['line'], choices=list(SIZE_PRESETS))
+    run_parser.add_argument('--count', type=int, default=10, help='Distinct images per size')
+    run_parser.add_argument('--allow-cache', action='store_true',
+                            help='Resend identical bytes so repeats can hit the prediction cache')
+    run_parser.add_argument('--seed', type=int, default=0)
+    run_parser.add_argument('--output', default=None, help='Write the report as JSON')
+    run_parser.set_defaults(func=run)
+
+    args = parser.parse_args()
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,116 @@
+"""
+Prepare a local memory-mapped model store and measure worker cold start.
+
+`prepare` writes the weights once (safetensors for TrOCR, zip-format torch
+checkpoints for EasyOCR) with a checksum manifest. `report` loads a backend
+in fresh processes, from the default location and from the store, and prints
+load time plus RSS / PSS / shared memory so the savings per worker are visible.
+
+Examples:
+    python scripts/model_store.py prepare easyocr model/store/easyocr
+    python scripts/model_store.py prepare trocr model/store/trocr --model microsoft/trocr-base-handwritten
+    python scripts/model_store.py verify model/store/easyocr
+    python scripts/model_store.py report easyocr model/store/easyocr --workers 4
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import multiprocessing as mp
+
+# Add project root so we can import model package
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from model.utils.model_store import (prepare_easyocr_store, prepare_trocr_store, verify_store,
+                                     rss_breakdown)
+
+
+def load_worker(backend, store_dir, quantize, barrier, results):
+    """Load one backend in this process and report timing and memory."""
+    start = time.perf_counter()
+    if backend == 'easyocr':
+        from model.mains.easyocr_predictor import create_predictor
+        predictor = create_predictor(model_store=store_dir, quantize=quantize)
+        loaded = predictor.reader is not None
+    else:
+        from model.mains.trocr_predictor import TrOCR_Predictor
+        predictor = TrOCR_Predictor(model_store=store_dir)
+        loaded = predictor.model is not None
+    load_seconds = time.perf_counter() - start
+
+    # Measure while every worker holds its model, so shared pages are counted once per worker
+    barrier.wait()
+    results.put(dict(rss_breakdown(), load_seconds=load_seconds, loaded=loaded))
+    barrier.wait()
+
+
+def measure(backend, store_dir, quantize, workers):
+    ctx = mp.get_context('spawn')
+    barrier = ctx.Barrier(workers)
+    results = ctx.Queue()
+    processes = [ctx.Process(target=load_worker, args=(backend, store_dir, quantize, barrier, results))
+                 for _ in range(workers)]
+    for p in processes:
+        p.start()
+    reports = [results.get() for _ in processes]
+    for p in processes:
+        p.join()
+    return reports
+
+
+def print_reports(label, reports):
+    def mean(key):
+        values = [r.get(key, 0.0) for r in reports]
+        return sum(values) / len(values)
+
+    total_pss = sum(r.get('pss_mb', 0.0) for r in reports)
+    print(f"{label:<8} loaded={all(r['loaded'] for r in reports)!s:<5} "
+          f"load={mean('load_seconds'):6.2f}s  rss={mean('rss_mb'):7.1f}MB  "
+          f"shared={mean('shared_mb'):7.1f}MB  private={mean('private_mb'):7.1f}MB  "
+          f"total_pss={total_pss:7.1f}MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Manage the local memory-mapped model store')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    prepare = sub.add_parser('prepare', help='Write weights into a store')
+    prepare.add_argument('backend', choices=['easyocr', 'trocr'])
+    prepare.add_argument('store_dir')
+    prepare.add_argument('--model', default='microsoft/trocr-base-handwritten', help='TrOCR model name')
+
+    verify = sub.add_parser('verify', help='Re-hash every file against the manifest')
+    verify.add_argument('store_dir')
+
+    report = sub.add_parser('report', help='Compare cold start and memory with and without the store')
+    report.add_argument('backend', choices=['easyocr', 'trocr'])
+    report.add_argument('store_dir')
+    report.add_argument('--workers', type=int, default=2)
+    report.add_argument('--quantize', action='store_true',
+                        help='Quantize EasyOCR (faster inference, weights no longer shared)')
+    args = parser.parse_args()
+
+    if args.command == 'prepare':
+        if args.backend == 'easyocr':
+            manifest = prepare_easyocr_store(args.store_dir)
+        else:
+            manifest = prepare_trocr_store(args.model, args.store_dir)
+        total_mb = sum(f['size'] for f in manifest['files'].values()) / (1024 * 1024)
+        print(f"Wrote {len(manifest['files'])} files ({total_mb:.1f}MB) to {args.store_dir}")
+
+    elif args.command == 'verify':
+        manifest = verify_store(args.store_dir, force=True)
+        print(json.dumps({'backend': manifest['backend'], 'files': len(manifest['files']), 'ok': True}))
+
+    else:
+        print(f"Loading {args.backend} in {args.workers} fresh processes")
+        print_reports('default', measure(args.backend, None, args.quantize, args.workers))
+        print_reports('store', measure(args.backend, args.store_dir, args.quantize, args.workers))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark the predictor backends on synthetic handwriting-like images.
+
+Examples:
+    python scripts/run_benchmark.py
+    python scripts/run_benchmark.py --backends easyocr --modes single http --sizes line page
+    python scripts/run_benchmark.py --baseline benchmark_results/previous.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+# Add project root so we can import model package
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from model.utils.benchmark import (SIZE_PRESETS, MODES, BACKEND_NAMES, create_backend,
+                                   generate_synthetic_samples, run_suite, save_report, compare_reports)
+
+CONFIG_PATH = os.path.join(ROOT, 'model', 'configs', 'config.json')
+
+BACKENDS = {name: (lambda name=name: create_backend(name, CONFIG_PATH)) for name in BACKEND_NAMES}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark handwriting recognition backends')
+    parser.add_argument('--backends', nargs='+', default=list(BACKENDS), choices=list(BACKENDS))
+    parser.add_argument('--modes', nargs='+', default=list(MODES), choices=list(MODES))
+    parser.add_argument('--sizes', nargs='+', default=['word', 'line'], choices=list(SIZE_PRESETS))
+    parser.add_argument('--count', type=int, default=10, help='Images per size')
+    parser.add_argument('--iterations', type=int, default=1)
+    parser.add_argument('--batch-size', type=int, default=8)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=os.path.join(
+        ROOT, 'benchmark_results', f"benchmark_{time.strftime('%Y%m%d_%H%M%S')}.json"))
+    parser.add_argument('--baseline', help='Previous report to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.10,
+                        help='Allowed relative p95/throughput regression')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        samples = generate_synthetic_samples(data_dir, args.sizes, args.count, seed=args.seed)
+        report = run_suite({name: BACKENDS[name] for name in args.backends}, samples, args.modes,
+                           iterations=args.iterations, batch_size=args.batch_size)
+
+    save_report(report, args.output)
+
+    print("\n" + "=" * 104)
+    print(f"{'backend':<10}{'mode':<8}{'size':<7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+          f"{'img/s':>9}{'peak MB':>10}{'+MB':>8}{'CER':>8}")
+    print("=" * 104)
+    for r in report['results']:
+        cer = f"{r['cer']:.3f}" if r['cer'] is not None else '-'
+        print(f"{r['backend']:<10}{r['mode']:<8}{r['size']:<7}{r['latency_ms']['p50']:>10.1f}"
+              f"{r['latency_ms']['p95']:>10.1f}{r['latency_ms']['p99']:>10.1f}"
+              f"{r['images_per_sec']:>9.2f}{r['peak_rss_mb']:>10.0f}"
+              f"{r['rss_growth_mb']:>8.0f}{cer:>8}")
+    for name, reason in report['skipped'].items():
+        print(f"{name:<10}skipped: {reason}")
+    print(f"\nReport saved to: {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare_reports(report, baseline, tolerance=args.tolerance)
+        if regressions:
+            print("\nREGRESSIONS:")
+            for message in regressions:
+                print(f"  {message}")
+            return 1
+        print("\nNo regressions against baseline.")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
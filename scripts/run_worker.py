@@ -0,0 +1,71 @@
+"""
+Run an OCR queue worker.
+
+Web nodes started with HTR_QUEUE_URL push /predict requests onto the queue;
+each worker claims them in batches, runs the backend and publishes results.
+Run as many workers as the queue's host can feed. A worker that passes its
+task budget or memory ceiling (the config's "memory" section, or --max-tasks /
+--rss-ceiling-mb) finishes its batch and restarts itself in a fresh process.
+
+Examples:
+    python scripts/run_worker.py --queue sqlite:///tmp/htr-queue.db
+    python scripts/run_worker.py --queue sqlite:///tmp/htr-queue.db --backends easyocr trocr --batch-size 16
+"""
+
+import os
+import sys
+import signal
+import argparse
+import threading
+
+# Add project root so we can import model package
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from model.utils.benchmark import create_backend, BACKEND_NAMES
+from model.utils.task_queue import create_task_queue
+from model.utils.memory_watchdog import MemoryWatchdog, load_memory_config
+from model.mains.queue_worker import QueueWorker
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Consume OCR tasks from a task queue')
+    parser.add_argument('--queue', default=os.environ.get('HTR_QUEUE_URL'),
+                        help='Task queue URL (default: $HTR_QUEUE_URL)')
+    parser.add_argument('--backends', nargs='+', default=['easyocr'], choices=BACKEND_NAMES)
+    parser.add_argument('--config', default=os.path.join(ROOT, 'model', 'configs', 'config.json'))
+    parser.add_argument('--batch-size', type=int, default=8)
+    parser.add_argument('--lease', type=float, default=300.0, help='Seconds before a claimed batch is redelivered')
+    parser.add_argument('--poll', type=float, default=0.5, help='Seconds between polls of an empty queue')
+    parser.add_argument('--max-idle', type=float, default=None, help='Exit after the queue is empty this long')
+    parser.add_argument('--worker-id', default=None)
+    parser.add_argument('--max-tasks', type=int, default=None, help='Restart after this many tasks')
+    parser.add_argument('--rss-ceiling-mb', type=float, default=None, help='Restart above this resident memory')
+    args = parser.parse_args()
+
+    if not args.queue:
+        parser.error('--queue or HTR_QUEUE_URL is required')
+
+    memory_settings = load_memory_config(args.config)
+    if args.max_tasks is not None:
+        memory_settings['max_requests'] = args.max_tasks
+    if args.rss_ceiling_mb is not None:
+        memory_settings['rss_ceiling_mb'] = args.rss_ceiling_mb
+
+    backends = {name: (lambda name=name: create_backend(name, args.config)) for name in args.backends}
+    worker = QueueWorker(create_task_queue(args.queue), backends, batch_size=args.batch_size,
+                         lease_seconds=args.lease, poll_interval=args.poll, worker_id=args.worker_id,
+                         watchdog=MemoryWatchdog(memory_settings))
+
+    stop = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stop.set())
+    if worker.run(stop, max_idle_seconds=args.max_idle) is not None:
+        # Replace this process with a fresh one; unclaimed tasks simply wait in the queue
+        sys.stdout.flush()
+        os.execv(sys.executable, [sys.executable] + sys.argv)
+
+
+if __name__ == '__main__':
+    main()
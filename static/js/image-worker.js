@@ -0,0 +1,50 @@
+/**
+ * Handwriting Recognition - Image Preparation Worker
+ * Decodes, downscales, converts to grayscale and re-encodes an image off the
+ * main thread so large phone photos are shrunk before upload.
+ *
+ * Message in:  { file, maxDimension, grayscale, type, quality }
+ * Message out: { blob, width, height, originalWidth, originalHeight }
+ *              or { error }
+ */
+
+self.onmessage = async (e) => {
+    const { file, maxDimension, grayscale, type, quality } = e.data;
+
+    try {
+        const bitmap = await createImageBitmap(file);
+        const originalWidth = bitmap.width;
+        const originalHeight = bitmap.height;
+
+        // Keep the aspect ratio; never upscale
+        const scale = Math.min(1, maxDimension / Math.max(originalWidth, originalHeight));
+        const width = Math.max(1, Math.round(originalWidth * scale));
+        const height = Math.max(1, Math.round(originalHeight * scale));
+
+        const canvas = new OffscreenCanvas(width, height);
+        const ctx = canvas.getContext('2d');
+        ctx.imageSmoothingQuality = 'high';
+        // JPEG has no alpha: transparent pixels would turn black and hide dark ink,
+        // so flatten onto white paper first
+        ctx.fillStyle = '#fff';
+        ctx.fillRect(0, 0, width, height);
+        ctx.drawImage(bitmap, 0, 0, width, height);
+        bitmap.close();
+
+        if (grayscale) {
+            // ITU-R BT.601 luma, same weights as OpenCV's BGR2GRAY
+            const image = ctx.getImageData(0, 0, width, height);
+            const px = image.data;
+            for (let i = 0; i < px.length; i += 4) {
+                const y = 0.299 * px[i] + 0.587 * px[i + 1] + 0.114 * px[i + 2];
+                px[i] = px[i + 1] = px[i + 2] = y;
+            }
+            ctx.putImageData(image, 0, 0);
+        }
+
+        const blob = await canvas.convertToBlob({ type, quality });
+        self.postMessage({ blob, width, height, originalWidth, originalHeight });
+    } catch (error) {
+        self.postMessage({ error: error.message || String(error) });
+    }
+};
@@ -8,6 +8,22 @@
 // ============================================
 let selectedFile = null;
 
+// Client-side image limits, replaced by /upload_limits on page load
+let uploadLimits = {
+    max_file_bytes: 16 * 1024 * 1024,
+    max_dimension: 2560,
+    grayscale: true,
+    format: 'image/jpeg',
+    quality: 0.9
+};
+
+// Resizing/re-encoding runs in a Web Worker when the browser supports it
+const canPrepareImages = typeof Worker !== 'undefined' &&
+    typeof OffscreenCanvas !== 'undefined' && typeof createImageBitmap !== 'undefined';
+let imageWorker = null;
+// Requests waiting on the worker; it answers them in the order they were posted
+let imageWorkerQueue = [];
+
 // DOM Elements
 const fileInput = document.getElementById('file-input');
 const uploadArea = document.getElementById('upload-area');
@@ -25,6 +41,7 @@ const copyBtn = document.getElementById('copy-btn');
 const downloadBtn = document.getElementById('download-btn');
 const uploadAnotherBtn = document.getElementById('upload-another');
 const cacheBadge = document.getElementById('cache-badge');
+const uploadStats = document.getElementById('upload-stats');
 
 // File info elements
 const fileNameSpan = document.getElementById('file-name');
@@ -81,6 +98,88 @@ function resetForm() {
     showSection(uploadSection);
 }
 
+/**
+ * Start the image worker on first use.
+ * If it fails to load or crashes, every waiting request is rejected and the
+ * next upload starts a fresh worker.
+ */
+function getImageWorker() {
+    if (imageWorker) {
+        return imageWorker;
+    }
+    imageWorker = new Worker('/static/js/image-worker.js');
+    imageWorker.onmessage = (e) => {
+        const pending = imageWorkerQueue.shift();
+        if (pending) pending.resolve(e.data);
+    };
+    const fail = (e) => {
+        const pending = imageWorkerQueue;
+        imageWorkerQueue = [];
+        imageWorker.terminate();
+        imageWorker = null;
+        const error = new Error(e.message || 'image worker failed');
+        pending.forEach(request => request.reject(error));
+    };
+    imageWorker.onerror = fail;
+    imageWorker.onmessageerror = fail;
+    return imageWorker;
+}
+
+/**
+ * Downscale, grayscale and re-encode an image in the worker.
+ * Resolves to { blob, name, width, height, originalWidth, originalHeight };
+ * falls back to the original file if preparation fails or does not help.
+ */
+function prepareImage(file) {
+    const original = { blob: file, name: file.name || 'image.png', prepared: false };
+    if (!canPrepareImages) {
+        return Promise.resolve(original);
+    }
+    
+    return new Promise((resolve, reject) => {
+        const worker = getImageWorker();
+        imageWorkerQueue.push({ resolve, reject });
+        worker.postMessage({
+            file: file,
+            maxDimension: uploadLimits.max_dimension,
+            grayscale: uploadLimits.grayscale,
+            type: uploadLimits.format,
+            quality: uploadLimits.quality
+        });
+    }).then((result) => {
+        if (result.error) {
+            throw new Error(result.error);
+        }
+        if (result.blob.size >= file.size) {
+            return original;
+        }
+        const baseName = (file.name || 'image').replace(/\.[^.]+$/, '');
+        return { ...result, name: `${baseName}.jpg`, prepared: true };
+    }).catch((error) => {
+        console.warn('Image preparation failed:', error.message);
+        return original;
+    });
+}
+
+/**
+ * Show upload size and timing for the last recognition
+ */
+function showUploadStats(originalSize, upload, elapsedMs, timings) {
+    let text = `Uploaded ${formatFileSize(upload.blob.size)}`;
+    if (upload.prepared) {
+        const saved = Math.round((1 - upload.blob.size / originalSize) * 100);
+        text += ` (was ${formatFileSize(originalSize)}, ${saved}% smaller, ` +
+                `${upload.width} × ${upload.height} px)`;
+    }
+    text += ` · ${(elapsedMs / 1000).toFixed(2)} s end-to-end`;
+    
+    const serverStage = (timings || []).find(t => t.stage === 'request');
+    if (serverStage) {
+        text += ` · ${(serverStage.ms / 1000).toFixed(2)} s on server`;
+    }
+    uploadStats.textContent = text;
+}
+
 // ============================================
 // File Upload Handling
 // ============================================
@@ -98,10 +197,10 @@ function handleFileSelect(file) {
         return;
     }
     
-    // Validate file size (16MB max)
-    const maxSize = 16 * 1024 * 1024; // 16MB
-    if (file.size > maxSize) {
-        showToast('File size must be less than 16MB', 'error');
+    // Validate file size; larger originals are fine when they are shrunk before upload
+    const maxSize = uploadLimits.max_file_bytes;
+    if (!canPrepareImages && file.size > maxSize) {
+        showToast(`File size must be less than ${formatFileSize(maxSize)}`, 'error');
         return;
     }
     
@@ -266,12 +365,21 @@ uploadForm.addEventListener('submit', async (e) => {
     
     // Show loading section
     showSection(loadingSection);
-    
-    // Prepare form data
-    const formData = new FormData();
-    formData.append('file', selectedFile);
+    const startTime = performance.now();
     
     try {
+        // Shrink the image in the browser, then prepare form data
+        const upload = await prepareImage(selectedFile);
+        if (upload.blob.size > uploadLimits.max_file_bytes) {
+            showToast(`File size must be less than ${formatFileSize(uploadLimits.max_file_bytes)}`, 'error');
+            showSection(uploadSection);
+            return;
+        }
+        
+        const formData = new FormData();
+        formData.append('file', upload.blob, upload.name);
+        formData.append('timings', '1');
+        
         // Send request to server
         const response = await fetch('/predict', {
             method: 'POST',
@@ -283,6 +391,7 @@ uploadForm.addEventListener('submit', async (e) => {
         if (data.success) {
             // Show result
             recognizedText.value = data.recognized_text;
+            showUploadStats(selectedFile.size, upload, performance.now() - startTime, data.timings);
             
             // Show cache badge if result was from cache
             if (data.cache_hit) {
@@ -381,6 +490,18 @@ window.addEventListener('load', () => {
     console.log('🎨 Handwriting Recognition App Loaded');
     console.log('✨ UI ready for image upload');
     
+    // Client-side resize/re-encode settings advertised by the server
+    fetch('/upload_limits')
+        .then(response => response.json())
+        .then(data => {
+            if (data.success) {
+                uploadLimits = data;
+            }
+        })
+        .catch(error => {
+            console.warn('⚠️ Using default upload limits:', error);
+        });
+    
     // Check if app is online
     fetch('/health')
         .then(response => response.json())
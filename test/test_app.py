@@ -1,16 +1,23 @@
 import unittest
+import io
 import os
 import sys
-import os
+import shutil
+import tempfile
+import cv2
+import numpy as np
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from handwriting_app.app import app
-from handwriting_app.model.mains.easyocr_predictor import create_predictor
+import app as app_module
+from app import app
+from model.mains.easyocr_predictor import create_predictor
+from model.mains.queue_worker import QueueWorker
+from model.utils.task_queue import create_task_queue
+from model.utils.batch_codec import encode_batch, decode_results, RESULTS_CONTENT_TYPE
 
 class TestHandwritingApp(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
-        global predictor
-        predictor = create_predictor()
+        app_module.predictor = create_predictor()
         
     def setUp(self):
         self.app = app.test_client()
@@ -21,6 +28,15 @@ class TestHandwritingApp(unittest.TestCase):
         response = self.app.get('/')
         self.assertEqual(response.status_code, 200)
         
+    def test_upload_limits(self):
+        """Upload limits advertise the client-side resize settings"""
+        response = self.app.get('/upload_limits')
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual(data['max_file_bytes'], app.config['MAX_CONTENT_LENGTH'])
+        self.assertGreater(data['max_dimension'], 0)
+        self.assertIn('jpg', data['allowed_extensions'])
+        
     def test_upload_endpoint(self):
         """Test if prediction endpoint works"""
         test_image_path = os.path.join(os.path.dirname(__file__), 'inigo_montoya1.png')
@@ -32,6 +48,181 @@ class TestHandwritingApp(unittest.TestCase):
                                    data={'file': (img, 'test.jpg')},
                                    content_type='multipart/form-data')
         self.assertEqual(response.status_code, 200)
+        self.assertIn('qos_tier', response.get_json())
+        
+    def test_invalid_qos_tier(self):
+        """Unknown service tiers are rejected before any work is done"""
+        test_image_path = os.path.join(os.path.dirname(__file__), 'inigo_montoya1.png')
+        with open(test_image_path, 'rb') as img:
+            response = self.app.post('/predict',
+                                   data={'file': (img, 'test.jpg'), 'tier': 'platinum'},
+                                   content_type='multipart/form-data')
+        self.assertEqual(response.status_code, 400)
+        
+    def test_stream_frame_session(self):
+        """Streaming frames over HTTP keeps a session across calls"""
+        test_image_path = os.path.join(os.path.dirname(__file__), 'inigo_montoya1.png')
+        with open(test_image_path, 'rb') as img:
+            frame = img.read()
+        first = self.app.post('/stream/frame', data={'file': (io.BytesIO(frame), 'frame.png')},
+                              content_type='multipart/form-data').get_json()
+        self.assertTrue(first['success'])
+        self.assertTrue(first['full_frame'])
+        
+        second = self.app.post('/stream/frame',
+                               data={'file': (io.BytesIO(frame), 'frame.png'), 'session': first['session']},
+                               content_type='multipart/form-data').get_json()
+        self.assertEqual(second['session'], first['session'])
+        self.assertEqual(second['recognized'], 0)
+        
+        missing = self.app.post('/stream/frame',
+                                data={'file': (io.BytesIO(frame), 'frame.png'), 'session': 'nope'},
+                                content_type='multipart/form-data')
+        self.assertEqual(missing.status_code, 404)
+        
+    def test_queue_mode(self):
+        """In queue mode /predict returns 202 until a worker publishes the result"""
+        tmp = tempfile.mkdtemp()
+        queue = create_task_queue('sqlite://' + os.path.join(tmp, 'queue.db'))
+        app_module.task_queue = queue
+        app_module.prediction_cache.clear()
+        try:
+            test_image_path = os.path.join(os.path.dirname(__file__), 'inigo_montoya1.png')
+            with open(test_image_path, 'rb') as img:
+                response = self.app.post('/predict', data={'file': (img, 'test.png'), 'async': '1'},
+                                         content_type='multipart/form-data')
+            self.assertEqual(response.status_code, 202)
+            task_id = response.get_json()['task_id']
+            self.assertEqual(self.app.get(f'/result/{task_id}').status_code, 202)
+            
+            worker = QueueWorker(queue, {'easyocr': lambda: app_module.predictor})
+            self.assertEqual(worker.run_once(), 1)
+            result = self.app.get(f'/result/{task_id}')
+            self.assertEqual(result.status_code, 200)
+            self.assertIn('recognized_text', result.get_json())
+            self.assertEqual(self.app.get('/result/easyocr:unknown').status_code, 404)
+        finally:
+            app_module.task_queue = None
+            shutil.rmtree(tmp, ignore_errors=True)
+        
+    def test_queued_error_text_is_not_cached(self):
+        """Error text stored as a queue result is answered with 500 and never cached"""
+        app_module.prediction_cache.clear()
+        stored = {'error': None, 'worker': 'w1', 'result': {'recognized_text': 'Error during recognition: boom'}}
+        with app.test_request_context():
+            response, status = app_module.queued_response('easyocr:x', stored, file_hash='x')
+        self.assertEqual(status, 500)
+        self.assertFalse(response.get_json()['success'])
+        self.assertNotIn('x', app_module.prediction_cache)
+        
+    def test_health_reports_draining(self):
+        """A supervised worker due for recycling fails its health check"""
+        self.assertEqual(self.app.get('/health').status_code, 200)
+        app_module.watchdog.recycle_reason = 'test'
+        app_module.watchdog.on_recycle = lambda reason: None
+        try:
+            response = self.app.get('/health')
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response.get_json()['status'], 'draining')
+            self.assertIn('rss_mb', response.get_json()['memory'])
+        finally:
+            app_module.watchdog.recycle_reason = None
+            app_module.watchdog.on_recycle = None
+            app_module.watchdog._recycled = False
+    
+    def test_health_fails_when_inference_process_died(self):
+        """A dead inference process makes the worker unhealthy"""
+        class DeadProcess:
+            healthy = False
+            region_cache = None
+        
+        previous = app_module.predictor
+        app_module.predictor = DeadProcess()
+        try:
+            response = self.app.get('/health')
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response.get_json()['status'], 'unhealthy')
+        finally:
+            app_module.predictor = previous
+        
+    def test_unsupervised_recycle_only_in_metrics(self):
+        """Without a process manager a due recycle shows in /metrics, not in /health"""
+        app_module.watchdog.recycle_reason = 'test'
+        try:
+            response = self.app.get('/health')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.get_json()['status'], 'healthy')
+            if app_module.METRICS.enabled:
+                self.assertIn('htr_worker_recycle_due 1', self.app.get('/metrics').get_data(as_text=True))
+        finally:
+            app_module.watchdog.recycle_reason = None
+        
+    def test_predict_batch(self):
+        """Batch results come back in order, with per-image errors and bulk cache hits"""
+        test_image_path = os.path.join(os.path.dirname(__file__), 'inigo_montoya1.png')
+        with open(test_image_path, 'rb') as img:
+            image = img.read()
+        body = encode_batch([image, b'not an image', image])
+        app_module.prediction_cache.clear()
+        
+        response = self.app.post('/predict_batch', data=body, content_type='application/x-htr-batch')
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual(data['count'], 3)
+        self.assertEqual(data['failed'], 1)
+        self.assertTrue(data['results'][0]['success'])
+        self.assertFalse(data['results'][1]['success'])
+        self.assertEqual(data['results'][0]['recognized_text'], data['results'][2]['recognized_text'])
+        
+        # Second call is served from the cache, as a binary frame
+        response = self.app.post('/predict_batch', data=body, content_type='application/x-htr-batch',
+                                 headers={'Accept': RESULTS_CONTENT_TYPE})
+        results = decode_results(response.data)
+        self.assertEqual([success for success, _, _ in results], [True, False, True])
+        self.assertTrue(results[0][2])
+        
+        response = self.app.post('/predict_batch', data=b'HTRB\x05', content_type='application/x-htr-batch')
+        self.assertEqual(response.status_code, 400)
+        app_module.prediction_cache.clear()
+    
+    def test_predict_batch_error_text(self):
+        """Error messages returned as text are per-image errors and are not cached"""
+        class ErrorTextPredictor:
+            BATCHED_INFERENCE = True
+            
+            def predict_batch(self, images):
+                return ['Error during prediction: bad line'] + ['ok'] * (len(images) - 1)
+        
+        ok, first = cv2.imencode('.png', np.full((8, 8), 255, dtype=np.uint8))
+        ok, second = cv2.imencode('.png', np.zeros((8, 8), dtype=np.uint8))
+        previous = app_module.predictor
+        app_module.predictor = ErrorTextPredictor()
+        app_module.prediction_cache.clear()
+        try:
+            response = self.app.post('/predict_batch', data=encode_batch([first.tobytes(), second.tobytes()]),
+                                     content_type='application/x-htr-batch')
+            data = response.get_json()
+            self.assertEqual(data['failed'], 1)
+            self.assertEqual(data['results'][0]['error'], 'Error during prediction: bad line')
+            self.assertEqual(data['results'][1]['recognized_text'], 'ok')
+            self.assertEqual(len(app_module.prediction_cache), 1)
+        finally:
+            app_module.predictor = previous
+            app_module.prediction_cache.clear()
+        
+    def test_register_template_requires_admin(self):
+        """Registering form templates needs the admin token"""
+        response = self.app.post('/templates', data={'name': 'invoice'})
+        self.assertEqual(response.status_code, 403)
+        previous = app.config['ADMIN_TOKEN']
+        app.config['ADMIN_TOKEN'] = 'secret'
+        try:
+            response = self.app.post('/templates', data={'name': 'invoice'}, headers={'X-Admin-Token': 'wrong'})
+            self.assertEqual(response.status_code, 403)
+            response = self.app.post('/templates', data={'name': 'invoice'}, headers={'X-Admin-Token': 'secret'})
+            self.assertEqual(response.status_code, 400)
+        finally:
+            app.config['ADMIN_TOKEN'] = previous
         
     def test_predictor_initialization(self):
         """Test if predictor can be initialized"""
@@ -0,0 +1,36 @@
+import unittest
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model.utils.batch_codec import (encode_batch, decode_batch, encode_results, decode_results,
+                                     BatchFormatError)
+
+
+class TestBatchCodec(unittest.TestCase):
+    def test_round_trip(self):
+        images = [b'\x89PNG first', b'', b'third' * 100]
+        body = encode_batch(images)
+        self.assertEqual(len(body), 8 + sum(4 + len(data) for data in images))
+        self.assertEqual([bytes(view) for view in decode_batch(body)], images)
+
+    def test_malformed_frames(self):
+        body = encode_batch([b'abc', b'defg'])
+        for bad in (b'', b'XXXX' + body[4:], body[:-1], body + b'!'):
+            with self.assertRaises(BatchFormatError):
+                decode_batch(bad)
+        with self.assertRaises(BatchFormatError):
+            decode_batch(body, max_items=1)
+
+    def test_results_round_trip(self):
+        results = [
+            {'success': True, 'recognized_text': 'héllo', 'cache_hit': True},
+            {'success': False, 'error': 'Could not decode image'},
+            {'success': True, 'recognized_text': '', 'cache_hit': False},
+        ]
+        self.assertEqual(decode_results(encode_results(results)),
+                         [(True, 'héllo', True), (False, 'Could not decode image', False), (True, '', False)])
+
+
+if __name__ == '__main__':
+    unittest.main()
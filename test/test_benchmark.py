@@ -0,0 +1,75 @@
+import unittest
+import os
+import sys
+import time
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+import numpy as np
+
+from model.utils.benchmark import (character_error_rate, percentile, generate_synthetic_samples,
+                                   run_single, compare_reports, RSSSampler, current_rss_mb, peak_rss_mb)
+
+
+class EchoPredictor:
+    """Predictor stand-in that returns a fixed text"""
+    def __init__(self, text):
+        self.text = text
+        
+    def predict(self, image_path):
+        return self.text
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_character_error_rate(self):
+        """CER is edit distance over reference length with whitespace collapsed"""
+        self.assertEqual(character_error_rate("hello world", "hello  world"), 0.0)
+        self.assertAlmostEqual(character_error_rate("abcd", "abxd"), 0.25)
+        self.assertEqual(character_error_rate("abc", ""), 1.0)
+        
+    def test_percentile(self):
+        """Percentiles interpolate and handle empty input"""
+        self.assertEqual(percentile([], 50), 0.0)
+        self.assertEqual(percentile([1, 2, 3, 4, 5], 50), 3.0)
+        
+    def test_synthetic_samples(self):
+        """Samples are written to disk with ground truth and requested size"""
+        with tempfile.TemporaryDirectory() as out_dir:
+            samples = generate_synthetic_samples(out_dir, ['word', 'line'], 2, seed=1)
+            self.assertEqual(len(samples), 4)
+            img = cv2.imread(samples[2]['path'], cv2.IMREAD_GRAYSCALE)
+            self.assertEqual(img.shape, (96, 1024))
+            self.assertTrue(samples[0]['text'])
+            
+            summary = run_single(EchoPredictor(samples[0]['text']), samples[:1])
+            self.assertEqual(summary['images'], 1)
+            self.assertEqual(summary['cer'], 0.0)
+            self.assertGreater(summary['peak_rss_mb'], 0)
+        
+    def test_rss_sampler_measures_the_run(self):
+        """Peak and growth cover only what happens inside the sampled run"""
+        if current_rss_mb() == peak_rss_mb():
+            self.skipTest("Current RSS not available on this platform")
+        with RSSSampler(interval=0.005) as memory:
+            block = np.ones(64 * 1024 * 1024, dtype=np.uint8)
+            time.sleep(0.05)
+            del block
+        self.assertGreater(memory.growth_mb, 32)
+        
+        with RSSSampler(interval=0.005) as quiet:
+            time.sleep(0.02)
+        self.assertLess(quiet.growth_mb, 16)
+        self.assertLess(quiet.peak_mb, memory.peak_mb)
+        
+    def test_compare_reports(self):
+        """Slower p95, lower throughput and worse CER are flagged"""
+        def result(p95, tput, cer):
+            return {'backend': 'easyocr', 'mode': 'single', 'size': 'line',
+                    'latency_ms': {'p95': p95}, 'images_per_sec': tput, 'cer': cer}
+        baseline = {'results': [result(100.0, 10.0, 0.10)]}
+        self.assertEqual(compare_reports({'results': [result(105.0, 9.5, 0.11)]}, baseline), [])
+        self.assertEqual(len(compare_reports({'results': [result(150.0, 5.0, 0.30)]}, baseline)), 3)
+
+if __name__ == '__main__':
+    unittest.main()
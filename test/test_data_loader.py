@@ -0,0 +1,77 @@
+import unittest
+import os
+import sys
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+import numpy as np
+
+from model.data_loader.shards import read_label_file, write_shards, ShardReader
+from model.data_loader.loader import ShardLoader, evaluate_predictor
+
+
+class WidthPredictor:
+    """Predictor stand-in that 'reads' the image width"""
+    def predict_batch(self, images):
+        return [str(image.shape[1]) for image in images]
+
+
+class TestShards(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        lines = ['# image text', '']
+        for i in range(10):
+            width = 20 + i * 10
+            cv2.imwrite(os.path.join(root, f'{i}.png'), np.full((16, width), i * 20, np.uint8))
+            lines.append(f'{i}.png {width}')
+        lines.append('missing.png 0')
+        self.label_path = os.path.join(root, 'labels.txt')
+        with open(self.label_path, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        self.out_dir = os.path.join(root, 'packed')
+        self.manifest = write_shards(read_label_file(self.label_path), self.out_dir, shard_size=4)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_pack_and_read(self):
+        """Packing is lossless and readable across shard boundaries"""
+        self.assertEqual(self.manifest['samples'], 10)
+        self.assertEqual(self.manifest['skipped'], 1)
+        self.assertEqual(len(self.manifest['shards']), 3)
+
+        reader = ShardReader(self.out_dir)
+        self.assertEqual(len(reader), 10)
+        image, label = reader[5]
+        self.assertEqual(image.shape, (16, 70))
+        self.assertEqual(int(image[0, 0]), 100)
+        self.assertEqual(label, '70')
+        self.assertEqual(reader.sizes()[9].tolist(), [16, 110])
+
+    def test_loader_covers_epoch_once(self):
+        """Shuffled, prefetched batches cover every sample exactly once"""
+        loader = ShardLoader(self.out_dir, batch_size=3, seed=0, workers=2)
+        batches = list(loader)
+        self.assertEqual(len(batches), len(loader))
+        self.assertEqual(sorted(int(i) for b in batches for i in b.indices), list(range(10)))
+        for batch in batches:
+            self.assertEqual([str(img.shape[1]) for img in batch.images], batch.labels)
+
+    def test_group_by_width(self):
+        loader = ShardLoader(self.out_dir, batch_size=5, shuffle=False, group_by_width=True, drop_last=True)
+        widths = [[img.shape[1] for img in b.images] for b in loader]
+        self.assertEqual(widths, [[20, 30, 40, 50, 60], [70, 80, 90, 100, 110]])
+
+    def test_early_stop_and_evaluate(self):
+        loader = ShardLoader(self.out_dir, batch_size=2, prefetch=1)
+        for _ in loader:
+            break
+        report = evaluate_predictor(WidthPredictor(), loader, max_batches=3)
+        self.assertEqual(report['images'], 6)
+        self.assertEqual(report['cer'], 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
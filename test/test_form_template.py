@@ -0,0 +1,70 @@
+import unittest
+import os
+import sys
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+import numpy as np
+
+from model.utils.form_template import FormTemplate, TemplateRegistry
+
+
+def make_form():
+    """Render a synthetic printed form with plenty of alignment features"""
+    img = np.full((600, 800), 255, dtype=np.uint8)
+    rng = np.random.RandomState(0)
+    labels = ["Name:", "Date:", "Address:", "Signature:", "Amount:", "Ref No:"]
+    for i, label in enumerate(labels):
+        y = 80 + i * 85
+        cv2.putText(img, label, (40, y), cv2.FONT_HERSHEY_SIMPLEX, 1.0, 0, 2)
+        cv2.rectangle(img, (260, y - 40), (760, y + 15), 0, 2)
+    for _ in range(40):
+        x, y = rng.randint(0, 780), rng.randint(0, 580)
+        cv2.circle(img, (int(x), int(y)), 4, 0, -1)
+    return img
+
+
+class TestFormTemplate(unittest.TestCase):
+    def setUp(self):
+        self.reference = make_form()
+        self.fields = {'name': [262, 42, 496, 53], 'date': [262, 127, 496, 53]}
+        
+    def test_align_recovers_layout(self):
+        """A rotated/shifted scan should be warped back onto the reference"""
+        template = FormTemplate('invoice', self.reference, self.fields)
+        matrix = cv2.getRotationMatrix2D((400, 300), 4, 0.95)
+        matrix[:, 2] += (15, -10)
+        scan = cv2.warpAffine(self.reference, matrix, (800, 600), borderValue=255)
+        
+        aligned = template.align(scan)
+        self.assertEqual(aligned.shape, self.reference.shape)
+        diff = np.mean(np.abs(aligned.astype(np.float32) - self.reference.astype(np.float32)))
+        self.assertLess(diff, 20.0)
+        
+    def test_align_rejects_blank_page(self):
+        """Pages without matching features raise ValueError"""
+        template = FormTemplate('invoice', self.reference, self.fields)
+        with self.assertRaises(ValueError):
+            template.align(np.full((600, 800), 255, dtype=np.uint8))
+        
+    def test_field_boxes(self):
+        """Field boxes use EasyOCR's [x_min, x_max, y_min, y_max] order"""
+        template = FormTemplate('invoice', self.reference, self.fields)
+        self.assertEqual(dict(template.field_boxes())['name'], [262, 758, 42, 95])
+        
+    def test_registry_round_trip(self):
+        """Registered templates are persisted and listed"""
+        with tempfile.TemporaryDirectory() as root:
+            registry = TemplateRegistry(root)
+            registry.register('invoice', self.reference, self.fields)
+            self.assertEqual(registry.list(), {'invoice': ['name', 'date']})
+            
+            reloaded = TemplateRegistry(root).get('invoice')
+            self.assertEqual(reloaded.fields, self.fields)
+            self.assertIsNone(registry.get('missing'))
+            with self.assertRaises(ValueError):
+                registry.register('../bad', self.reference, self.fields)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import unittest
+import os
+import sys
+import time
+import threading
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+import numpy as np
+
+from model.mains.synthetic_predictor import SyntheticPredictor, record_profile
+from model.utils.load_generator import run_closed_loop, run_open_loop, summarize_load, FlaskSender
+from model.utils.metrics import MetricsRegistry
+
+
+PROFILE = {
+    'cpu_fraction': 0.5,
+    'stages': {
+        'detection': {'calls_per_request': 1.0, 'bounds': [0.001, 0.002, None], 'counts': [0, 1, 0]},
+        'recognition': {'calls_per_request': 2.5, 'bounds': [0.001, 0.002, None], 'counts': [1, 1, 0]},
+    },
+}
+
+
+class TestSyntheticPredictor(unittest.TestCase):
+    def test_replays_profile(self):
+        """Stage latencies come from the recorded buckets; cheaper tiers run fewer calls"""
+        predictor = SyntheticPredictor(PROFILE, seed=0)
+        plans = [predictor.sample_plan() for _ in range(200)]
+        recognition_calls = [sum(1 for name, _ in plan if name == 'recognition') for plan in plans]
+        self.assertTrue(set(recognition_calls) <= {2, 3})
+        self.assertAlmostEqual(np.mean(recognition_calls), 2.5, delta=0.15)
+        for plan in plans:
+            for name, seconds in plan:
+                self.assertLessEqual(seconds, 0.002)
+                if name == 'detection':
+                    self.assertGreaterEqual(seconds, 0.001)
+
+        reduced = [len(predictor.sample_plan(work_scale=0.5)) for _ in range(200)]
+        self.assertLess(np.mean(reduced), np.mean([len(plan) for plan in plans]))
+
+        text, stages = predictor.predict(None, return_debug=True)
+        self.assertEqual(text, "Synthetic prediction")
+        self.assertEqual(stages[0]['stage'], 'detection')
+
+    def test_record_round_trip(self):
+        """A profile recorded from a predictor replays its stage mix"""
+        registry = MetricsRegistry()
+
+        class FakePredictor:
+            def predict(self, image):
+                with registry.stage('detection'):
+                    time.sleep(0.002)
+                for _ in range(2):
+                    with registry.stage('recognition', strategy='original'):
+                        pass
+
+        profile = record_profile(FakePredictor(), ['a', 'b', 'c'], backend='fake', registry=registry)
+        self.assertEqual(profile['requests'], 3)
+        self.assertEqual(profile['stages']['recognition']['calls_per_request'], 2.0)
+        self.assertEqual(sum(profile['stages']['detection']['counts']), 3)
+        self.assertIsNone(profile['stages']['detection']['bounds'][-1])
+
+        replayed = SyntheticPredictor(profile, seed=1).sample_plan()
+        self.assertEqual([name for name, _ in replayed], ['detection', 'recognition', 'recognition'])
+
+
+class TestLoadGenerator(unittest.TestCase):
+    def setUp(self):
+        ok, encoded = cv2.imencode('.png', np.full((32, 64), 255, dtype=np.uint8))
+        self.images = [('line.png', encoded.tobytes())]
+
+    def test_closed_loop_through_app(self):
+        """Closed loop against the in-process app; unique bytes bypass the prediction cache"""
+        import app as app_module
+        previous = app_module.predictor
+        app_module.predictor = SyntheticPredictor(PROFILE, time_scale=0.5, seed=0)
+        app_module.prediction_cache.clear()
+        try:
+            report = run_closed_loop(FlaskSender(app_module.app), self.images, concurrency=3, requests=9)
+        finally:
+            app_module.predictor = previous
+            app_module.prediction_cache.clear()
+        self.assertEqual(report['sent'], 9)
+        self.assertEqual(report['completed'], 9)
+        self.assertEqual(report['error_rate'], 0.0)
+        self.assertEqual(sum(report['qos_tiers'].values()), 9)
+        self.assertGreater(report['latency_ms']['p99'], 0.0)
+
+    def test_open_loop_counts_shed_and_errors(self):
+        """Open-loop arrivals keep coming; 503s count as shed, other failures as errors"""
+        lock = threading.Lock()
+        calls = []
+
+        def send(data, filename):
+            with lock:
+                calls.append(data)
+                n = len(calls)
+            if n % 4 == 0:
+                return 503, {'success': False, 'qos_tier': 'cache_only'}
+            if n % 5 == 0:
+                raise ConnectionError("reset")
+            return 200, {'success': True, 'qos_tier': 'full'}
+
+        report = run_open_loop(send, self.images, rate=400.0, duration=0.25, max_clients=8)
+        self.assertEqual(report['mode'], 'open')
+        self.assertEqual(report['finished'], report['sent'])
+        self.assertGreater(report['sent'], 20)
+        self.assertGreater(report['shed_rate'], 0.0)
+        self.assertGreater(report['error_rate'], 0.0)
+        self.assertEqual(len(set(calls)), len(calls))
+
+    def test_summarize_empty(self):
+        summary = summarize_load([], 0.0, 0)
+        self.assertEqual(summary['throughput_rps'], 0.0)
+        self.assertEqual(summary['latency_ms']['p95'], 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model.utils.memory_watchdog import MemoryWatchdog, BoundedCache, rss_bytes
+from model.utils.metrics import MetricsRegistry
+
+
+class TestBoundedCache(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        cache = BoundedCache(max_entries=2)
+        cache['a'] = 1
+        cache['b'] = 2
+        self.assertEqual(cache['a'], 1)  # 'a' is now the most recent
+        cache['c'] = 3
+        self.assertNotIn('b', cache)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(len(cache), 2)
+        cache.clear()
+        self.assertIsNone(cache.get('a'))
+
+
+class TestMemoryWatchdog(unittest.TestCase):
+    def test_recycle_after_request_budget_when_idle(self):
+        """Workers drain at the request budget and recycle only once idle"""
+        reasons = []
+        watchdog = MemoryWatchdog({'max_requests': 3, 'trim_every': 0}, on_recycle=reasons.append)
+        self.assertIsNone(watchdog.record_request(2))
+        self.assertFalse(watchdog.draining)
+        self.assertIsNotNone(watchdog.record_request())
+        self.assertTrue(watchdog.draining)
+
+        self.assertFalse(watchdog.maybe_recycle(in_flight=1))
+        watchdog.request_started()
+        self.assertFalse(watchdog.maybe_recycle())
+        watchdog.request_finished()
+        self.assertTrue(watchdog.maybe_recycle())
+        self.assertFalse(watchdog.maybe_recycle(in_flight=0))
+        self.assertEqual(len(reasons), 1)
+
+    def test_rss_ceiling(self):
+        """Staying above the memory ceiling after trimming starts draining"""
+        if rss_bytes() == 0:
+            self.skipTest("RSS not available on this platform")
+        watchdog = MemoryWatchdog({'rss_ceiling_mb': 1, 'trim_every': 0})
+        self.assertIn('rss', watchdog.record_request())
+        self.assertGreaterEqual(watchdog.trims, 1)
+        self.assertTrue(watchdog.stats()['recycle_due'])
+        # Nothing would replace it, so it keeps serving
+        self.assertFalse(watchdog.stats()['draining'])
+
+    def test_disabled(self):
+        watchdog = MemoryWatchdog({'enabled': False, 'max_requests': 1})
+        self.assertIsNone(watchdog.record_request(5))
+        self.assertFalse(watchdog.maybe_recycle(0))
+
+    def test_stage_rss_probe(self):
+        """Stage RSS growth is attributed to the stage that allocated"""
+        registry = MetricsRegistry()
+        MemoryWatchdog({'stage_rss': True}).install_stage_probe(registry)
+        with registry.stage('allocate'):
+            block = bytearray(64 * 1024 * 1024)
+            block[::4096] = b'x' * len(block[::4096])
+        self.assertIn('htr_stage_rss_growth_bytes_total{stage="allocate"}', registry.render())
+        del block
+
+
+if __name__ == '__main__':
+    unittest.main()
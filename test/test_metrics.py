@@ -0,0 +1,60 @@
+import unittest
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model.utils.metrics import MetricsRegistry
+
+
+class TestMetrics(unittest.TestCase):
+    def test_stage_histogram_and_breakdown(self):
+        """Stages are recorded in the histogram and the request breakdown"""
+        metrics = MetricsRegistry(enabled=True)
+        metrics.start_request()
+        with metrics.stage('detection', strategy='original_mag1.5'):
+            pass
+        timings = metrics.end_request()
+        
+        self.assertEqual(len(timings), 1)
+        self.assertEqual(timings[0]['stage'], 'detection')
+        self.assertEqual(timings[0]['strategy'], 'original_mag1.5')
+        
+        text = metrics.render()
+        self.assertIn('# TYPE htr_stage_seconds histogram', text)
+        self.assertIn('htr_stage_seconds_bucket{stage="detection",strategy="original_mag1.5",le="+Inf"} 1', text)
+        self.assertIn('htr_stage_seconds_count{stage="detection",strategy="original_mag1.5"} 1', text)
+        
+    def test_histogram_buckets_are_cumulative(self):
+        """Bucket counts accumulate across bounds"""
+        metrics = MetricsRegistry(enabled=True)
+        metrics.stage_seconds.observe(0.003, stage='hash')
+        metrics.stage_seconds.observe(0.3, stage='hash')
+        text = metrics.render()
+        self.assertIn('htr_stage_seconds_bucket{stage="hash",le="0.005"} 1', text)
+        self.assertIn('htr_stage_seconds_bucket{stage="hash",le="0.5"} 2', text)
+        
+    def test_counters_and_label_escaping(self):
+        """Counters render with escaped label values"""
+        metrics = MetricsRegistry(enabled=True)
+        metrics.requests_total.inc(endpoint='predict', status='200')
+        metrics.requests_total.inc(endpoint='predict', status='200')
+        metrics.count_cache_lookup('region', True)
+        gauge = metrics.gauge('htr_test', 'Test gauge')
+        gauge.set(3, name='a "quoted" value')
+        text = metrics.render()
+        self.assertIn('htr_requests_total{endpoint="predict",status="200"} 2.0', text)
+        self.assertIn('htr_cache_lookups_total{cache="region",result="hit"} 1.0', text)
+        self.assertIn('htr_test{name="a \\"quoted\\" value"} 3.0', text)
+        
+    def test_disabled_registry_records_nothing(self):
+        """Disabled metrics use a no-op stage and collect no breakdown"""
+        metrics = MetricsRegistry(enabled=False)
+        metrics.start_request()
+        with metrics.stage('detection'):
+            pass
+        metrics.count_cache_lookup('region', False)
+        self.assertEqual(metrics.end_request(), [])
+        self.assertNotIn('htr_stage_seconds_count', metrics.render())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+import os
+import sys
+import json
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import torch
+
+from model.utils import model_store
+from model.utils.model_store import write_manifest, verify_store, MMAP_SUFFIX
+
+
+class TestModelStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = self.tmp.name
+        with open(os.path.join(self.store, 'weights.bin'), 'wb') as f:
+            f.write(b'\x01' * 4096)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_verify_after_write(self):
+        """A freshly written store verifies, including a forced re-hash"""
+        manifest = write_manifest(self.store, 'easyocr', 'test')
+        self.assertIn('weights.bin', manifest['files'])
+        self.assertEqual(verify_store(self.store, backend='easyocr', force=True)['source'], 'test')
+
+    def test_detects_corruption(self):
+        """Changed bytes fail verification even when the size matches"""
+        write_manifest(self.store, 'easyocr', 'test')
+        with open(os.path.join(self.store, 'weights.bin'), 'r+b') as f:
+            f.write(b'\x02')
+        with self.assertRaises(ValueError):
+            verify_store(self.store)
+
+    def test_wrong_backend(self):
+        """A TrOCR store cannot be loaded as EasyOCR"""
+        write_manifest(self.store, 'trocr', 'test')
+        with self.assertRaises(ValueError):
+            verify_store(self.store, backend='easyocr')
+        with self.assertRaises(FileNotFoundError):
+            verify_store(os.path.join(self.store, 'missing'))
+
+    def test_stamp_rewritten_only_on_change(self):
+        """Unchanged stores leave the stamp alone; corrupt stamps and read-only stores are tolerated"""
+        write_manifest(self.store, 'easyocr', 'test')
+        stamp_path = os.path.join(self.store, model_store.VERIFIED_STAMP)
+        os.utime(stamp_path, ns=(0, 0))
+        verify_store(self.store)
+        self.assertEqual(os.stat(stamp_path).st_mtime_ns, 0)
+
+        with open(stamp_path, 'w') as f:
+            f.write('{"weights.bin": [40')
+        self.assertEqual(verify_store(self.store)['source'], 'test')
+        with open(stamp_path, 'r') as f:
+            self.assertIn('weights.bin', json.load(f))
+
+        os.remove(stamp_path)
+        os.chmod(self.store, 0o555)
+        try:
+            self.assertEqual(verify_store(self.store)['source'], 'test')
+        finally:
+            os.chmod(self.store, 0o755)
+
+    def test_mmap_rebind(self):
+        """Checkpoint loads are redirected to the mmap copy and parameters bound to it"""
+        source = torch.nn.Linear(4, 2)
+        path = os.path.join(self.store, 'net.pth')
+        torch.save({'module.' + k: v for k, v in source.state_dict().items()}, path)
+        torch.save({'module.' + k: v for k, v in source.state_dict().items()}, path + MMAP_SUFFIX)
+
+        loaded = []
+        with model_store._mmap_torch_load(loaded):
+            torch.load(path, weights_only=False)
+        self.assertEqual(loaded, [path + MMAP_SUFFIX])
+
+        target = torch.nn.Linear(4, 2)
+        model_store._rebind_to_mmap(target, loaded[0])
+        self.assertTrue(torch.equal(target.weight, source.weight))
+
+
+if __name__ == '__main__':
+    unittest.main()
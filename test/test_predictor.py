@@ -0,0 +1,113 @@
+import unittest
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from model.mains.predictor import HandwritingPredictor
+from model.mains.crnn_runtime import _split_inputs
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           'model', 'configs', 'config.json')
+
+
+class RecordingSession:
+    """Session stand-in emitting time-major logits that spell 'a' per valid step"""
+    def __init__(self, char_list):
+        self.char_list = char_list
+        self.batches = []
+
+    def run(self, output, feed_dict):
+        images, seq_len = feed_dict['input'], feed_dict['seq_len']
+        self.batches.append((images.shape, list(seq_len)))
+        steps = images.shape[2] // 4
+        logits = np.zeros((steps, images.shape[0], len(self.char_list) + 1), dtype=np.float32)
+        logits[:, :, len(self.char_list)] = 1.0  # blank
+        for i, length in enumerate(seq_len):
+            logits[0, i, self.char_list.index('a')] = 2.0
+            # Text in the padding must be ignored
+            logits[length:, i, self.char_list.index('z')] = 2.0
+        return logits
+
+    def close(self):
+        pass
+
+
+class TestWidthBuckets(unittest.TestCase):
+    def setUp(self):
+        self.predictor = HandwritingPredictor(CONFIG_PATH)
+        self.predictor.width_buckets = [64, 128, 256]
+        self.predictor.output_time_major = True
+
+    def test_aspect_preserving_resize(self):
+        """Lines keep their aspect ratio and pad up to the next bucket"""
+        line, width = self.predictor.prepare_line(np.full((64, 200), 255, np.uint8))
+        self.assertEqual(line.shape, (32, 100))
+        self.assertEqual(width, 100)
+        self.assertEqual(self.predictor.bucket_width(width), 128)
+        self.assertEqual(self.predictor.preprocess_image(np.zeros((64, 200), np.uint8)).shape, (1, 32, 128, 1))
+        self.assertEqual(self.predictor.seq_len_for(width), 25)
+
+    def test_wide_lines_capped_at_largest_bucket(self):
+        _, width = self.predictor.prepare_line(np.zeros((32, 2000), np.uint8))
+        self.assertEqual(width, 256)
+
+    def test_fixed_width_without_buckets(self):
+        self.predictor.width_buckets = []
+        self.assertEqual(self.predictor.preprocess_image(np.zeros((64, 200), np.uint8)).shape, (1, 32, 128, 1))
+
+    def test_batch_groups_by_bucket(self):
+        """predict_batch runs one padded batch per bucket with per-sample seq_len"""
+        session = RecordingSession(self.predictor.char_list)
+        self.predictor.session = session
+        self.predictor.input_tensor, self.predictor.seq_len_tensor = 'input', 'seq_len'
+        images = [np.zeros((32, 40), np.uint8), np.zeros((32, 200), np.uint8), np.zeros((32, 60), np.uint8)]
+        texts = self.predictor.predict_batch(images)
+        self.assertEqual(texts, ['a', 'a', 'a'])
+        self.assertEqual(sorted(session.batches), [((1, 32, 256, 1), [50]), ((2, 32, 64, 1), [10, 15])])
+
+    def test_output_layout_comes_from_config(self):
+        """Batch-major output with as many time steps as samples is not transposed"""
+        chars = self.predictor.char_list
+        blank = len(chars)
+        output = np.zeros((2, 2, blank + 1), dtype=np.float32)
+        output[:, :, blank] = 1.0
+        output[0, 0, chars.index('a')] = 2.0
+        output[1, 0, chars.index('b')] = 2.0
+        self.predictor.output_time_major = False
+        self.assertEqual(self.predictor.decode_batch(output, np.array([2, 2])), ['a', 'b'])
+        self.predictor.output_time_major = True
+        self.assertEqual(self.predictor.decode_batch(output, np.array([2, 2])), ['ab', ''])
+        with self.assertRaises(ValueError):
+            self.predictor.decode_batch(np.zeros((3, 4, blank + 1)), np.array([2, 2]))
+
+    def test_runtime_backend(self):
+        """A converted-model runtime is used instead of the Session and decodes the same way"""
+        session = RecordingSession(self.predictor.char_list)
+
+        class FakeRuntime:
+            static_width = None
+
+            def run(self, images, seq_len):
+                return session.run('output', {'input': images, 'seq_len': seq_len})
+
+        self.predictor.runtime = FakeRuntime()
+        self.assertEqual(self.predictor.predict(np.zeros((32, 100), np.uint8)), 'a')
+        self.assertEqual(session.batches, [((1, 32, 128, 1), [25])])
+
+    def test_missing_runtime_models_fall_back(self):
+        """Without converted models or TensorFlow the predictor still starts (mock mode)"""
+        self.predictor.config['tflite_model_path'] = '/nonexistent/crnn.tflite'
+        self.predictor.config['onnx_model_path'] = '/nonexistent/crnn.onnx'
+        self.assertFalse(self.predictor._load_runtime())
+        self.assertIsNone(self.predictor.runtime)
+
+    def test_split_inputs(self):
+        self.assertEqual(_split_inputs(['seq_len:0', 'input:0']), (1, 0))
+        with self.assertRaises(ValueError):
+            _split_inputs(['input:0'])
+
+
+if __name__ == '__main__':
+    unittest.main()
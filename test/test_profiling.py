@@ -0,0 +1,95 @@
+import unittest
+import os
+import sys
+import time
+import tempfile
+import multiprocessing as mp
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model.utils.profiling import RequestProfiler, FCNTL_AVAILABLE
+
+
+def profile_once(profiler, seconds, requested=False):
+    """Profile a request that sleeps for the given time"""
+    session = profiler.start('test', requested=requested)
+    if session is not None:
+        time.sleep(seconds)
+        profiler.finish(session, status=200)
+    return session
+
+
+def profile_in_worker(out_dir, count):
+    """One gunicorn-like worker profiling several requests into a shared directory"""
+    profiler = RequestProfiler(out_dir, sample_rate=1, top_k=100, use_torch=False)
+    for _ in range(count):
+        while profile_once(profiler, 0.001) is None:
+            time.sleep(0.001)
+
+
+class TestRequestProfiler(unittest.TestCase):
+    def test_sampling_rate(self):
+        """Only 1 in N requests are profiled when not requested"""
+        with tempfile.TemporaryDirectory() as out_dir:
+            profiler = RequestProfiler(out_dir, sample_rate=3, use_torch=False)
+            sessions = [profile_once(profiler, 0) for _ in range(6)]
+            self.assertEqual(sum(s is not None for s in sessions), 2)
+            self.assertIsNone(RequestProfiler(out_dir, sample_rate=0).start('test'))
+            
+    def test_keeps_top_k_slowest(self):
+        """Sampled traces beyond top_k keep only the slowest requests"""
+        with tempfile.TemporaryDirectory() as out_dir:
+            profiler = RequestProfiler(out_dir, sample_rate=1, top_k=2, use_torch=False)
+            for seconds in (0.03, 0.0, 0.02, 0.0):
+                profile_once(profiler, seconds)
+            durations = [e['duration_ms'] for e in profiler.list()]
+            self.assertEqual(len(durations), 2)
+            self.assertGreaterEqual(min(durations), 15.0)
+            
+            entry = profiler.list()[0]
+            name = profiler.artifact_name(entry['id'], 'txt')
+            self.assertTrue(os.path.exists(os.path.join(out_dir, name)))
+            self.assertIsNone(profiler.artifact_name(entry['id'], 'unknown'))
+            self.assertEqual(len([f for f in os.listdir(out_dir) if f.endswith('.txt')]), 2)
+            
+    def test_one_profile_at_a_time(self):
+        """A second concurrent request is not profiled"""
+        with tempfile.TemporaryDirectory() as out_dir:
+            profiler = RequestProfiler(out_dir, use_torch=False)
+            first = profiler.start('first', requested=True)
+            self.assertIsNotNone(first)
+            self.assertIsNone(profiler.start('second', requested=True))
+            profiler.finish(first, status=200)
+            self.assertEqual(profiler.list()[0]['reason'], 'on_demand')
+
+    @unittest.skipUnless(FCNTL_AVAILABLE, "file locks need fcntl")
+    def test_one_profile_across_workers(self):
+        """Profilers of different workers sharing a directory never profile at once"""
+        with tempfile.TemporaryDirectory() as out_dir:
+            first_worker = RequestProfiler(out_dir, use_torch=False)
+            second_worker = RequestProfiler(out_dir, use_torch=False)
+            first = first_worker.start('first', requested=True)
+            self.assertIsNone(second_worker.start('second', requested=True))
+            first_worker.finish(first, status=200)
+            second = second_worker.start('second', requested=True)
+            self.assertIsNotNone(second)
+            second_worker.finish(second, status=200)
+            self.assertEqual(len(first_worker.list()), 2)
+    
+    @unittest.skipUnless(FCNTL_AVAILABLE, "file locks need fcntl")
+    def test_index_shared_by_processes(self):
+        """Concurrent workers never lose each other's index entries"""
+        with tempfile.TemporaryDirectory() as out_dir:
+            ctx = mp.get_context('fork')
+            workers = [ctx.Process(target=profile_in_worker, args=(out_dir, 5)) for _ in range(4)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join(timeout=60)
+                self.assertEqual(worker.exitcode, 0)
+            entries = RequestProfiler(out_dir, use_torch=False).list()
+            self.assertEqual(len(entries), 20)
+            self.assertEqual(len([f for f in os.listdir(out_dir) if f.endswith('.txt')]), 20)
+            self.assertFalse([f for f in os.listdir(out_dir) if f.endswith('.tmp')])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model.utils.qos import QoSController
+
+
+class TestQoSController(unittest.TestCase):
+    def make(self, **overrides):
+        settings = {
+            'queue_depth': {'reduced': 2, 'minimal': 3, 'cache_only': 4},
+            'latency_seconds': {'reduced': 1.0, 'minimal': 2.0, 'cache_only': 5.0},
+            'ewma_alpha': 1.0,
+        }
+        settings.update(overrides)
+        return QoSController(settings)
+
+    def test_tiers_follow_queue_depth(self):
+        """Each extra request in flight steps down one tier"""
+        qos = self.make()
+        tickets = [qos.admit() for _ in range(4)]
+        self.assertEqual([t.tier for t in tickets], ['full', 'reduced', 'minimal', 'cache_only'])
+        self.assertTrue(tickets[-1].rejected)
+        for ticket in tickets:
+            ticket.release()
+        self.assertEqual(qos.stats()['in_flight'], 0)
+        self.assertEqual(qos.admit().tier, 'full')
+
+    def test_tiers_follow_latency(self):
+        """Slow recent requests degrade new ones even without a queue"""
+        qos = self.make()
+        ticket = qos.admit()
+        qos._release(ticket, 2.5)
+        self.assertEqual(qos.admit().tier, 'minimal')
+
+    def test_recovers_after_latency_spike(self):
+        """One slow request does not leave the worker rejecting everything"""
+        qos = self.make(latency_half_life_seconds=10.0)
+        qos._release(qos.admit(), 30.0)
+        ticket = qos.admit()
+        self.assertTrue(ticket.rejected)
+        ticket.release()
+        self.assertAlmostEqual(qos.stats()['latency_seconds'], 30.0, places=2)
+
+        # Rejections record nothing, so only time brings the latency back down
+        qos._latency_at -= 60.0
+        self.assertEqual(qos.admit().tier, 'full')
+
+    def test_requested_tier_only_degrades(self):
+        """Clients can ask for a cheaper tier but not a better one than load allows"""
+        qos = self.make()
+        with qos.admit(requested_tier='minimal') as ticket:
+            self.assertEqual((ticket.tier, ticket.reason), ('minimal', 'requested'))
+            with qos.admit(requested_tier='full') as second:
+                self.assertEqual(second.tier, 'reduced')
+        with self.assertRaises(ValueError):
+            qos.admit(requested_tier='platinum')
+
+    def test_deadline_picks_tier_that_fits(self):
+        """A deadline skips tiers whose observed latency would miss it"""
+        qos = self.make(latency_seconds={})
+        qos._release(qos.admit(), 3.0)
+        qos._release(qos.admit(requested_tier='reduced'), 1.5)
+        qos._release(qos.admit(requested_tier='minimal'), 0.5)
+        self.assertEqual(qos.admit(deadline_ms=2000).tier, 'reduced')
+
+    def test_disabled(self):
+        """Disabled QoS always serves the full tier"""
+        qos = self.make(enabled=False)
+        self.assertEqual([qos.admit().tier for _ in range(6)], ['full'] * 6)
+
+    def test_options_for(self):
+        """Tier options come from the predictor and can be overridden by config"""
+        class Predictor:
+            QOS_TIERS = {'reduced': {'max_strategies': 2}}
+        qos = self.make(tier_options={'reduced': {'mag_ratio': 1.0}})
+        self.assertEqual(qos.options_for('reduced', Predictor()), {'max_strategies': 2, 'mag_ratio': 1.0})
+        self.assertEqual(qos.options_for('full', object()), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+import unittest
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+import numpy as np
+
+from model.utils.region_cache import RegionCache
+from model.mains.easyocr_predictor import EasyOCRPredictor
+
+
+def make_crop(text, scale=1.0, brightness=255):
+    """Render a small text crop similar to a printed form label"""
+    img = np.full((40, 200), brightness, dtype=np.uint8)
+    cv2.putText(img, text, (5, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.9, 0, 2)
+    if scale != 1.0:
+        img = cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    return img
+
+
+class TestRegionCache(unittest.TestCase):
+    def test_identical_crops_share_key(self):
+        """Same label rendered twice should hash identically"""
+        cache = RegionCache()
+        self.assertEqual(cache.key_for(make_crop("Name:")), cache.key_for(make_crop("Name:")))
+        
+    def test_illumination_is_normalized(self):
+        """Brightness differences between scans should not change the key"""
+        cache = RegionCache()
+        self.assertEqual(cache.key_for(make_crop("Date:", brightness=255)),
+                         cache.key_for(make_crop("Date:", brightness=220)))
+        
+    def test_different_crops_differ(self):
+        """Different labels should not collide"""
+        cache = RegionCache()
+        self.assertNotEqual(cache.key_for(make_crop("Name:")), cache.key_for(make_crop("Date:")))
+        
+    def test_empty_crop(self):
+        """Empty crops are never cached"""
+        cache = RegionCache()
+        self.assertIsNone(cache.key_for(np.zeros((0, 10), dtype=np.uint8)))
+        cache.put(None, "x", 1.0)
+        self.assertEqual(len(cache), 0)
+        
+    def test_lru_eviction_and_stats(self):
+        """Oldest entries are evicted and hits/misses are counted"""
+        cache = RegionCache(max_entries=2)
+        cache.put('a', 'A', 0.9)
+        cache.put('b', 'B', 0.8)
+        self.assertEqual(cache.get('a'), ('A', 0.9))
+        cache.put('c', 'C', 0.7)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), ('C', 0.7))
+        stats = cache.stats()
+        self.assertEqual(stats['size'], 2)
+        self.assertEqual(stats['hits'], 2)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(cache.clear(), 2)
+
+
+class CountingReader:
+    """EasyOCR reader stand-in: fixed detections, counts recognized regions"""
+    def __init__(self):
+        self.boxes = []
+        self.free = []
+        self.recognize_calls = []
+        
+    def detect(self, img, mag_ratio=1.0, reformat=True):
+        return [list(self.boxes)], [list(self.free)]
+        
+    def recognize(self, img_cv_grey, horizontal_list=None, free_list=None, detail=1, paragraph=False,
+                  reformat=True):
+        self.recognize_calls.append(list(horizontal_list))
+        return [([[x0, y0], [x1, y0], [x1, y1], [x0, y1]], f"text@{x0},{y0}", 0.9)
+                for x0, x1, y0, y1 in horizontal_list] + \
+               [(box, f"free@{box[0][0]},{box[0][1]}", 0.8) for box in free_list or []]
+        
+    def readtext(self, image, detail=1, paragraph=False):
+        # EasyOCR's get_image_list sorts horizontal and free crops together by top y
+        results = self.recognize(image, horizontal_list=list(self.boxes), free_list=list(self.free))
+        return sorted(results, key=lambda item: item[0][0][1])
+
+
+class TestReadCached(unittest.TestCase):
+    def setUp(self):
+        # Page with "Name:" twice (different positions) and "Date:" once
+        self.page = np.full((200, 420), 255, dtype=np.uint8)
+        self.page[10:50, 10:210] = make_crop("Name:")
+        self.page[10:50, 215:415] = make_crop("Date:")
+        self.page[100:140, 10:210] = make_crop("Name:")
+        self.name, self.date, self.name_again = [10, 210, 10, 50], [215, 415, 10, 50], [10, 210, 100, 140]
+        
+        self.reader = CountingReader()
+        self.predictor = EasyOCRPredictor.__new__(EasyOCRPredictor)
+        self.predictor.reader = self.reader
+        self.predictor.region_cache = RegionCache()
+        
+    def read(self, *boxes):
+        self.reader.boxes = list(boxes)
+        return [text for _, text, _ in self.predictor._read_cached(self.page)]
+        
+    def test_repeated_regions_are_recognized_once(self):
+        """A second read of the same page runs no recognition"""
+        first = self.read(self.name, self.date)
+        self.assertEqual(first, ["text@10,10", "text@215,10"])
+        self.assertEqual(self.reader.recognize_calls, [[self.name, self.date]])
+        
+        self.assertEqual(self.read(self.name, self.date), first)
+        self.assertEqual(len(self.reader.recognize_calls), 1)
+        
+    def test_partial_overlap_recognizes_only_new_regions(self):
+        """Only regions missing from the cache go to recognition, in one pass"""
+        self.read(self.name)
+        texts = self.read(self.date, self.name)
+        self.assertEqual(self.reader.recognize_calls, [[self.name], [self.date]])
+        self.assertEqual(texts, ["text@215,10", "text@10,10"])
+        
+        # Same content elsewhere on the page is a cache hit too
+        texts = self.read(self.name_again, self.date)
+        self.assertEqual(len(self.reader.recognize_calls), 2)
+        self.assertEqual(texts, ["text@215,10", "text@10,10"])
+        self.assertEqual(self.predictor.region_cache.stats()['hits'], 3)
+        
+    def test_order_matches_readtext(self):
+        """Horizontal and free boxes of mixed heights come back in readtext order"""
+        short, tall = [10, 210, 30, 50], [215, 415, 5, 60]
+        self.reader.boxes = [short, tall]
+        self.reader.free = [[[20, 15], [200, 25], [195, 45], [15, 35]]]
+        expected = [(bbox, text) for bbox, text, _ in self.reader.readtext(self.page)]
+        
+        for _ in range(2):
+            results = self.predictor._read_cached(self.page)
+            self.assertEqual([(bbox, text) for bbox, text, _ in results], expected)
+        self.assertEqual([text for _, text in expected], ["text@215,5", "free@20,15", "text@10,30"])
+
+if __name__ == '__main__':
+    unittest.main()
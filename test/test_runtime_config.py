@@ -0,0 +1,108 @@
+import unittest
+import os
+import sys
+import json
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model.utils.runtime_config import (DEFAULT_RUNTIME, cpus_for_worker, load_runtime_config,
+                                        save_runtime_config, apply_runtime_config)
+
+
+class TestRuntimeConfig(unittest.TestCase):
+    def test_cpus_for_worker(self):
+        """Workers get disjoint CPU blocks that wrap around"""
+        cpus = list(range(8))
+        self.assertEqual(cpus_for_worker(0, 2, cpus), [0, 1])
+        self.assertEqual(cpus_for_worker(3, 2, cpus), [6, 7])
+        self.assertEqual(cpus_for_worker(4, 2, cpus), [0, 1])
+        self.assertEqual(cpus_for_worker(1, 16, cpus), cpus)
+        
+    def test_save_keeps_other_keys(self):
+        """Saving runtime settings preserves the rest of the config"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'config.json')
+            with open(path, 'w') as f:
+                json.dump({'image_height': 32}, f)
+            
+            self.assertEqual(load_runtime_config(path), DEFAULT_RUNTIME)
+            settings = dict(DEFAULT_RUNTIME, workers=4, torch_threads=2)
+            save_runtime_config(path, settings)
+            
+            with open(path, 'r') as f:
+                config = json.load(f)
+            self.assertEqual(config['image_height'], 32)
+            self.assertEqual(load_runtime_config(path)['workers'], 4)
+            self.assertEqual(load_runtime_config(path)['torch_threads'], 2)
+            
+    def test_save_keeps_line_endings(self):
+        """A CRLF config stays CRLF after saving"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'config.json')
+            with open(path, 'wb') as f:
+                f.write(b'{\r\n  "image_height": 32\r\n}\r\n')
+            save_runtime_config(path, dict(DEFAULT_RUNTIME, workers=2))
+            with open(path, 'rb') as f:
+                data = f.read()
+            self.assertEqual(data.count(b'\n'), data.count(b'\r\n'))
+            self.assertEqual(load_runtime_config(path)['workers'], 2)
+            
+    def test_save_only_rewrites_runtime_section(self):
+        """Blank lines and inline arrays outside "runtime" survive a save"""
+        source = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                              'model', 'configs', 'config.json')
+        with open(source, 'rb') as f:
+            original = f.read()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'config.json')
+            with open(path, 'wb') as f:
+                f.write(original)
+            save_runtime_config(path, dict(load_runtime_config(path), workers=3))
+            with open(path, 'rb') as f:
+                saved = f.read()
+        
+        start = original.index(b'"runtime"')
+        self.assertEqual(saved[:start], original[:start])
+        self.assertEqual(saved.count(b'\n'), original.count(b'\n'))
+        self.assertIn(b'"workers": 3,', saved)
+        self.assertEqual(json.loads(saved)['runtime']['workers'], 3)
+        
+    def test_apply_opencv_threads(self):
+        """OpenCV thread count is applied immediately"""
+        import cv2
+        previous = cv2.getNumThreads()
+        try:
+            applied = apply_runtime_config(dict(DEFAULT_RUNTIME, opencv_threads=1))
+            self.assertEqual(applied['opencv_threads'], 1)
+        finally:
+            cv2.setNumThreads(previous)
+            
+    def test_gunicorn_worker_slots(self):
+        """Gunicorn workers get distinct pinning slots, and replacements reuse freed ones"""
+        import importlib.util
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        spec = importlib.util.spec_from_file_location('gunicorn_conf', os.path.join(root, 'gunicorn.conf.py'))
+        conf = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(conf)
+        
+        class Worker:
+            pass
+        
+        class Server:
+            WORKERS = {}
+        
+        server = Server()
+        for pid in range(3):
+            worker = Worker()
+            conf.pre_fork(server, worker)
+            server.WORKERS[pid] = worker
+        self.assertEqual(sorted(w.htr_slot for w in server.WORKERS.values()), [0, 1, 2])
+        
+        del server.WORKERS[1]
+        replacement = Worker()
+        conf.pre_fork(server, replacement)
+        self.assertEqual(replacement.htr_slot, 1)
+        self.assertEqual(conf.workers, int(os.environ.get('WEB_CONCURRENCY') or conf.RUNTIME_CONFIG['workers']))
+
+if __name__ == '__main__':
+    unittest.main()
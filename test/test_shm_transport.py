@@ -0,0 +1,195 @@
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+import numpy as np
+
+from model.utils.shm_transport import SharedMemoryRing, InferenceProcess, RingFullError
+
+
+class ShapePredictor:
+    """Predictor stand-in that reports what it received"""
+    QOS_TIERS = {'reduced': {'offset': 1}}
+    
+    def predict(self, image, offset=0):
+        return {'shape': list(image.shape), 'sum': int(image.sum()) + offset,
+                'writeable': bool(image.flags.writeable)}
+    
+    def predict_batch(self, images):
+        return [int(image.sum()) for image in images]
+
+
+class FakeRegionCache:
+    def __init__(self):
+        self.entries = {'a': 1, 'b': 2}
+    
+    def clear(self):
+        count = len(self.entries)
+        self.entries.clear()
+        return count
+    
+    def stats(self):
+        return {'size': len(self.entries)}
+    
+    def __len__(self):
+        return len(self.entries)
+
+
+class FormPredictor(ShapePredictor):
+    """Predictor stand-in with template, streaming and region cache support"""
+    def __init__(self):
+        self.region_cache = FakeRegionCache()
+    
+    def predict_fields(self, page, template):
+        return {name: {'text': f"{page.ndim}d", 'confidence': 1.0} for name in template}
+    
+    def detect_boxes(self, gray, mag_ratio=1.0):
+        return [[0, gray.shape[1], 0, gray.shape[0]]]
+    
+    def recognize_boxes(self, gray, boxes):
+        return [(f"{box[1]}x{box[3]}", 0.9) for box in boxes]
+    
+    def open_stream(self, **kwargs):
+        raise AssertionError("streams are opened in the parent")
+
+
+class CrashingPredictor(ShapePredictor):
+    """Predictor stand-in whose process dies on the first prediction"""
+    def predict(self, image, offset=0):
+        os._exit(3)
+
+
+def make_shape_predictor():
+    return ShapePredictor()
+
+
+def make_form_predictor():
+    return FormPredictor()
+
+
+def make_crashing_predictor():
+    return CrashingPredictor()
+
+
+class TestSharedMemoryRing(unittest.TestCase):
+    def setUp(self):
+        self.ring = SharedMemoryRing(num_slots=2, slot_bytes=1024)
+        
+    def tearDown(self):
+        self.ring.close()
+        
+    def test_put_and_zero_copy_view(self):
+        """Views share memory with the slot and are read-only"""
+        image = np.arange(100, dtype=np.uint8).reshape(10, 10)
+        handle = self.ring.put(image)
+        view = self.ring.view(handle)
+        np.testing.assert_array_equal(view, image)
+        self.assertFalse(view.flags.writeable)
+        self.assertFalse(view.flags.owndata)
+        del view
+        self.ring.release(handle)
+        self.assertEqual(self.ring.in_use(), 0)
+        
+    def test_backpressure_and_refcounts(self):
+        """Slots stay busy until every reference is released"""
+        image = np.zeros((8, 8), dtype=np.uint8)
+        first = self.ring.put(image)
+        self.ring.put(image)
+        with self.assertRaises(RingFullError):
+            self.ring.put(image, timeout=0.05)
+        
+        self.ring.retain(first)
+        self.ring.release(first)
+        with self.assertRaises(RingFullError):
+            self.ring.put(image, timeout=0.05)
+        self.ring.release(first)
+        third = self.ring.put(image, timeout=0.05)
+        self.assertEqual(third.slot, first.slot)
+        self.ring.release(third)
+        with self.assertRaises(ValueError):
+            self.ring.release(third)
+        
+    def test_oversized_array(self):
+        """Arrays larger than a slot are rejected"""
+        with self.assertRaises(ValueError):
+            self.ring.put(np.zeros(2048, dtype=np.uint8))
+
+
+class TestInferenceProcess(unittest.TestCase):
+    def test_round_trip(self):
+        """The child process sees the image through shared memory"""
+        process = InferenceProcess(make_shape_predictor, num_slots=2, slot_bytes=64 * 1024,
+                                   start_timeout=60)
+        try:
+            image = np.ones((20, 30, 3), dtype=np.uint8)
+            result = process.predict(image, timeout=30, offset=1)
+            self.assertEqual(result, {'shape': [20, 30, 3], 'sum': 1801, 'writeable': False})
+            self.assertEqual(process.ring.in_use(), 0)
+            self.assertEqual(process.QOS_TIERS, ShapePredictor.QOS_TIERS)
+            # Features the child's predictor lacks are not offered
+            self.assertFalse(hasattr(process, 'predict_fields'))
+            self.assertFalse(hasattr(process, 'open_stream'))
+            self.assertIsNone(process.region_cache)
+        finally:
+            process.close()
+    
+    def test_stands_in_for_predictor(self):
+        """Paths are decoded into shared memory; batches larger than the ring go in chunks"""
+        process = InferenceProcess(make_shape_predictor, num_slots=2, slot_bytes=64 * 1024,
+                                   start_timeout=60)
+        tmp = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmp, 'line.png')
+            cv2.imwrite(path, np.full((10, 12), 1, dtype=np.uint8))
+            self.assertEqual(process.predict(path, timeout=30)['shape'], [10, 12, 3])
+            with self.assertRaises(ValueError):
+                process.predict(os.path.join(tmp, 'missing.png'), timeout=30)
+            
+            images = [np.full((4, 4), i, dtype=np.uint8) for i in range(5)]
+            self.assertEqual(process.predict_batch(images, timeout=30), [i * 16 for i in range(5)])
+            self.assertEqual(process.ring.in_use(), 0)
+        finally:
+            process.close()
+            shutil.rmtree(tmp, ignore_errors=True)
+    
+    def test_proxies_templates_streams_and_region_cache(self):
+        """Template fields, stream sessions and the region cache reach the child's predictor"""
+        process = InferenceProcess(make_form_predictor, num_slots=2, slot_bytes=64 * 1024, start_timeout=60,
+                                   timeout=30)
+        try:
+            page = np.full((20, 40, 3), 255, dtype=np.uint8)
+            self.assertEqual(process.predict_fields(page, ['name']), {'name': {'text': '3d', 'confidence': 1.0}})
+            
+            recognizer = process.open_stream()
+            result = recognizer.process(np.full((24, 48), 255, dtype=np.uint8))
+            self.assertIn('48x24', [region['text'] for region in result['regions']])
+            
+            self.assertEqual(len(process.region_cache), 2)
+            self.assertEqual(process.region_cache.clear(), 2)
+            self.assertEqual(process.region_cache.stats(), {'size': 0})
+            self.assertEqual(process.ring.in_use(), 0)
+        finally:
+            process.close()
+    
+    def test_child_death_fails_waiting_calls(self):
+        """A crashed child fails the call, frees its slot and marks the process unhealthy"""
+        reasons = []
+        process = InferenceProcess(make_crashing_predictor, num_slots=2, slot_bytes=64 * 1024,
+                                   start_timeout=60, timeout=30, on_exit=reasons.append)
+        try:
+            with self.assertRaises(RuntimeError):
+                process.predict(np.ones((4, 4), dtype=np.uint8))
+            self.assertFalse(process.healthy)
+            self.assertIn('code 3', reasons[0])
+            self.assertEqual(process.ring.in_use(), 0)
+            with self.assertRaises(RuntimeError):
+                process.predict(np.ones((4, 4), dtype=np.uint8))
+        finally:
+            process.close()
+
+if __name__ == '__main__':
+    unittest.main()
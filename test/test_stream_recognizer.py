@@ -0,0 +1,80 @@
+import unittest
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+import numpy as np
+
+from model.utils.stream_recognizer import StreamRecognizer, merge_boxes, reading_order
+
+
+def make_frame(lines):
+    """White page with one text line per (text, y) pair"""
+    frame = np.full((240, 480), 255, dtype=np.uint8)
+    for text, y in lines:
+        cv2.putText(frame, text, (20, y), cv2.FONT_HERSHEY_SIMPLEX, 1.0, 0, 2)
+    return frame
+
+
+def detect_lines(gray):
+    """Stand-in detector: bounding boxes of dark, horizontally joined blobs"""
+    mask = cv2.dilate((gray < 128).astype(np.uint8), np.ones((3, 25), np.uint8))
+    count, _, stats, _ = cv2.connectedComponentsWithStats(mask)
+    return [[int(x), int(x + w), int(y), int(y + h)] for x, y, w, h, _ in stats[1:count]]
+
+
+class FakeRecognizer:
+    """Stand-in recognizer that counts how many boxes it was asked to read"""
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, gray, boxes):
+        self.calls += len(boxes)
+        return [(f"ink{int((gray[b[2]:b[3], b[0]:b[1]] < 128).sum())}", 0.9) for b in boxes]
+
+
+class TestStreamRecognizer(unittest.TestCase):
+    def setUp(self):
+        self.recognize = FakeRecognizer()
+        self.stream = StreamRecognizer(detect_lines, self.recognize, stable_frames=2)
+        self.page = [("Hello world", 60), ("second line", 160)]
+
+    def test_static_scene_is_not_reread(self):
+        """Unchanged frames reuse tracked text and become stable"""
+        first = self.stream.process(make_frame(self.page))
+        self.assertTrue(first['full_frame'])
+        self.assertEqual(len(first['regions']), 2)
+        self.assertEqual(first['stable_text'], '')
+
+        second = self.stream.process(make_frame(self.page))
+        self.assertFalse(second['full_frame'])
+        self.assertEqual(second['recognized'], 0)
+        self.assertEqual(self.recognize.calls, 2)
+        self.assertEqual(second['stable_text'], first['text'])
+
+    def test_only_changed_line_is_reread(self):
+        """Editing one line re-recognizes that line and keeps the other track"""
+        first = self.stream.process(make_frame(self.page))
+        changed = self.stream.process(make_frame([("Hello world", 60), ("other words", 160)]))
+        self.assertFalse(changed['full_frame'])
+        self.assertEqual(changed['recognized'], 1)
+        self.assertEqual(changed['regions'][0]['id'], first['regions'][0]['id'])
+        self.assertNotEqual(changed['regions'][1]['text'], first['regions'][1]['text'])
+
+    def test_new_page_resets(self):
+        """A mostly different frame is processed as a whole"""
+        self.stream.process(make_frame(self.page))
+        inverted = 255 - make_frame(self.page)
+        self.assertTrue(self.stream.process(inverted)['full_frame'])
+
+    def test_helpers(self):
+        """Overlapping boxes merge; reading order is line by line"""
+        self.assertEqual(merge_boxes([[0, 10, 0, 10], [5, 20, 5, 20], [30, 40, 30, 40]]),
+                         [[0, 20, 0, 20], [30, 40, 30, 40]])
+        boxes = [[100, 150, 0, 20], [0, 50, 2, 22], [0, 50, 40, 60]]
+        self.assertEqual(reading_order(boxes), [1, 0, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
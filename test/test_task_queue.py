@@ -0,0 +1,147 @@
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+import numpy as np
+
+from model.utils.task_queue import create_task_queue, task_key
+from model.mains.queue_worker import QueueWorker
+
+
+class StubPredictor:
+    def __init__(self):
+        self.calls = 0
+
+    def predict(self, image, **options):
+        self.calls += 1
+        if image.shape[1] == 1:
+            return "Error during prediction: line too narrow"
+        return f"{image.shape[1]}x{image.shape[0]} {options}"
+
+    def predict_batch(self, images):
+        return [self.predict(image) for image in images]
+
+
+def png_bytes(width=20, height=10):
+    ok, buffer = cv2.imencode('.png', np.full((height, width, 3), 255, np.uint8))
+    return buffer.tobytes()
+
+
+class TestSQLiteTaskQueue(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.queue = create_task_queue('sqlite://' + os.path.join(self.tmp, 'queue.db'))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_duplicate_enqueue_is_one_task(self):
+        """The same image and options map to one task"""
+        first = self.queue.enqueue('abc', payload=b'1')
+        second = self.queue.enqueue('abc', payload=b'1')
+        self.assertEqual(first, second)
+        self.assertEqual(self.queue.stats()['pending'], 1)
+        self.assertNotEqual(task_key('abc', 'easyocr', {'mag_ratio': 1.0}), first)
+
+    def test_expired_lease_is_redelivered(self):
+        """A task whose worker died is handed out again"""
+        task_id = self.queue.enqueue('abc', payload=b'1')
+        self.assertEqual(len(self.queue.claim('w1', lease_seconds=60)), 1)
+        self.assertEqual(self.queue.claim('w2'), [])
+        self.assertEqual(self.queue.status(task_id), 'running')
+
+        # Let the lease run out
+        conn = self.queue._connect()
+        conn.execute("UPDATE tasks SET lease_until = 0")
+        conn.close()
+        redelivered = self.queue.claim('w2')
+        self.assertEqual([t.task_id for t in redelivered], [task_id])
+        self.assertEqual(redelivered[0].attempts, 2)
+
+    def test_result_writes_are_idempotent(self):
+        """The first result wins and later duplicates are ignored"""
+        task_id = self.queue.enqueue('abc', payload=b'1')
+        self.assertTrue(self.queue.complete(task_id, {'recognized_text': 'first'}, 'w1'))
+        self.assertFalse(self.queue.complete(task_id, {'recognized_text': 'second'}, 'w2'))
+        self.assertEqual(self.queue.get_result(task_id)['result']['recognized_text'], 'first')
+        # Finished work is not queued again
+        self.queue.enqueue('abc', payload=b'1')
+        self.assertEqual(self.queue.stats(), {'pending': 0, 'running': 0, 'done': 1})
+
+    def test_failure_retries_then_publishes_error(self):
+        """Failing tasks are retried up to max_attempts"""
+        task_id = self.queue.enqueue('abc', payload=b'1')
+        for _ in range(2):
+            self.queue.claim('w1')
+            self.queue.fail(task_id, 'boom', max_attempts=2)
+        self.assertEqual(self.queue.get_result(task_id)['error'], 'boom')
+
+    def test_error_result_is_retried_on_resubmit(self):
+        """A stored error does not poison the image; successes are kept"""
+        task_id = self.queue.enqueue('abc', payload=b'1')
+        self.queue.claim('w1')
+        self.queue.fail(task_id, 'backend failed to load', max_attempts=1)
+        self.assertIsNotNone(self.queue.get_result(task_id)['error'])
+
+        self.queue.enqueue('abc', payload=b'1')
+        self.assertIsNone(self.queue.get_result(task_id))
+        self.assertEqual(self.queue.stats()['pending'], 1)
+
+    def test_task_that_kills_workers_is_given_up(self):
+        """Lease-expired tasks past max_attempts fail instead of blocking the queue"""
+        poison = self.queue.enqueue('poison', payload=b'1')
+        conn = self.queue._connect()
+        conn.execute("UPDATE tasks SET created = 0")
+        conn.close()
+        healthy = self.queue.enqueue('healthy', payload=b'2')
+        for _ in range(2):
+            self.assertEqual([t.task_id for t in self.queue.claim('w1', max_tasks=1, max_attempts=2)], [poison])
+            conn = self.queue._connect()
+            conn.execute("UPDATE tasks SET lease_until = 0")
+            conn.close()
+
+        self.assertEqual([t.task_id for t in self.queue.claim('w2', max_tasks=1, max_attempts=2)], [healthy])
+        self.assertIn('Gave up after 2 attempts', self.queue.get_result(poison)['error'])
+
+    def test_worker_processes_batches(self):
+        """Workers decode payloads and references and publish results"""
+        path = os.path.join(self.tmp, 'image.png')
+        with open(path, 'wb') as f:
+            f.write(png_bytes(30, 15))
+        ids = [self.queue.enqueue('a', payload=png_bytes()),
+               self.queue.enqueue('b', payload_ref=path),
+               self.queue.enqueue('c', options={'mag_ratio': 1.0}, payload=png_bytes()),
+               self.queue.enqueue('d', payload=b'not an image')]
+
+        stub = StubPredictor()
+        worker = QueueWorker(self.queue, {'easyocr': lambda: stub}, batch_size=8, max_attempts=1)
+        self.assertEqual(worker.run_once(), 4)
+        self.assertEqual(self.queue.get_result(ids[0])['result']['recognized_text'], '20x10 {}')
+        self.assertEqual(self.queue.get_result(ids[1])['result']['recognized_text'], '30x15 {}')
+        self.assertIn('mag_ratio', self.queue.get_result(ids[2])['result']['recognized_text'])
+        self.assertIsNotNone(self.queue.get_result(ids[3])['error'])
+        self.assertEqual(worker.run_once(), 0)
+
+    def test_error_text_is_published_as_failure(self):
+        """Error text returned by a predictor is retried and stored as an error"""
+        task_id = self.queue.enqueue('narrow', payload=png_bytes(1, 10))
+        worker = QueueWorker(self.queue, {'easyocr': StubPredictor}, max_attempts=2)
+        worker.run_once()
+        self.assertIsNone(self.queue.get_result(task_id))
+        worker.run_once()
+        stored = self.queue.get_result(task_id)
+        self.assertIsNone(stored['result'])
+        self.assertIn('line too narrow', stored['error'])
+        self.assertEqual(worker.failed, 2)
+
+    def test_unsupported_url(self):
+        with self.assertRaises(ValueError):
+            create_task_queue('redis://localhost')
+
+
+if __name__ == '__main__':
+    unittest.main()
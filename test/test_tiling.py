@@ -0,0 +1,75 @@
+import unittest
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+import numpy as np
+
+from model.utils.tiling import (iter_tiles, nms, merge_seam_boxes, detect_tiled, segment_lines,
+                                split_wide_box, reading_lines)
+
+
+def make_page(lines=12, width=1500, line_height=60):
+    """White page with numbered text lines"""
+    page = np.full((lines * line_height + 40, width), 255, dtype=np.uint8)
+    for i in range(lines):
+        cv2.putText(page, f"line {i} lorem ipsum dolor sit amet", (20, 50 + i * line_height),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1.2, 0, 2)
+    return page
+
+
+def detect_words(gray):
+    """Stand-in detector: boxes of dark blobs joined into words"""
+    mask = cv2.dilate((gray < 128).astype(np.uint8), np.ones((5, 15), np.uint8))
+    count, _, stats, _ = cv2.connectedComponentsWithStats(mask)
+    return [[int(x), int(x + w), int(y), int(y + h)] for x, y, w, h, _ in stats[1:count]]
+
+
+class TestTiling(unittest.TestCase):
+    def test_tiles_cover_image(self):
+        """Tiles overlap, stay inside the image and cover every pixel"""
+        covered = np.zeros((1000, 2300), dtype=bool)
+        for x0, y0, x1, y1 in iter_tiles(1000, 2300, tile_size=512, overlap=64):
+            self.assertLessEqual(x1 - x0, 512)
+            covered[y0:y1, x0:x1] = True
+        self.assertTrue(covered.all())
+        self.assertEqual(list(iter_tiles(100, 100, 512, 64)), [(0, 0, 100, 100)])
+
+    def test_seam_merge_and_nms(self):
+        """Halves of a cut word join; fragments inside a full box are dropped"""
+        merged = merge_seam_boxes([(0, [90, 128, 10, 30]), (1, [100, 160, 11, 31]),
+                                   (0, [10, 50, 10, 30]), (0, [60, 80, 10, 30])])
+        self.assertIn([90, 160, 10, 31], merged)
+        self.assertEqual(len(merged), 3)
+        self.assertEqual(nms([[0, 100, 0, 20], [10, 40, 2, 18]], [2000, 480]), [0])
+
+    def test_tiled_detection_matches_whole_image(self):
+        """Tiled detection finds the same words as detecting the whole page"""
+        page = make_page()
+        whole = detect_words(page)
+        tiled = detect_tiled(page, detect_words, tile_size=400, overlap=100, workers=2)
+        self.assertEqual(len(tiled), len(whole))
+        lines = reading_lines(tiled)
+        self.assertEqual(len(lines), 12)
+
+    def test_segment_lines_across_strips(self):
+        """Each text line is found exactly once, in order, even across strip seams"""
+        lines = segment_lines(make_page(), strip_height=256, overlap=96)
+        self.assertEqual(len(lines), 12)
+        tops = [line[2] for line in lines]
+        self.assertEqual(tops, sorted(tops))
+
+    def test_split_wide_box(self):
+        """Long lines are cut into pieces no wider than the aspect limit"""
+        page = make_page(lines=1)
+        line = segment_lines(page)[0]
+        pieces = split_wide_box(page, line, max_aspect=8.0)
+        height = line[3] - line[2]
+        self.assertGreater(len(pieces), 1)
+        self.assertTrue(all(p[1] - p[0] <= 8 * height for p in pieces))
+        self.assertEqual((pieces[0][0], pieces[-1][1]), (line[0], line[1]))
+
+
+if __name__ == '__main__':
+    unittest.main()